@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from accounts.models import User, UserNotificationPreferences
+from accounts.models import OutboxEmail, User, UserNotificationPreferences
 
 
 @admin.register(User)
@@ -25,3 +25,10 @@ class UserAdmin(BaseUserAdmin):
 @admin.register(UserNotificationPreferences)
 class UserNotificationPreferencesAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "dedup_key")
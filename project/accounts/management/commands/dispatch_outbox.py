@@ -0,0 +1,70 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts import outbox
+
+
+class Command(BaseCommand):
+    help = "Send the emails of the outbox until stopped, then the remaining ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.OUTBOX_INTERVAL,
+            help="Seconds between two dispatches (default: OUTBOX_INTERVAL)",
+        )
+        parser.add_argument(
+            "--connections",
+            type=int,
+            default=settings.OUTBOX_CONNECTIONS,
+            help="Number of SMTP connections (default: OUTBOX_CONNECTIONS)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the pending emails once and exit",
+        )
+        parser.add_argument(
+            "--stats", action="store_true", help="Show the outbox counters and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            stats = outbox.stats()
+            self.stdout.write(
+                "Outbox: " + " ".join(f"{key}={value}" for key, value in stats.items())
+            )
+            return
+
+        if options["once"]:
+            sent, failed = outbox.dispatch(connections=options["connections"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed.")
+            )
+            return
+
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        # Stop between two dispatches, never in the middle of a batch
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        sent = failed = 0
+        while not self.stopping:
+            result = outbox.dispatch(connections=options["connections"])
+            sent += result[0]
+            failed += result[1]
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stopped after sending {sent} email(s), {failed} failed."
+            )
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0005_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["email_verified", "date_joined"],
+                name="user_unverified_joined_idx",
+            ),
+        ),
+    ]
@@ -3,12 +3,22 @@ from uuid import uuid4
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
 class User(AbstractUser):
     REQUIRED_FIELDS = ["email", "email_verified"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Accounts to delete, see accounts.tasks.delete_non_verified_accounts
+            models.Index(
+                fields=["email_verified", "date_joined"],
+                name="user_unverified_joined_idx",
+            ),
+        ]
+
     uuid = models.UUIDField(
         _("UUID"),
         default=uuid4,
@@ -59,3 +69,53 @@ class UserNotificationPreferences(models.Model):
     ride_sharing_suggestion_notification = models.BooleanField(
         default=True, help_text="Receive notifications suggesting to share rides."
     )
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent by the outbox dispatcher, see
+    ``accounts.outbox``.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        SENT = "SENT", _("Sent")
+        FAILED = "FAILED", _("Failed")  # Given up after OUTBOX_MAX_ATTEMPTS
+
+    class Meta:
+        verbose_name = _("outbox email")
+        verbose_name_plural = _("outbox emails")
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status="PENDING"),
+                name="outbox_pending_idx",
+            ),
+        ]
+
+    # Producers retried by Celery pass a key so that a message is queued once
+    dedup_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    # The message itself, see accounts.outbox.enqueue()
+    subject = models.TextField()
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default="plain")
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    alternatives = models.JSONField(default=list)
+    attachments = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
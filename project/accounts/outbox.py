@@ -0,0 +1,217 @@
+"""
+Transactional outbox of the emails.
+
+Producers do not talk to the SMTP server: ``enqueue`` stores the message in
+an ``OutboxEmail`` row, inside the transaction of the change the email is
+about, so that an email is sent if and only if that change is committed.
+
+The ``dispatch_outbox`` command drains the outbox: ``OUTBOX_CONNECTIONS``
+workers each keep one SMTP connection open and send the pending messages by
+batches of ``OUTBOX_BATCH_SIZE``. A batch is locked with ``SKIP LOCKED`` while
+it is sent, so that workers and dispatchers never send the same message, and
+a dispatcher crashing in the middle of a batch leaves it pending. Failed
+messages are retried with an exponential backoff, up to
+``OUTBOX_MAX_ATTEMPTS`` times.
+"""
+
+import base64
+import contextlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from accounts.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(email, dedup_key=None):
+    """
+    Queue ``email`` (an ``EmailMessage``) in the outbox, return the
+    ``OutboxEmail``, or ``None`` if a message with ``dedup_key`` is already
+    queued.
+    """
+    attachments = []
+    for filename, content, mimetype in email.attachments:
+        if isinstance(content, bytes):
+            content = base64.b64encode(content).decode()
+            attachments.append([filename, content, mimetype, True])
+        else:
+            attachments.append([filename, content, mimetype, False])
+
+    outbox_email = OutboxEmail(
+        dedup_key=dedup_key,
+        subject=email.subject,
+        body=email.body,
+        content_subtype=email.content_subtype,
+        from_email=email.from_email or "",
+        to=list(email.to),
+        cc=list(email.cc),
+        bcc=list(email.bcc),
+        reply_to=list(email.reply_to),
+        headers=email.extra_headers,
+        alternatives=[list(a) for a in getattr(email, "alternatives", [])],
+        attachments=attachments,
+    )
+    try:
+        # In a savepoint, the transaction of the producer goes on
+        with transaction.atomic():
+            outbox_email.save()
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+        logger.info(f"Email {dedup_key} is already in the outbox.")
+        return None
+    return outbox_email
+
+
+def to_message(outbox_email):
+    email = EmailMultiAlternatives(
+        subject=outbox_email.subject,
+        body=outbox_email.body,
+        from_email=outbox_email.from_email or None,
+        to=outbox_email.to,
+        cc=outbox_email.cc,
+        bcc=outbox_email.bcc,
+        reply_to=outbox_email.reply_to,
+        headers=outbox_email.headers,
+        alternatives=[tuple(a) for a in outbox_email.alternatives],
+    )
+    email.content_subtype = outbox_email.content_subtype
+    for filename, content, mimetype, encoded in outbox_email.attachments:
+        email.attach(
+            filename, base64.b64decode(content) if encoded else content, mimetype
+        )
+    return email
+
+
+def _retry_delay(attempts):
+    return timezone.timedelta(seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _send_batch(smtp, batch_size):
+    """
+    Send a batch of pending messages over the ``smtp`` connection, return the
+    number of messages sent and failed, or ``None`` if nothing is pending.
+    """
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=OutboxEmail.Status.PENDING,
+                next_attempt_at__lte=timezone.now(),
+            )
+            .order_by("next_attempt_at", "pk")[:batch_size]
+        )
+        if not batch:
+            return None
+
+        sent, failed = [], []
+        for outbox_email in batch:
+            try:
+                # Does nothing while the connection is open
+                smtp.open()
+                smtp.send_messages([to_message(outbox_email)])
+            except Exception as e:
+                logger.warning(f"Failed to send email {outbox_email.pk}: {e}")
+                # Start from a new connection, the server may have closed it
+                with contextlib.suppress(Exception):
+                    smtp.close()
+                outbox_email.attempts += 1
+                outbox_email.last_error = str(e)
+                if outbox_email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    outbox_email.status = OutboxEmail.Status.FAILED
+                    logger.error(
+                        f"Giving up email {outbox_email.pk} "
+                        f"after {outbox_email.attempts} attempts."
+                    )
+                else:
+                    outbox_email.next_attempt_at = timezone.now() + _retry_delay(
+                        outbox_email.attempts
+                    )
+                failed.append(outbox_email)
+            else:
+                sent.append(outbox_email.pk)
+
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            status=OutboxEmail.Status.SENT,
+            sent_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        OutboxEmail.objects.bulk_update(
+            failed, ["status", "attempts", "last_error", "next_attempt_at"]
+        )
+    return len(sent), len(failed)
+
+
+def _worker(batch_size):
+    sent = failed = 0
+    smtp = get_connection()
+    try:
+        while (result := _send_batch(smtp, batch_size)) is not None:
+            sent += result[0]
+            failed += result[1]
+    finally:
+        with contextlib.suppress(Exception):
+            smtp.close()
+    return sent, failed
+
+
+def _thread_worker(batch_size):
+    try:
+        return _worker(batch_size)
+    finally:
+        # Each thread has its own database connection
+        connection.close()
+
+
+def dispatch(batch_size=None, connections=None):
+    """
+    Send the pending messages of the outbox, return the number of messages
+    sent and failed.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    connections = connections or settings.OUTBOX_CONNECTIONS
+    start = time.monotonic()
+
+    if connections == 1:
+        sent, failed = _worker(batch_size)
+    else:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            results = list(executor.map(_thread_worker, [batch_size] * connections))
+        sent = sum(result[0] for result in results)
+        failed = sum(result[1] for result in results)
+
+    if sent or failed:
+        elapsed = time.monotonic() - start
+        logger.info(
+            f"Sent {sent} email(s) in {elapsed:.2f}s "
+            f"({sent / elapsed:.1f}/s), {failed} failed."
+        )
+    return sent, failed
+
+
+def stats():
+    """Size of the outbox and throughput over the last hour."""
+    now = timezone.now()
+    counts = dict(OutboxEmail.objects.values_list("status").annotate(count=Count("pk")))
+    oldest_pending = OutboxEmail.objects.filter(
+        status=OutboxEmail.Status.PENDING
+    ).aggregate(oldest=Min("created_at"))["oldest"]
+    return {
+        "pending": counts.get(OutboxEmail.Status.PENDING, 0),
+        "sent": counts.get(OutboxEmail.Status.SENT, 0),
+        "failed": counts.get(OutboxEmail.Status.FAILED, 0),
+        "sent_last_hour": OutboxEmail.objects.filter(
+            sent_at__gte=now - timezone.timedelta(hours=1)
+        ).count(),
+        "oldest_pending_age": (now - oldest_pending).total_seconds()
+        if oldest_pending
+        else 0,
+    }
@@ -1,10 +1,11 @@
 import os
 import json
+import time
 
 from celery import shared_task
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import PasswordResetForm
-from django.core.mail import EmailMessage
+from django.db import transaction
+from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -14,10 +15,23 @@ from datetime import timedelta
 from celery.utils.log import get_task_logger
 from django.conf import settings
 
+from accounts import outbox
+from carpool.signals import bulk_release_booked_seats
 
 logger = get_task_logger(__name__)
 
 
+# Maximum number of accounts deleted at once, and duration (in seconds) of a
+# run of delete_non_verified_accounts
+DELETE_NON_VERIFIED_BATCH_SIZE = 500
+DELETE_NON_VERIFIED_TIME_BUDGET = 60
+
+
+def _dedup_key(task):
+    """Queue the email of a task once, even if Celery runs the task again."""
+    return f"{task.name}:{task.request.id}" if task.request.id else None
+
+
 @shared_task
 def debug_env_vars():
     """
@@ -36,8 +50,9 @@ def debug_env_vars():
     return "All required environment variables are accessible"
 
 
-@shared_task
+@shared_task(bind=True)
 def send_verification_email(
+    self,
     user_username,
     user_pk,
     user_email,
@@ -55,13 +70,14 @@ def send_verification_email(
         },
     )
     email = EmailMessage(subject, message, to=[user_email])
-    email.send()
+    outbox.enqueue(email, dedup_key=_dedup_key(self))
 
-    logger.info(f"Sent verification email to {user_email}.")
+    logger.info(f"Queued verification email to {user_email}.")
 
 
-@shared_task
+@shared_task(bind=True)
 def send_password_reset_email(
+    self,
     subject_template_name,
     email_template_name,
     context,
@@ -71,21 +87,23 @@ def send_password_reset_email(
 ):
     context["user"] = get_user_model().objects.get(pk=context["user"])
 
-    PasswordResetForm.send_mail(
-        None,
-        subject_template_name,
-        email_template_name,
-        context,
-        from_email,
-        to_email,
-        html_email_template_name,
-    )
+    # Same as PasswordResetForm.send_mail(), through the outbox
+    subject = render_to_string(subject_template_name, context)
+    # Email subject *must not* contain newlines
+    subject = "".join(subject.splitlines())
+    body = render_to_string(email_template_name, context)
 
-    logger.info(f"Sent password reset email to {to_email}.")
+    email = EmailMultiAlternatives(subject, body, from_email, [to_email])
+    if html_email_template_name is not None:
+        html_email = render_to_string(html_email_template_name, context)
+        email.attach_alternative(html_email, "text/html")
+    outbox.enqueue(email, dedup_key=_dedup_key(self))
 
+    logger.info(f"Queued password reset email to {to_email}.")
 
-@shared_task(rate_limit="10/h")
-def send_email_export_data(user_pk):
+
+@shared_task(bind=True, rate_limit="10/h")
+def send_email_export_data(self, user_pk):
     from django.core import serializers
 
     # Prepare the data for user in a json-like format
@@ -167,13 +185,14 @@ def send_email_export_data(user_pk):
         "application/json",
     )
 
-    email.send()
+    outbox.enqueue(email, dedup_key=_dedup_key(self))
 
-    logger.info(f"Sent data export email to {user.email}.")
+    logger.info(f"Queued data export email to {user.email}.")
 
 
-@shared_task
+@shared_task(bind=True)
 def send_forgot_username_email(
+    self,
     to_email,
 ):
     # Verify that user exists with this email
@@ -194,25 +213,49 @@ def send_forgot_username_email(
         },
     )
     email = EmailMessage(subject, message, to=[to_email])
-    email.send()
+    outbox.enqueue(email, dedup_key=_dedup_key(self))
 
-    logger.info(f"Sent forgot_username email to {to_email}.")
+    logger.info(f"Queued forgot_username email to {to_email}.")
 
 
 @shared_task
-def delete_non_verified_accounts():
+def delete_non_verified_accounts(
+    batch_size=DELETE_NON_VERIFIED_BATCH_SIZE,
+    time_budget=DELETE_NON_VERIFIED_TIME_BUDGET,
+):
     """
     Delete the accounts whose email has not been verified for two weeks.
+
+    The accounts are deleted by batches of ``batch_size``, until none is left
+    or ``time_budget`` seconds have passed: the next run deletes the others.
     """
     logger.info("Deleting accounts whose email has not been verified for two weeks.")
 
-    for user in get_user_model().objects.all():
-        if not user.email_verified:
-            max_non_verified_time = timedelta(
-                days=settings.MAX_DAYS_NON_VERIFIED_ACCOUNT
+    cutoff = timezone.now() - timedelta(days=settings.MAX_DAYS_NON_VERIFIED_ACCOUNT)
+    users = get_user_model().objects.filter(
+        email_verified=False, date_joined__lt=cutoff
+    )
+    deadline = time.monotonic() + time_budget
+
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            # Locked, an account verified meanwhile keeps its booked seats
+            pks = list(
+                users.select_for_update().values_list("pk", flat=True)[:batch_size]
             )
-            if timezone.now() - user.date_joined > max_non_verified_time:
-                user.delete()
-                logger.info(
-                    "An account has been deleted since the email was not verified."
-                )
+            if not pks:
+                break
+            # One UPDATE of the rides for the whole batch
+            with bulk_release_booked_seats(pks):
+                _total, counts = users.filter(pk__in=pks).delete()
+        deleted += counts.get(get_user_model()._meta.label, 0)
+        if time.monotonic() >= deadline:
+            break
+
+    remaining = users.count()
+    logger.info(
+        f"{deleted} account(s) deleted since the email was not verified, "
+        f"{remaining} left for the next run."
+    )
+    return {"deleted": deleted, "remaining": remaining}
@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts import outbox
+from accounts.models import OutboxEmail
+
+
+def email(n=0):
+    return EmailMessage(f"Subject {n}", "Body", to=[f"user{n}@example.com"])
+
+
+class OutboxTestCase(TestCase):
+    def test_dispatch(self):
+        message = email()
+        message.attach("data.json", "{}", "application/json")
+        outbox.enqueue(message)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(outbox.dispatch(connections=1), (1, 0))
+        self.assertEqual(mail.outbox[0].subject, "Subject 0")
+        self.assertEqual(mail.outbox[0].attachments[0][0], "data.json")
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.Status.SENT)
+
+        # Nothing left to send
+        self.assertEqual(outbox.dispatch(connections=1), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_enqueued_with_the_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.enqueue(email())
+            raise RuntimeError
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_dedup_key(self):
+        self.assertIsNotNone(outbox.enqueue(email(), dedup_key="task:1"))
+        self.assertIsNone(outbox.enqueue(email(), dedup_key="task:1"))
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_retry(self):
+        outbox.enqueue(email(0))
+        outbox.enqueue(email(1))
+
+        send_messages = mail.get_connection().send_messages
+
+        def fail_first(messages):
+            if messages[0].to == ["user0@example.com"]:
+                raise ConnectionError("Connection refused")
+            return send_messages(messages)
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=fail_first,
+        ):
+            self.assertEqual(outbox.dispatch(connections=1), (1, 1))
+            failed = OutboxEmail.objects.get(to=["user0@example.com"])
+            self.assertEqual(failed.status, OutboxEmail.Status.PENDING)
+            self.assertEqual(failed.attempts, 1)
+            self.assertGreater(failed.next_attempt_at, timezone.now())
+
+            # Retried once due, then given up
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(outbox.dispatch(connections=1), (0, 1))
+            failed.refresh_from_db()
+            self.assertEqual(failed.status, OutboxEmail.Status.FAILED)
+            self.assertEqual(failed.last_error, "Connection refused")
+
+    def test_batches_share_a_connection(self):
+        for n in range(5):
+            outbox.enqueue(email(n))
+        with patch(
+            "accounts.outbox.get_connection", wraps=mail.get_connection
+        ) as connection:
+            self.assertEqual(outbox.dispatch(batch_size=2, connections=1), (5, 0))
+        connection.assert_called_once()
+        self.assertEqual(outbox.stats()["sent_last_hour"], 5)
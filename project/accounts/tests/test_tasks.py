@@ -1,12 +1,15 @@
 from django.utils import timezone
 from datetime import timedelta
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from accounts.tests.factories import UserFactory
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
 from accounts import tasks
+from carpool.tests.factories import RideFactory
 
 
 class DeletingNonVerifiedAccountsTest(TestCase):
@@ -40,3 +43,48 @@ class DeletingNonVerifiedAccountsTest(TestCase):
         tasks.delete_non_verified_accounts()
         user = get_user_model().objects.filter(username="testuser")
         self.assertTrue(user.exists())
+
+    def test_delete_non_verified_accounts_by_batches(self):
+        """Test that the accounts are deleted by batches within the time budget."""
+        date_joined = timezone.now() - timedelta(
+            days=settings.MAX_DAYS_NON_VERIFIED_ACCOUNT + 1
+        )
+        UserFactory.create_batch(5, email_verified=False, date_joined=date_joined)
+        verified = UserFactory(email_verified=True, date_joined=date_joined)
+
+        # A single batch once the time budget is exhausted
+        result = tasks.delete_non_verified_accounts(batch_size=2, time_budget=0)
+        self.assertEqual(result, {"deleted": 2, "remaining": 3})
+
+        result = tasks.delete_non_verified_accounts(batch_size=2)
+        self.assertEqual(result, {"deleted": 3, "remaining": 0})
+        self.assertQuerySetEqual(get_user_model().objects.all(), [verified])
+
+    def test_delete_non_verified_accounts_queries(self):
+        """Test that a batch costs the same queries whatever the number of riders."""
+        date_joined = timezone.now() - timedelta(
+            days=settings.MAX_DAYS_NON_VERIFIED_ACCOUNT + 1
+        )
+
+        def book(count):
+            ride = RideFactory(seats_offered=8, driver=UserFactory())
+            ride.rider.add(
+                UserFactory(email_verified=True),
+                *UserFactory.create_batch(
+                    count, email_verified=False, date_joined=date_joined
+                ),
+            )
+            return ride
+
+        ride = book(1)
+        with CaptureQueriesContext(connection) as queries:
+            tasks.delete_non_verified_accounts()
+        ride.refresh_from_db()
+        self.assertEqual(ride.booked_seats, 1)
+
+        ride = book(5)
+        with self.assertNumQueries(len(queries)):
+            tasks.delete_non_verified_accounts()
+        ride.refresh_from_db()
+        self.assertEqual(ride.booked_seats, 1)
+        self.assertEqual(ride.rider.count(), 1)
@@ -4,7 +4,7 @@ from carpool.models import Location, Step, Vehicle
 from carpool.models.ride import Ride
 from carpool.models.statistics import Statistics, MonthlyStatistics
 from carpool.models.reservation import Reservation
-from carpool.tasks import send_email_suggest_ride_sharing
+from carpool.emails import send_email_suggest_ride_sharing
 
 from django.contrib import messages
 
@@ -61,7 +61,7 @@ def suggest_driver_to_share_ride(modeladmin, request, queryset):
         # Exclude the current ride from the queryset to find similar rides
         similar_rides = queryset.exclude(pk=ride.pk)
 
-        send_email_suggest_ride_sharing.delay(
+        send_email_suggest_ride_sharing(
             ride.pk, [r.pk for r in similar_rides], request.user.pk
         )
 
@@ -0,0 +1,130 @@
+"""
+Seat booking service.
+
+Every operation that changes who rides in a ride locks the ``Ride`` row
+(``SELECT ... FOR UPDATE``) inside a transaction before checking the remaining
+seats, so that concurrent requests (two tabs, double clicks, ...) are
+serialized and ``seats_offered`` can never be exceeded.
+
+The functions return a ``BookingResult`` instead of raising, the views map
+the conflicts to their own responses.
+"""
+
+import enum
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from carpool.models.reservation import Reservation
+from carpool.models.ride import Ride
+from carpool.emails import send_email_confirmed_ride, send_email_declined_ride
+
+
+class BookingConflict(enum.Enum):
+    RIDE_ENDED = "ride_ended"
+    RIDE_FULL = "ride_full"
+    ALREADY_BOOKED = "already_booked"
+    RESERVATION_CANCELED = "reservation_canceled"
+
+
+@dataclass(frozen=True)
+class BookingResult:
+    reservation: Reservation | None = None
+    conflict: BookingConflict | None = None
+    # Whether the user of the reservation was removed from the riders
+    seat_released: bool = False
+
+    @property
+    def ok(self):
+        return self.conflict is None
+
+
+def _lock(reservation):
+    """
+    Lock the ride then the reservation (always in this order to avoid
+    deadlocks) and return fresh copies of both.
+    """
+    ride = Ride.objects.select_for_update().get(pk=reservation.ride_id)
+    reservation = Reservation.objects.select_for_update().get(pk=reservation.pk)
+    reservation.ride = ride
+    return ride, reservation
+
+
+def _release_seat(ride, reservation):
+    if not ride.rider.filter(pk=reservation.user_id).exists():
+        return False
+    ride.rider.remove(reservation.user_id)
+    return True
+
+
+@transaction.atomic
+def request_seat(ride, user):
+    """Create a pending reservation of ``user`` for ``ride``."""
+    ride = Ride.objects.select_for_update().get(pk=ride.pk)
+
+    if ride.has_ended:
+        return BookingResult(conflict=BookingConflict.RIDE_ENDED)
+    if ride.is_full:
+        return BookingResult(conflict=BookingConflict.RIDE_FULL)
+    if ride.reservations.filter(
+        user=user,
+        status__in=[
+            Reservation.Status.PENDING,
+            Reservation.Status.ACCEPTED,
+            Reservation.Status.DECLINED,
+        ],
+    ).exists():
+        return BookingResult(conflict=BookingConflict.ALREADY_BOOKED)
+
+    return BookingResult(reservation=ride.reservations.create(user=user))
+
+
+@transaction.atomic
+def accept_reservation(reservation):
+    """Accept the reservation and add its user to the riders if a seat is left."""
+    ride, reservation = _lock(reservation)
+
+    if reservation.status == Reservation.Status.CANCELED:
+        return BookingResult(reservation, BookingConflict.RESERVATION_CANCELED)
+    if reservation.status == Reservation.Status.ACCEPTED:
+        return BookingResult(reservation)
+    if ride.is_full:
+        return BookingResult(reservation, BookingConflict.RIDE_FULL)
+
+    reservation.status = Reservation.Status.ACCEPTED
+    reservation.save()
+    ride.rider.add(reservation.user_id)
+
+    send_email_confirmed_ride(reservation.pk)
+    return BookingResult(reservation)
+
+
+@transaction.atomic
+def decline_reservation(reservation):
+    """Decline the reservation and free the seat of its user, if any."""
+    ride, reservation = _lock(reservation)
+
+    if reservation.status == Reservation.Status.CANCELED:
+        return BookingResult(reservation, BookingConflict.RESERVATION_CANCELED)
+
+    reservation.status = Reservation.Status.DECLINED
+    reservation.save()
+    seat_released = _release_seat(ride, reservation)
+
+    send_email_declined_ride(reservation.pk)
+    return BookingResult(reservation, seat_released=seat_released)
+
+
+@transaction.atomic
+def cancel_reservation(reservation):
+    """Cancel the reservation on behalf of its user and free their seat, if any."""
+    ride, reservation = _lock(reservation)
+
+    if reservation.status == Reservation.Status.CANCELED:
+        return BookingResult(reservation, BookingConflict.RESERVATION_CANCELED)
+
+    reservation.status = Reservation.Status.CANCELED
+    reservation.save()
+    seat_released = _release_seat(ride, reservation)
+
+    return BookingResult(reservation, seat_released=seat_released)
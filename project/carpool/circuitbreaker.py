@@ -0,0 +1,82 @@
+"""
+Circuit breaker in front of the geoplateforme APIs, shared by all the
+processes through the default cache (Redis).
+
+Every failed call (network error, timeout or 5xx) increments a counter. When
+``failure_threshold`` calls failed within ``failure_window`` seconds, the
+circuit opens: callers fail fast during ``recovery_timeout`` seconds instead
+of waiting for an upstream which is known to be unhealthy. Then the next
+calls go through again ("half-open"): the first success closes the circuit,
+a single failure opens it again.
+"""
+
+import time
+
+from django.core.cache import cache
+
+from carpool import metrics
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self, name, failure_threshold=5, recovery_timeout=30, failure_window=60
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_window = failure_window
+        self.failures_key = f"carpool:circuit:{name}:failures"
+        self.open_key = f"carpool:circuit:{name}:open_until"
+
+    def is_open(self):
+        open_until = cache.get(self.open_key)
+        return open_until is not None and open_until > time.time()
+
+    def check(self):
+        """Raise ``CircuitOpenError`` if the upstream should not be called."""
+        if self.is_open():
+            metrics.incr(f"circuit_{self.name}_rejected")
+            raise CircuitOpenError(f"The {self.name} circuit is open")
+
+    def record_success(self):
+        cache.delete_many([self.failures_key, self.open_key])
+
+    def record_failure(self):
+        if cache.add(self.failures_key, 1, timeout=self.failure_window):
+            failures = 1
+        else:
+            try:
+                failures = cache.incr(self.failures_key)
+            except ValueError:
+                # Expired in between
+                failures = 1
+                cache.set(self.failures_key, 1, timeout=self.failure_window)
+
+        if failures >= self.failure_threshold:
+            cache.set(
+                self.open_key,
+                time.time() + self.recovery_timeout,
+                timeout=self.recovery_timeout,
+            )
+            # Half-open afterwards: the next failure opens the circuit again
+            cache.set(
+                self.failures_key,
+                self.failure_threshold - 1,
+                timeout=self.recovery_timeout + self.failure_window,
+            )
+            metrics.incr(f"circuit_{self.name}_opened")
+
+    def stats(self):
+        return {
+            "open": self.is_open(),
+            **metrics.get_counters(
+                f"circuit_{self.name}_opened", f"circuit_{self.name}_rejected"
+            ),
+        }
+
+    def reset_stats(self):
+        metrics.reset(f"circuit_{self.name}_opened", f"circuit_{self.name}_rejected")
@@ -0,0 +1,80 @@
+"""
+Cache of the geoplateforme autocompletion results.
+
+Queries are normalized (case and spaces) so that every user typing the same
+address shares the same entries. The cache backend is responsible for the
+TTL and the eviction (see the ``completion`` cache in the settings).
+
+When ``COMPLETION_CACHE_PREFIX_FILTERING`` is enabled, a query can also be
+answered from the results of one of its prefixes, as long as these results
+were not truncated by the API.
+"""
+
+import hashlib
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+
+from carpool import metrics
+
+# Number of results returned by the completion API, a shorter list is complete
+API_MAX_RESULTS = 10
+
+# Shorter prefixes match too many addresses to be useful
+MIN_PREFIX_LENGTH = 3
+
+HITS = "completion_hits"
+MISSES = "completion_misses"
+
+
+def normalize_query(text):
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+def _cache():
+    return caches["completion"]
+
+
+def _key(query):
+    return "carpool:completion:" + hashlib.md5(query.encode()).hexdigest()
+
+
+def _matches(result, query):
+    fulltext = normalize_query(result["fulltext"])
+    return all(word in fulltext for word in query.split())
+
+
+def get_cached(query):
+    """Return the cached results of the normalized ``query``, or ``None``."""
+    cache = _cache()
+    results = cache.get(_key(query))
+
+    if results is None and settings.COMPLETION_CACHE_PREFIX_FILTERING:
+        prefixes = {
+            _key(query[:length]): query[:length]
+            for length in range(len(query) - 1, MIN_PREFIX_LENGTH - 1, -1)
+        }
+        # One round trip for all the prefixes, the longest one wins
+        cached = cache.get_many(prefixes)
+        for key in prefixes:
+            if key in cached and len(cached[key]) < API_MAX_RESULTS:
+                # The API is fuzzy, ask it rather than answering nothing
+                results = [r for r in cached[key] if _matches(r, query)] or None
+                break
+
+    metrics.incr(MISSES if results is None else HITS)
+    return results
+
+
+def store(query, results):
+    _cache().set(_key(query), results)
+
+
+def stats():
+    counters = metrics.get_counters(HITS, MISSES)
+    return {**counters, "hit_ratio": metrics.ratio(counters[HITS], counters[MISSES])}
+
+
+def reset_stats():
+    metrics.reset(HITS, MISSES)
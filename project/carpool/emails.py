@@ -0,0 +1,167 @@
+"""
+Emails about the rides and the reservations.
+
+They are queued in the outbox (see ``accounts.outbox``), so they should be
+called inside the transaction of the change they are about.
+"""
+
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.translation import gettext as _
+
+from accounts import outbox
+from carpool.models.reservation import Reservation
+from carpool.models.ride import Ride
+
+logger = logging.getLogger(__name__)
+
+
+def send_email_incoming_reservation_to_driver(site_base_url, reservation_pk):
+    """
+    Send an email to the driver when a new reservation is made to a ride
+    """
+    reservation = Reservation.objects.get(pk=reservation_pk)
+
+    # User Notification preferences
+    if not reservation.ride.driver.notification_preferences.ride_status_update_notification:
+        logger.info(
+            f"User {reservation.ride.driver.email} has disabled ride status update notifications."
+        )
+        return
+
+    context = {
+        "driver": reservation.ride.driver,
+        "ride": reservation.ride,
+        "reservation": reservation,
+        "link": site_base_url + reservation.get_chat_request_url(),
+    }
+
+    with translation.override(reservation.ride.driver.preferred_language):
+        subject = "[INSAROULE] " + _(
+            "New reservation for your ride to %(destination)s"
+        ) % {
+            "destination": reservation.ride.end_loc.city,
+        }
+
+        message = render_to_string("rides/emails/incoming_reservation.html", context)
+
+    email = EmailMessage(
+        subject=subject,
+        body=message,
+        to=[reservation.ride.driver.email],
+    )
+
+    email.content_subtype = "html"
+    outbox.enqueue(email)
+
+
+def send_email_confirmed_ride(reservation_pk):
+    """
+    Send an email to the rider when their ride is confirmed by the driver.
+    """
+    reservation = Reservation.objects.get(pk=reservation_pk)
+
+    # User Notification preferences
+    if not reservation.user.notification_preferences.ride_status_update_notification:
+        logger.info(
+            f"User {reservation.user.email} has disabled ride confirmed notifications."
+        )
+        return
+
+    context = {
+        "username": reservation.user.username,
+        "ride": reservation.ride,
+    }
+
+    with translation.override(reservation.user.preferred_language):
+        subject = "[INSAROULE] " + _("Your ride has been confirmed!")
+        message = render_to_string("rides/emails/confirmed_ride.txt", context)
+
+    email = EmailMessage(
+        subject=subject,
+        body=message,
+        to=[reservation.user.email],
+    )
+
+    outbox.enqueue(email)
+    logger.info(f"Queued ride confirmation email to {reservation.user.email}.")
+
+
+def send_email_declined_ride(reservation_pk):
+    """
+    Send an email to the rider when their ride is declined by the driver.
+    """
+    reservation = Reservation.objects.get(pk=reservation_pk)
+
+    # User Notification preferences
+    if not reservation.user.notification_preferences.ride_status_update_notification:
+        logger.info(
+            f"User {reservation.user.email} has disabled ride declined notifications."
+        )
+        return
+
+    context = {
+        "username": reservation.user.username,
+        "ride": reservation.ride,
+    }
+
+    with translation.override(reservation.user.preferred_language):
+        subject = "[INSAROULE] " + _("Your ride has been declined!")
+        message = render_to_string("rides/emails/declined_ride.txt", context)
+
+    email = EmailMessage(
+        subject=subject,
+        body=message,
+        to=[reservation.user.email],
+    )
+
+    outbox.enqueue(email)
+    logger.info(f"Queued ride decline email to {reservation.user.email}.")
+
+
+def send_email_suggest_ride_sharing(ride_pk, similar_rides_pks, requester_pk):
+    """
+    Send an email to the driver suggesting them to share their ride.
+    """
+    ride = Ride.objects.get(pk=ride_pk)
+    similar_rides = Ride.objects.filter(pk__in=similar_rides_pks)
+    requester = get_user_model().objects.get(pk=requester_pk)
+
+    # User Notification preferences
+    if not ride.driver.notification_preferences.ride_sharing_suggestion_notification:
+        logger.info(
+            f"User {ride.driver.email} has disabled ride sharing suggestion notifications."
+        )
+        return
+
+    logger.debug(f"ride: {ride}")
+
+    context = {
+        "driver": ride.driver,
+        "ride": ride,
+        "similar_rides": similar_rides,
+        "requester": requester.first_name
+        if requester.first_name
+        else requester.username,
+    }
+    # Send the email using driver preferred language if available
+
+    with translation.override(ride.driver.preferred_language):
+        subject = "[INSAROULE] " + _("Suggestion to share your ride")
+        message = render_to_string("rides/emails/suggest_ride_sharing.html", context)
+
+    email = EmailMessage(
+        subject=subject,
+        body=message,
+        to=[ride.driver.email],
+    )
+    # email content
+    email.content_subtype = "html"
+    email.reply_to = [requester.email]
+
+    outbox.enqueue(email)
+    logger.info(f"Queued ride sharing suggestion email to {ride.driver.email}.")
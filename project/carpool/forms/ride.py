@@ -25,6 +25,8 @@ StopOverFormSet = forms.formset_factory(
 
 class EditRideForm(forms.ModelForm):
     duration = forms.FloatField(required=False, widget=forms.HiddenInput())
+    # Distance of the route in kilometers, as given by the routing API
+    distance = forms.FloatField(required=False, min_value=0, widget=forms.HiddenInput())
 
     class Meta:
         model = Ride
@@ -58,6 +60,7 @@ class EditRideForm(forms.ModelForm):
             if "initial" not in kwargs:
                 kwargs["initial"] = {}
             kwargs["initial"]["geometry"] = instance.geometry.geojson
+            kwargs["initial"]["distance"] = instance.distance_km
 
         # Set initial value for start_dt field
         if instance and instance.start_dt:
@@ -189,6 +192,8 @@ class EditRideForm(forms.ModelForm):
         # Update ride fields
         ride.geometry = self.cleaned_data["geometry"]
         ride.duration = self.cleaned_data["duration"]
+        # Computed from the geometry on save if the route has no distance
+        ride.distance_km = self.cleaned_data["distance"]
         ride.start_dt = self.cleaned_data["start_dt"]
         ride.end_dt = ride.start_dt + ride.duration
         ride.price = self.cleaned_data["price"]
@@ -203,6 +208,9 @@ class EditRideForm(forms.ModelForm):
 class CreateRideStep1Form(forms.Form):
     r_geometry = forms.CharField(required=True, widget=forms.HiddenInput())
     r_duration = forms.FloatField(required=True, widget=forms.HiddenInput())
+    r_distance = forms.FloatField(
+        required=False, min_value=0, widget=forms.HiddenInput()
+    )
     payment_method = forms.MultipleChoiceField(
         required=False,
         choices=Ride.PaymentMethod.choices,
@@ -0,0 +1,85 @@
+"""
+PostGIS expressions that are not provided by GeoDjango out of the box.
+
+They are used by the ride search (see ``RideQuerySet``) and are written so that
+the database can answer them with the spatial indexes declared on ``Ride``.
+"""
+
+import math
+
+from django.contrib.gis.db.models import LineStringField, PointField
+from django.contrib.gis.geos import Polygon
+from django.db.models import BooleanField, FloatField, Func, Value
+from django.db.models.functions import Cast
+
+
+# Length of one degree of latitude, in meters. Slightly underestimated so that
+# the envelope below is never too small to contain the searched area.
+METERS_PER_DEGREE = 110_000
+
+
+def expanded_envelope(point, meters):
+    """
+    Return the WGS84 bounding box of all the points within ``meters`` of
+    ``point``. Comparing it with ``&&`` (``bboverlaps``) is a cheap prefilter
+    answered by the plain spatial index on the geometry column.
+    """
+    d_lat = meters / METERS_PER_DEGREE
+    # Degrees of longitude shrink towards the poles, use the farthest latitude
+    max_lat = min(abs(point.y) + d_lat, 89.0)
+    d_lng = meters / (METERS_PER_DEGREE * math.cos(math.radians(max_lat)))
+    envelope = Polygon.from_bbox(
+        (point.x - d_lng, point.y - d_lat, point.x + d_lng, point.y + d_lat)
+    )
+    envelope.srid = 4326
+    return envelope
+
+
+def as_geography(expression):
+    """
+    Cast a WGS84 linestring expression to ``geography`` so that distances are
+    expressed in meters. The exact same expression is used by the functional
+    GiST index on ``Ride``, which is what allows PostgreSQL to use it.
+    """
+    return Cast(expression, output_field=LineStringField(geography=True, srid=4326))
+
+
+class GeographyDWithin(Func):
+    """
+    ``ST_DWithin(geometry::geography, point::geography, meters)``
+
+    Boolean expression that can be passed directly to ``QuerySet.filter()``.
+    Unlike annotating a ``Distance`` and filtering on it, this is sargable:
+    PostGIS expands it to an index-assisted ``&&`` check before computing the
+    exact distance.
+    """
+
+    function = "ST_DWithin"
+    output_field = BooleanField()
+
+    def __init__(self, expression, point, meters, **extra):
+        super().__init__(
+            as_geography(expression),
+            Value(point, output_field=PointField(geography=True, srid=4326)),
+            Value(float(meters)),
+            **extra,
+        )
+
+
+class LineLocatePoint(Func):
+    """
+    ``ST_LineLocatePoint(line, point)``
+
+    Return the position (between 0 and 1) along the line of the closest point
+    to the given point. Used to check the direction of a ride.
+    """
+
+    function = "ST_LineLocatePoint"
+    output_field = FloatField()
+
+    def __init__(self, expression, point, **extra):
+        super().__init__(
+            expression,
+            Value(point, output_field=PointField(srid=4326)),
+            **extra,
+        )
@@ -0,0 +1,88 @@
+"""
+Local autocompletion over the existing ``Location`` rows.
+
+Every departure, arrival and stopover ever used is a ``Location``: they are
+matched with the pg_trgm word similarity operator (answered by the trigram
+indexes on ``Location``) and ranked by the number of rides using them. The
+remote API is only called when there are not enough local suggestions.
+"""
+
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from carpool.geoplateforme import suggestion
+from carpool.models import Location, Step
+from carpool.models.ride import Ride
+
+# Number of suggestions shown by the front-end
+MAX_SUGGESTIONS = 10
+
+# Below this number of local suggestions, the remote API is called too
+MIN_LOCAL_SUGGESTIONS = 3
+
+# Trigrams of shorter queries match almost anything
+MIN_QUERY_LENGTH = 3
+
+
+def _count(queryset, field):
+    """Number of rows of ``queryset`` referencing the outer location."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def suggest(query, limit=MAX_SUGGESTIONS):
+    """
+    Return the suggestions of the known locations matching the normalized
+    ``query``, the most used first, in the shape of ``get_autocompletion``.
+    """
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+
+    locations = (
+        Location.objects.filter(
+            Q(fulltext__trigram_word_similar=query)
+            | Q(city__trigram_word_similar=query)
+            | Q(zipcode__startswith=query)
+        )
+        .annotate(
+            usage=_count(Ride.objects, "start_loc")
+            + _count(Ride.objects, "end_loc")
+            + _count(Step.objects, "location")
+        )
+        .order_by("-usage", "fulltext")
+    )
+
+    # The same address may be stored several times, keep the most used one
+    suggestions = {}
+    for location in locations[: limit * 3]:
+        key = location.fulltext.casefold()
+        if key not in suggestions:
+            suggestions[key] = suggestion(
+                location.fulltext,
+                location.lng,
+                location.lat,
+                street=location.street,
+                city=location.city,
+                zipcode=location.zipcode,
+            )
+    return list(suggestions.values())[:limit]
+
+
+def is_enough(local_suggestions):
+    return len(local_suggestions) >= MIN_LOCAL_SUGGESTIONS
+
+
+def merge(local_suggestions, remote_suggestions, limit=MAX_SUGGESTIONS):
+    """Local suggestions first, then the remote ones not already suggested."""
+    known = {s["fulltext"].casefold() for s in local_suggestions}
+    remote = [s for s in remote_suggestions if s["fulltext"].casefold() not in known]
+    return (local_suggestions + remote)[:limit]
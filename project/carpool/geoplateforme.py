@@ -0,0 +1,212 @@
+"""
+Clients of the IGN geoplateforme APIs (data.geopf.fr).
+
+The Celery tasks ``get_autocompletion`` and ``get_routing`` call the APIs with
+``requests``. The async views can instead call them in-process (see
+``GEOPLATEFORME_IN_PROCESS``) through a shared ``httpx.AsyncClient``, which
+keeps its connections alive between requests, without going through the
+broker, a worker and the result backend. The task rate limits are then
+enforced locally, per process, with a token bucket.
+
+Both ways go through the same circuit breaker for the routing API, which is
+the slow one: while it is unhealthy, routes are not requested at all.
+
+API docs:
+https://geoservices.ign.fr/documentation/services/services-geoplateforme/autocompletion
+https://geoservices.ign.fr/documentation/services/services-geoplateforme/itineraire
+"""
+
+import asyncio
+import time
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from carpool.circuitbreaker import CircuitBreaker
+
+COMPLETION_API_URL = "https://data.geopf.fr/geocodage/completion/"
+
+COMPLETION_OPTIONS = {
+    "terr": "METROPOLE",
+    "type": "StreetAddress",
+}
+
+ROUTING_API_URL = "https://data.geopf.fr/navigation/itineraire"
+
+# Parameters of every routing request, they are part of the route cache key
+# (see carpool.routes)
+ROUTING_OPTIONS = {
+    "resource": "bdtopo-osrm",
+    "profile": "car",
+    "optimization": "fastest",
+    "geometryFormat": "geojson",
+    "getSteps": "true",
+    "getBbox": "true",
+    "distanceUnit": "kilometer",
+    "timeUnit": "hour",
+    "crs": "EPSG:4326",
+}
+
+# The views give up after this delay, whatever the mode
+REQUEST_TIMEOUT = 5  # seconds
+
+routing_circuit = CircuitBreaker(
+    "routing",
+    failure_threshold=settings.ROUTING_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_timeout=settings.ROUTING_CIRCUIT_RECOVERY_TIMEOUT,
+)
+
+
+def completion_params(query):
+    return {**COMPLETION_OPTIONS, "text": query}
+
+
+def routing_params(start, end, intermediates):
+    return {
+        **ROUTING_OPTIONS,
+        "start": start,
+        "end": end,
+        "intermediates": "|".join(intermediates) if intermediates else None,
+    }
+
+
+def suggestion(fulltext, x, y, street="", city="", zipcode=""):
+    """
+    Autocompletion suggestion as expected by the front-end. ``x`` and ``y``
+    are the longitude and latitude, as named by the API; the front-end reads
+    the coordinates from ``value``.
+    """
+    return {
+        "fulltext": fulltext,
+        "value": f"{y}/{x}",
+        "customProperties": {
+            "street": street,
+            "city": city,
+            "zipcode": zipcode,
+            "latitude": x,
+            "longitude": y,
+        },
+    }
+
+
+def parse_completion(data, query):
+    """Turn a completion API response into the suggestions of the front-end."""
+    result = []
+    for geocoding_result in (data or {}).get("results") or []:
+        content = suggestion(
+            geocoding_result["fulltext"],
+            geocoding_result["x"],
+            geocoding_result["y"],
+            street=geocoding_result.get("street", ""),
+            city=geocoding_result.get("city", ""),
+            zipcode=geocoding_result.get("zipcode", ""),
+        )
+
+        # Prioritize exact city results matching the query
+        if geocoding_result.get("street", "") == "" and geocoding_result.get(
+            "city", ""
+        ).lower().startswith(query.lower()):
+            result.insert(0, content)
+        else:
+            result.append(content)
+    return result
+
+
+def parse_rate(rate):
+    """Parse a Celery rate limit (``"50/s"``, ``"10/m"``, ...) in calls/second."""
+    count, _, unit = rate.partition("/")
+    return float(count) / {"s": 1, "m": 60, "h": 3600}[unit or "s"]
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: up to ``capacity`` calls at once, then ``rate``
+    calls per second.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        self._refill()
+        # Reserve the token now, concurrent callers queue up behind it
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+# One client and one pair of buckets per event loop: they cannot be shared
+# between loops, e.g. when async views are run by a WSGI server.
+_loop_state = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    if loop not in _loop_state:
+        _loop_state[loop] = {
+            "client": httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=20,
+                    max_keepalive_connections=10,
+                    keepalive_expiry=60,
+                ),
+            ),
+            "completion": TokenBucket(parse_rate(settings.GEOCODAGE_TASK_RATE_LIMIT)),
+            "routing": TokenBucket(parse_rate(settings.ROUTING_TASK_RATE_LIMIT)),
+        }
+    return _loop_state[loop]
+
+
+async def autocomplete(query):
+    """
+    Same as the ``get_autocompletion`` task, raise ``httpx.HTTPError`` if
+    the API cannot be reached.
+    """
+    state = _state()
+    await state["completion"].acquire()
+    r = await state["client"].get(COMPLETION_API_URL, params=completion_params(query))
+    if r.status_code != 200:
+        return []
+    return parse_completion(r.json(), query)
+
+
+async def route(start, end, intermediates):
+    """
+    Same as the ``get_routing`` task but without retries, raise
+    ``httpx.HTTPError`` if the API cannot be reached and ``CircuitOpenError``
+    if it is known to be unhealthy.
+    """
+    await sync_to_async(routing_circuit.check)()
+    state = _state()
+    await state["routing"].acquire()
+    params = routing_params(start, end, intermediates)
+    # httpx sends empty values, requests drops None ones
+    params = {key: value for key, value in params.items() if value is not None}
+    try:
+        r = await state["client"].get(ROUTING_API_URL, params=params)
+    except httpx.HTTPError:
+        await sync_to_async(routing_circuit.record_failure)()
+        raise
+    if r.status_code >= 500:
+        await sync_to_async(routing_circuit.record_failure)()
+    elif r.status_code == 200:
+        await sync_to_async(routing_circuit.record_success)()
+    if r.status_code != 200:
+        return {
+            "error": "Failed to fetch routing information",
+            "status_code": r.status_code,
+            "details": r.text,
+        }
+    return r.json()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from carpool.models.ride import Ride
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the distance of the rides saved without one, from their "
+        "geometry, by chunks of rides."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rides updated by each query",
+        )
+
+    def handle(self, *args, **options):
+        missing = Ride.objects.filter(
+            distance_km__isnull=True, geometry__isnull=False
+        ).order_by("pk")
+        filled = 0
+        last_pk = None
+        # Short transactions, the rides are not locked for the whole backfill
+        while True:
+            chunk = missing if last_pk is None else missing.filter(pk__gt=last_pk)
+            pks = list(chunk.values_list("pk", flat=True)[: options["chunk_size"]])
+            if not pks:
+                break
+            filled += Ride.objects.filter(pk__in=pks).fill_distance()
+            last_pk = pks[-1]
+            self.stdout.write(f"{filled} ride(s) updated...")
+
+        self.stdout.write(self.style.SUCCESS(f"Distance of {filled} ride(s) computed."))
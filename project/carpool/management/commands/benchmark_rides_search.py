@@ -0,0 +1,120 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import LineString, Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from carpool.models import Vehicle
+from carpool.models.ride import Ride
+
+# Rough bounding box of metropolitan France (lng, lat)
+MIN_LNG, MAX_LNG = -4.5, 7.5
+MIN_LAT, MAX_LAT = 43.0, 50.5
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the rides search (departure and arrival filters) on a large "
+        "number of synthetic upcoming rides. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rides", type=int, default=100_000)
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            default=50.0,
+            help="Fail if the median search time is above this budget.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            routes = self.create_rides(rng, options["rides"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE carpool_ride")
+
+            timings = []
+            for _ in range(options["runs"]):
+                route = rng.choice(routes)
+                departure = Point(route[1], srid=4326)
+                arrival = Point(route[-2], srid=4326)
+
+                start = time.perf_counter()
+                rides = list(
+                    Ride.objects.filter_upcoming()
+                    .passing_near(departure)
+                    .heading_to(arrival, departure=departure)
+                    .order_by("start_dt")[:8]
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+
+                if not rides:
+                    raise CommandError("The search did not return the searched ride.")
+
+            transaction.set_rollback(True)
+
+        timings.sort()
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{options['rides']} rides, {options['runs']} runs: "
+            f"median={median:.1f}ms p95={p95:.1f}ms max={timings[-1]:.1f}ms"
+        )
+
+        if median > options["budget_ms"]:
+            raise CommandError(
+                f"Median search time {median:.1f}ms is above the budget "
+                f"of {options['budget_ms']:.1f}ms."
+            )
+        self.stdout.write(self.style.SUCCESS("Rides search is within budget."))
+
+    def create_rides(self, rng, count, batch_size=5000):
+        """Create ``count`` upcoming rides with random straight-ish routes."""
+        driver = get_user_model().objects.create(
+            username="benchmark-driver", email="benchmark-driver@example.com"
+        )
+        vehicle = Vehicle.objects.create(driver=driver, seats=4)
+        now = timezone.now()
+
+        routes = []
+        batch = []
+        for _ in range(count):
+            start = (rng.uniform(MIN_LNG, MAX_LNG), rng.uniform(MIN_LAT, MAX_LAT))
+            end = (
+                start[0] + rng.uniform(-1.5, 1.5),
+                start[1] + rng.uniform(-1.5, 1.5),
+            )
+            route = [
+                (
+                    start[0] + (end[0] - start[0]) * i / 10 + rng.uniform(-0.01, 0.01),
+                    start[1] + (end[1] - start[1]) * i / 10 + rng.uniform(-0.01, 0.01),
+                )
+                for i in range(11)
+            ]
+            routes.append(route)
+
+            start_dt = now + timezone.timedelta(minutes=rng.randint(60, 60 * 24 * 60))
+            batch.append(
+                Ride(
+                    driver=driver,
+                    vehicle=vehicle,
+                    seats_offered=3,
+                    start_dt=start_dt,
+                    end_dt=start_dt + timezone.timedelta(hours=2),
+                    duration=timezone.timedelta(hours=2),
+                    geometry=LineString(route, srid=4326),
+                )
+            )
+            if len(batch) >= batch_size:
+                Ride.objects.bulk_create(batch)
+                batch = []
+        Ride.objects.bulk_create(batch)
+        return routes
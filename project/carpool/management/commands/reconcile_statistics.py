@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from carpool import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the statistics, maintained incrementally, with a full "
+        "recompute over all the rides."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Replace the statistics by the recomputed ones if they differ",
+        )
+
+    def handle(self, *args, **options):
+        differences = stats.reconcile(fix=options["fix"])
+        if not differences:
+            self.stdout.write(self.style.SUCCESS("The statistics are up to date."))
+            return
+
+        for period, field, stored, expected in differences:
+            period = "global" if period is None else "{}-{:02d}".format(*period)
+            self.stdout.write(f"{period} {field}: {stored} (expected {expected})")
+        if options["fix"]:
+            self.stdout.write(self.style.SUCCESS("The statistics have been fixed."))
+        else:
+            self.stdout.write(self.style.WARNING("Run with --fix to fix them."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from carpool.models.ride import Ride
+
+
+class Command(BaseCommand):
+    help = "Recompute Ride.booked_seats for the rides where it drifted from the riders."
+
+    def handle(self, *args, **options):
+        repaired = Ride.objects.repair_booked_seats()
+        if repaired:
+            self.stdout.write(
+                self.style.WARNING(f"Repaired the booked seats of {repaired} ride(s).")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("No booked seats drift found."))
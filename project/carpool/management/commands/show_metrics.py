@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from carpool import completion, routes, singleflight
+from carpool.geoplateforme import routing_circuit
+
+
+class Command(BaseCommand):
+    help = "Show the counters of the caches in front of the geoplateforme APIs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters after showing them"
+        )
+
+    def show(self, name, stats):
+        values = []
+        for key, value in stats.items():
+            if key.endswith("_ratio"):
+                value = "n/a" if value is None else f"{value:.1%}"
+            values.append(f"{key}={value}")
+        self.stdout.write(f"{name}: {' '.join(values)}")
+
+    def handle(self, *args, **options):
+        self.show("Autocompletion cache", completion.stats())
+        self.show("Routing cache", routes.stats())
+        self.show("Request coalescing", singleflight.stats())
+        self.show("Routing circuit breaker", routing_circuit.stats())
+
+        if options["reset"]:
+            completion.reset_stats()
+            routes.reset_stats()
+            singleflight.reset_stats()
+            routing_circuit.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
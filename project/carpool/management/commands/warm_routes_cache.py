@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from carpool import routes
+from carpool.models.ride import Ride
+from carpool.tasks import get_routing
+
+
+class Command(BaseCommand):
+    help = "Route the most frequent departure/arrival pairs into the route cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Number of departure/arrival pairs to route (default: 50)",
+        )
+
+    def handle(self, *args, **options):
+        # Locations are duplicated between rides, group them by coordinates
+        pairs = (
+            Ride.objects.filter(start_loc__isnull=False, end_loc__isnull=False)
+            .values("start_loc__lng", "start_loc__lat", "end_loc__lng", "end_loc__lat")
+            .annotate(rides=Count("pk"))
+            .order_by("-rides")[: options["limit"]]
+        )
+
+        routed = failed = 0
+        for pair in pairs:
+            start = f"{pair['start_loc__lng']},{pair['start_loc__lat']}"
+            end = f"{pair['end_loc__lng']},{pair['end_loc__lat']}"
+            if routes.is_cached(start, end, []):
+                continue
+            # Called in-process and one at a time, not to flood the API
+            route = get_routing(start, end, [])
+            if "error" in route:
+                failed += 1
+                continue
+            routes.store(start, end, [], route)
+            routed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Routed {routed} pair(s), {failed} failure(s).")
+        )
@@ -0,0 +1,35 @@
+"""
+Counters shared by all the processes, stored in the default cache.
+
+They are meant to follow the efficiency of the caches in front of the
+geoplateforme APIs, see the ``show_metrics`` management command.
+"""
+
+from django.core.cache import cache
+
+KEY_PREFIX = "carpool:metrics:"
+
+
+def incr(name, delta=1):
+    key = KEY_PREFIX + name
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # First increment: add() does not overwrite a concurrent first one
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def get_counters(*names):
+    values = cache.get_many([KEY_PREFIX + name for name in names])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in names}
+
+
+def ratio(hits, misses):
+    """Hit ratio between 0 and 1, or None before the first call."""
+    total = hits + misses
+    return hits / total if total else None
+
+
+def reset(*names):
+    cache.delete_many([KEY_PREFIX + name for name in names])
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 09:12
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0011_alter_ride_payment_method"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ride",
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    "geometry",
+                    output_field=django.contrib.gis.db.models.fields.LineStringField(
+                        geography=True, srid=4326
+                    ),
+                ),
+                name="carpool_ride_geog_gist",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def compute_booked_seats(apps, schema_editor):
+    Ride = apps.get_model("carpool", "Ride")
+    riders_count = Subquery(
+        Ride.rider.through.objects.filter(ride=OuterRef("pk"))
+        .order_by()
+        .values("ride")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Ride.objects.update(booked_seats=Coalesce(riders_count, 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0012_ride_carpool_ride_geog_gist"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ride",
+            name="booked_seats",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of seats booked by riders",
+                verbose_name="booked seats",
+            ),
+        ),
+        migrations.RunPython(compute_booked_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0013_ride_booked_seats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ride",
+            index=models.Index(
+                fields=["start_dt", "uuid"], name="carpool_ride_start_uuid_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0014_ride_carpool_ride_start_uuid_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ride",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                help_text="Date and time of the last modification of the ride",
+                verbose_name="updated at",
+            ),
+            preserve_default=False,
+        ),
+    ]
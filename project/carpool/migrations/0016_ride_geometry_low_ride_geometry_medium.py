@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 14:10
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0015_ride_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ride",
+            name="geometry_low",
+            field=django.contrib.gis.db.models.fields.LineStringField(
+                blank=True,
+                editable=False,
+                null=True,
+                spatial_index=False,
+                srid=4326,
+                verbose_name="low resolution geometry",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ride",
+            name="geometry_medium",
+            field=django.contrib.gis.db.models.fields.LineStringField(
+                blank=True,
+                editable=False,
+                null=True,
+                spatial_index=False,
+                srid=4326,
+                verbose_name="medium resolution geometry",
+            ),
+        ),
+        # Same tolerances as Ride.GEOMETRY_LEVELS
+        migrations.RunSQL(
+            "UPDATE carpool_ride SET "
+            "geometry_low = ST_SimplifyPreserveTopology(geometry, 0.005), "
+            "geometry_medium = ST_SimplifyPreserveTopology(geometry, 0.0005) "
+            "WHERE geometry IS NOT NULL",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
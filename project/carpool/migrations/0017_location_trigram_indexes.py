@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 15:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0016_ride_geometry_low_ride_geometry_medium"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="location",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["fulltext"],
+                name="carpool_location_fulltext_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="location",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["city"],
+                name="carpool_location_city_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:30
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0017_location_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="statistics",
+            name="rides_watermark",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="RideFact",
+            fields=[
+                (
+                    "ride",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="fact",
+                        serialize=False,
+                        to="carpool.ride",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                (
+                    "month",
+                    models.IntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(12),
+                        ]
+                    ),
+                ),
+                ("distance_km", models.FloatField(default=0.0)),
+                ("rider_count", models.PositiveIntegerField(default=0)),
+                ("co2_kg", models.FloatField(default=0.0)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Ride fact",
+                "verbose_name_plural": "Ride facts",
+            },
+        ),
+    ]
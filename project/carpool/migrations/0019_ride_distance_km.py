@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0018_statistics_rides_watermark_ridefact"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ride",
+            name="distance_km",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Distance of the ride in kilometers",
+                null=True,
+                verbose_name="distance (km)",
+            ),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -43,6 +44,21 @@ class Location(models.Model):
         validators=[MinValueValidator(-180), MaxValueValidator(180)],
     )
 
+    class Meta:
+        indexes = [
+            # Trigram indexes of the local autocompletion (carpool.gazetteer)
+            GinIndex(
+                fields=["fulltext"],
+                opclasses=["gin_trgm_ops"],
+                name="carpool_location_fulltext_trgm",
+            ),
+            GinIndex(
+                fields=["city"],
+                opclasses=["gin_trgm_ops"],
+                name="carpool_location_city_trgm",
+            ),
+        ]
+
     def __str__(self):
         return (
             f"Location({self.fulltext if self.fulltext else f'{self.lat}, {self.lng}'})"
@@ -1,16 +1,148 @@
+import datetime
+import math
 from uuid import uuid4
 
+from django.conf import settings
 from django.contrib.gis.db import models
+from django.contrib.gis.db.models.functions import Length
+from django.contrib.postgres.indexes import GistIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db.models import Q
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from multiselectfield import MultiSelectField
 
+from carpool.functions import (
+    GeographyDWithin,
+    LineLocatePoint,
+    as_geography,
+    expanded_envelope,
+)
 
-class RideManager(models.Manager):
+# A distance sent along a route is replaced by the length of its geometry when
+# it is further than this factor from it (the distance is sent by the browser).
+DISTANCE_TOLERANCE = 1.5
+
+
+class RideQuerySet(models.QuerySet):
+    def passing_near(self, point, distance_km=None):
+        """
+        Filter rides whose route passes within ``distance_km`` of ``point``.
+
+        The bounding box check is answered by the spatial index on
+        ``geometry``, and the exact ``ST_DWithin`` on geography by the
+        functional index declared below, so no distance is computed for rides
+        that are far away.
+        """
+        if distance_km is None:
+            distance_km = settings.RIDES_SEARCH_RADIUS_KM
+        meters = distance_km * 1000
+        return self.filter(
+            GeographyDWithin("geometry", point, meters),
+            geometry__bboverlaps=expanded_envelope(point, meters),
+        )
+
+    def heading_to(self, arrival, departure=None, distance_km=None):
+        """
+        Filter rides whose route passes near ``arrival``.
+
+        When ``departure`` is given, the route must reach the departure point
+        *before* the arrival point, so that rides going the other way are
+        excluded. Proximity to the departure is checked by ``passing_near``.
+        """
+        rides = self.passing_near(arrival, distance_km)
+        if departure is None:
+            return rides
+        return rides.alias(
+            departure_position=LineLocatePoint("geometry", departure),
+            arrival_position=LineLocatePoint("geometry", arrival),
+        ).filter(departure_position__lt=F("arrival_position"))
+
+    def starting_on(self, day):
+        """
+        Filter rides starting on the given local day, with a range on
+        ``start_dt`` that can use its index.
+        """
+        start_of_day = timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time.min)
+        )
+        return self.filter(
+            start_dt__gte=start_of_day,
+            start_dt__lt=start_of_day + datetime.timedelta(days=1),
+        )
+
+    def repair_booked_seats(self):
+        """
+        Recompute ``booked_seats`` from the riders for the rides where the
+        counter drifted (e.g. rows removed outside of the ORM).
+        Return the number of repaired rides.
+        """
+        riders_count = Coalesce(
+            Subquery(
+                self.model.rider.through.objects.filter(ride=OuterRef("pk"))
+                .order_by()
+                .values("ride")
+                .annotate(count=Count("*"))
+                .values("count")
+            ),
+            0,
+        )
+        drifted = self.alias(riders_count=riders_count).exclude(
+            booked_seats=F("riders_count")
+        )
+        return self.model.objects.filter(pk__in=drifted.values("pk")).update(
+            booked_seats=riders_count
+        )
+
+    def release_booked_seats(self, users):
+        """
+        Release the seats booked by ``users`` (pks or a queryset) about to be
+        deleted, their riders rows being removed without m2m signals.
+        Return the number of updated rides.
+        """
+        booked = Subquery(
+            self.model.rider.through.objects.filter(ride=OuterRef("pk"), user__in=users)
+            .order_by()
+            .values("ride")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        rides = self.filter(rider__in=users).values("pk")
+        return self.model.objects.filter(pk__in=rides).update(
+            booked_seats=Greatest(F("booked_seats") - booked, 0),
+            updated_at=timezone.now(),
+        )
+
+    def fill_distance(self, replace_implausible=False):
+        """
+        Compute ``distance_km`` from the geometry, on the spheroid, for the
+        rides which have a geometry but no distance, or with
+        ``replace_implausible`` a distance too far from the geometry length.
+        Return the number of updated rides.
+        """
+        length = ExpressionWrapper(
+            Length("geometry", spheroid=True) / 1000.0, output_field=FloatField()
+        )
+        wrong = Q(distance_km__isnull=True)
+        if replace_implausible:
+            wrong |= Q(distance_km__lt=length / DISTANCE_TOLERANCE) | Q(
+                distance_km__gt=length * DISTANCE_TOLERANCE
+            )
+        return self.filter(wrong, geometry__isnull=False).update(distance_km=length)
+
+
+class RideManager(models.Manager.from_queryset(RideQuerySet)):
     def count_shared_ride(self, user1, user2):
         """Return the number of rides shared between two users.
         A ride is "shared" if:
@@ -33,7 +165,7 @@ class RideManager(models.Manager):
 
     def safe_delete(self, ride) -> bool:
         """Soft delete rides delete the ride only if has no riders or if the ride has ended."""
-        if ride.rider.count() == 0 or ride.has_ended:
+        if ride.booked_seats == 0 or ride.has_ended:
             ride.delete()
             return True
         return False
@@ -44,9 +176,12 @@ class RideManager(models.Manager):
         An upcoming ride is defined as a ride that starts today or in the future.
         (date part only, time is ignored)
         """
-        return self.filter(
-            start_dt__date__gte=timezone.now().date(),
+        # Compare with the start of the day rather than on start_dt__date, so
+        # that the index on start_dt can be used.
+        start_of_today = timezone.make_aware(
+            datetime.datetime.combine(timezone.localdate(), datetime.time.min)
         )
+        return self.filter(start_dt__gte=start_of_today)
 
 
 class Ride(models.Model):
@@ -167,6 +302,26 @@ class Ride(models.Model):
         default=None,
     )
 
+    # Simplified copies of ``geometry`` sent to the maps at low zoom levels,
+    # see GEOMETRY_LEVELS. They are computed on save.
+    geometry_low = models.LineStringField(
+        verbose_name=_("low resolution geometry"),
+        srid=4326,
+        null=True,
+        blank=True,
+        editable=False,
+        spatial_index=False,
+    )
+
+    geometry_medium = models.LineStringField(
+        verbose_name=_("medium resolution geometry"),
+        srid=4326,
+        null=True,
+        blank=True,
+        editable=False,
+        spatial_index=False,
+    )
+
     duration = models.DurationField(
         verbose_name=_("duration"),
         help_text=_("Duration of the ride"),
@@ -174,29 +329,121 @@ class Ride(models.Model):
         blank=True,
     )
 
+    # Length of the route, as given by the routing service when the ride is
+    # created or edited, otherwise computed from ``geometry`` on save.
+    distance_km = models.FloatField(
+        verbose_name=_("distance (km)"),
+        help_text=_("Distance of the ride in kilometers"),
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+
     comment = models.TextField(
         verbose_name=_("comment"),
         help_text=_("Comment from the driver about the ride"),
         blank=True,
     )
 
+    # Denormalized number of riders, kept in sync by carpool.signals so that
+    # seat availability can be read without counting the riders.
+    booked_seats = models.PositiveIntegerField(
+        verbose_name=_("booked seats"),
+        help_text=_("Number of seats booked by riders"),
+        default=0,
+        editable=False,
+    )
+
+    updated_at = models.DateTimeField(
+        verbose_name=_("updated at"),
+        help_text=_("Date and time of the last modification of the ride"),
+        auto_now=True,
+    )
+
     objects = RideManager()
 
+    # (field, maximum zoom level, simplification tolerance in degrees): the
+    # tolerance is about one pixel at the maximum zoom level of the field.
+    # Above the last level, the full geometry is used.
+    GEOMETRY_LEVELS = (
+        ("geometry_low", 8, 0.005),
+        ("geometry_medium", 11, 0.0005),
+    )
+
+    @classmethod
+    def geometry_field_for_zoom(cls, zoom):
+        """Name of the geometry field to display at the given zoom level."""
+        for field, max_zoom, _tolerance in cls.GEOMETRY_LEVELS:
+            if zoom <= max_zoom:
+                return field
+        return "geometry"
+
+    def geometry_for_zoom(self, zoom=None):
+        """
+        Return the geometry to display at the given zoom level, by default at
+        the zoom level showing the whole route on a regular screen.
+        """
+        if self.geometry is None:
+            return None
+        if zoom is None:
+            xmin, ymin, xmax, ymax = self.geometry.extent
+            span = max(xmax - xmin, ymax - ymin, 1e-6)
+            # A 1024px wide map shows 4 tiles of 256px
+            zoom = math.floor(math.log2(360 / span)) + 2
+        field = self.geometry_field_for_zoom(zoom)
+        return getattr(self, field) or self.geometry
+
+    def simplify_geometry(self):
+        """Refresh the simplified copies of ``geometry``."""
+        for field, _max_zoom, tolerance in self.GEOMETRY_LEVELS:
+            simplified = None
+            if self.geometry is not None:
+                simplified = self.geometry.simplify(tolerance, preserve_topology=True)
+                simplified.srid = self.geometry.srid
+            setattr(self, field, simplified)
+
     @property
     def has_ended(self):
         return self.end_dt and self.end_dt < timezone.now()
 
     @property
     def remaining_seats(self):
-        return self.seats_offered - self.rider.count()
+        return self.seats_offered - self.booked_seats
 
     @property
     def is_full(self):
         return self.remaining_seats <= 0
 
-    @property
-    def booked_seats(self):
-        return self.rider.count()
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        geometry_saved = update_fields is None or "geometry" in update_fields
+        if geometry_saved:
+            self.simplify_geometry()
+            if self.geometry is None:
+                self.distance_km = None
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "distance_km",
+                    *(field for field, _zoom, _tolerance in self.GEOMETRY_LEVELS),
+                }
+
+        # booked_seats is only updated atomically (see carpool.signals), never
+        # write back a possibly stale in-memory value of an existing ride.
+        if not self._state.adding and update_fields is None:
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != "booked_seats"
+            ]
+        super().save(*args, **kwargs)
+
+        if geometry_saved and self.geometry is not None:
+            # No distance from the routing service, or not the one of the
+            # route: PostGIS computes it
+            if Ride.objects.filter(pk=self.pk).fill_distance(replace_implausible=True):
+                self.refresh_from_db(fields=["distance_km"])
 
     def get_absolute_url(self):
         return reverse("carpool:detail", kwargs={"pk": self.pk})
@@ -205,6 +452,15 @@ class Ride(models.Model):
         permissions = [
             ("view_ride_statistics", "Can view ride statistics"),
         ]
+        indexes = [
+            # The default spatial index on ``geometry`` cannot be used by
+            # distance queries in meters, which need the geography type.
+            GistIndex(as_geography("geometry"), name="carpool_ride_geog_gist"),
+            # Ordering key of the rides list keyset pagination
+            models.Index(
+                fields=["start_dt", "uuid"], name="carpool_ride_start_uuid_idx"
+            ),
+        ]
 
     def clean(self):
         # Check that seats_oferred is lower or equal to vehicle.seats
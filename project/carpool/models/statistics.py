@@ -20,6 +20,9 @@ class Statistics(models.Model):
     total_distance = models.FloatField(default=0.0)
     total_co2 = models.FloatField(default=0.0)
 
+    # Rides updated since then are not counted yet, see carpool.stats
+    rides_watermark = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         verbose_name = _("Statistic")
         verbose_name_plural = _("Statistics")
@@ -61,3 +64,36 @@ class MonthlyStatistics(models.Model):
         unique_together = ("month", "year")
         verbose_name = _("Monthly statistic")
         verbose_name_plural = _("Monthly statistics")
+
+
+class RideFact(models.Model):
+    """
+    Contribution of a ride to the statistics, see ``carpool.stats``.
+
+    The totals of ``Statistics`` and ``MonthlyStatistics`` are running sums of
+    these rows: they are adjusted by the difference when a fact is refreshed,
+    instead of being recomputed over all the rides.
+    """
+
+    ride = models.OneToOneField(
+        "carpool.Ride",
+        primary_key=True,
+        related_name="fact",
+        on_delete=models.CASCADE,
+    )
+
+    # Month of the ride start, the MonthlyStatistics it is counted in
+    year = models.IntegerField()
+    month = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(12)]
+    )
+
+    distance_km = models.FloatField(default=0.0)
+    rider_count = models.PositiveIntegerField(default=0)
+    co2_kg = models.FloatField(default=0.0)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Ride fact")
+        verbose_name_plural = _("Ride facts")
@@ -0,0 +1,148 @@
+"""
+Keyset (cursor) pagination.
+
+Unlike ``django.core.paginator.Paginator``, pages are not addressed by their
+number but by an opaque cursor encoding the ordering key of the first or last
+row of the current page. Fetching a page is a ``WHERE key > cursor ... LIMIT``
+query that can use an index on the ordering fields: no ``COUNT(*)`` and no
+``OFFSET``, so deep pages cost the same as the first one. The total number of
+rows is only counted on demand, exactly or from the estimate of the planner.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` on the unique, ascending ``ordering`` fields.
+    The last field must be unique (usually the primary key) so that the
+    ordering is total.
+
+    ``count`` is ``None`` (the rows are not counted), ``"exact"`` (a
+    ``COUNT(*)`` query) or ``"estimate"`` (the number of rows estimated by
+    the PostgreSQL planner, without scanning them).
+    """
+
+    COUNT_MODES = (None, "exact", "estimate")
+
+    def __init__(self, queryset, per_page, ordering=("pk",), count=None):
+        if count not in self.COUNT_MODES:
+            raise ValueError(f"Unknown count mode: {count!r}")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.count_mode = count
+        opts = queryset.model._meta
+        self.fields = [
+            opts.pk if name == "pk" else opts.get_field(name) for name in ordering
+        ]
+
+    def encode_cursor(self, obj):
+        # value_to_string() keeps the full precision of datetimes
+        values = [field.value_to_string(obj) for field in self.fields]
+        data = json.dumps(values, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (ValueError, TypeError, ValidationError) as e:
+            raise InvalidCursor(cursor) from e
+
+    @cached_property
+    def count(self):
+        """Number of rows, or ``None`` if they are not counted."""
+        if self.count_mode == "exact":
+            return self.queryset.count()
+        if self.count_mode == "estimate":
+            sql, params = self.queryset.query.sql_with_params()
+            with connections[self.queryset.db].cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return plan[0]["Plan"]["Plan Rows"]
+        return None
+
+    def _beyond(self, values, lookup):
+        """
+        Row comparison ``(f1, f2, ...) <lookup> (v1, v2, ...)`` expanded as
+        ``f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...``.
+        """
+        condition = Q()
+        for i, (name, value) in enumerate(zip(self.ordering, values)):
+            equal = {n: v for n, v in zip(self.ordering[:i], values[:i])}
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        return condition
+
+    def get_page(self, after=None, before=None):
+        """
+        Return the page following the ``after`` cursor, or preceding the
+        ``before`` cursor, or the first page. Raise ``InvalidCursor`` if the
+        given cursor cannot be decoded.
+        """
+        if before:
+            values = self.decode_cursor(before)
+            rows = list(
+                self.queryset.filter(self._beyond(values, "lt")).order_by(
+                    *(f"-{name}" for name in self.ordering)
+                )[: self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            has_next = True
+        else:
+            queryset = self.queryset
+            if after:
+                values = self.decode_cursor(after)
+                queryset = queryset.filter(self._beyond(values, "gt"))
+            rows = list(queryset.order_by(*self.ordering)[: self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            has_previous = bool(after)
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if rows and has_next else None,
+            previous_cursor=(
+                self.encode_cursor(rows[0]) if rows and has_previous else None
+            ),
+        )
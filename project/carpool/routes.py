@@ -0,0 +1,69 @@
+"""
+Cache of the IGN routing results.
+
+Routes are keyed on their points rounded to ``ROUTING_CACHE_PRECISION``
+decimals (4 decimals is about 10 meters) and on the routing options, so that
+the same trip between a campus and a train station is routed once and shared
+by every driver. The TTL is the one of the ``routing`` cache in the settings.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from carpool import metrics
+from carpool.geoplateforme import ROUTING_OPTIONS
+
+HITS = "routing_hits"
+MISSES = "routing_misses"
+
+
+def _cache():
+    return caches["routing"]
+
+
+def round_point(point):
+    """Round a ``"lon,lat"`` point, raise ``ValueError`` if it is invalid."""
+    lng, lat = (float(c) for c in point.split(","))
+    precision = settings.ROUTING_CACHE_PRECISION
+    return f"{round(lng, precision)},{round(lat, precision)}"
+
+
+def route_key(start, end, intermediates):
+    """Cache key of the route, or ``None`` if a point cannot be parsed."""
+    try:
+        points = [round_point(p) for p in (start, *intermediates, end)]
+    except ValueError:
+        return None
+    data = json.dumps([points, ROUTING_OPTIONS], sort_keys=True)
+    return "carpool:routing:" + hashlib.md5(data.encode()).hexdigest()
+
+
+def get_cached(start, end, intermediates):
+    key = route_key(start, end, intermediates)
+    route = _cache().get(key) if key else None
+    metrics.incr(MISSES if route is None else HITS)
+    return route
+
+
+def store(start, end, intermediates, route):
+    key = route_key(start, end, intermediates)
+    # Errors are returned as dicts too, only keep actual routes
+    if key and "error" not in route:
+        _cache().set(key, route)
+
+
+def is_cached(start, end, intermediates):
+    key = route_key(start, end, intermediates)
+    return key is not None and key in _cache()
+
+
+def stats():
+    counters = metrics.get_counters(HITS, MISSES)
+    return {**counters, "hit_ratio": metrics.ratio(counters[HITS], counters[MISSES])}
+
+
+def reset_stats():
+    metrics.reset(HITS, MISSES)
@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import User
+from carpool import stats
+from carpool.models import Vehicle
+from carpool.models.ride import Ride
+from carpool.models.statistics import RideFact
+from carpool.tiles import invalidate_tiles
+
+# The users whose booked seats were already released, see bulk_release_booked_seats
+_released_users = ContextVar("released_users", default=frozenset())
+
+
+@receiver(m2m_changed, sender=Ride.rider.through)
+def update_booked_seats(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep ``Ride.booked_seats`` in sync with the riders of the ride, using
+    atomic ``F()`` updates so that concurrent changes are not lost. The rides
+    are marked as updated for the statistics, see ``carpool.stats``.
+    """
+    if reverse:
+        # user.rides_as_rider.add(...), ``instance`` is the user and
+        # ``pk_set`` the rides.
+        if action == "post_add":
+            Ride.objects.filter(pk__in=pk_set).update(
+                booked_seats=F("booked_seats") + 1, updated_at=timezone.now()
+            )
+        elif action == "pre_remove":
+            Ride.objects.filter(pk__in=pk_set, rider=instance).update(
+                booked_seats=Greatest(F("booked_seats") - 1, 0),
+                updated_at=timezone.now(),
+            )
+        elif action == "pre_clear":
+            Ride.objects.filter(rider=instance).update(
+                booked_seats=Greatest(F("booked_seats") - 1, 0),
+                updated_at=timezone.now(),
+            )
+        else:
+            return
+        transaction.on_commit(invalidate_tiles)
+        return
+
+    # ride.rider.add(...), ``instance`` is the ride and ``pk_set`` the users.
+    rides = Ride.objects.filter(pk=instance.pk)
+    if action == "post_add":
+        # Only the users that were actually added are in pk_set
+        rides.update(
+            booked_seats=F("booked_seats") + len(pk_set), updated_at=timezone.now()
+        )
+    elif action == "pre_remove":
+        removed = instance.rider.filter(pk__in=pk_set).count()
+        rides.update(
+            booked_seats=Greatest(F("booked_seats") - removed, 0),
+            updated_at=timezone.now(),
+        )
+    elif action == "post_clear":
+        rides.update(booked_seats=0, updated_at=timezone.now())
+    else:
+        return
+    instance.refresh_from_db(fields=["booked_seats", "updated_at"])
+    # The remaining seats are shown on the map
+    transaction.on_commit(invalidate_tiles)
+
+
+@receiver(pre_delete, sender=User)
+def release_booked_seats(sender, instance, **kwargs):
+    """The riders rows of a deleted user are removed without m2m signals."""
+    if instance.pk in _released_users.get():
+        return
+    Ride.objects.release_booked_seats([instance.pk])
+
+
+@contextmanager
+def bulk_release_booked_seats(user_pks):
+    """
+    Release the seats booked by the users with one UPDATE, for the users
+    deleted within the block: ``release_booked_seats`` is then skipped for
+    them instead of running one UPDATE per user.
+    """
+    user_pks = frozenset(user_pks)
+    Ride.objects.release_booked_seats(user_pks)
+    token = _released_users.set(_released_users.get() | user_pks)
+    try:
+        yield
+    finally:
+        _released_users.reset(token)
+
+
+@receiver(post_save, sender=Ride)
+@receiver(post_delete, sender=Ride)
+def invalidate_map_tiles(sender, **kwargs):
+    # After the commit, not to cache the previous state of the ride again
+    transaction.on_commit(invalidate_tiles)
+
+
+@receiver(post_save, sender=Vehicle)
+def mark_vehicle_rides_updated(sender, instance, created, **kwargs):
+    """The CO2 spared by the rides depends on their vehicle."""
+    if not created:
+        Ride.objects.filter(vehicle=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=RideFact)
+def subtract_ride_fact(sender, instance, **kwargs):
+    stats.remove(instance)
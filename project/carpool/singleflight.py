@@ -0,0 +1,76 @@
+"""
+Coalescing of identical calls to the geoplateforme APIs ("single flight").
+
+The first caller of a key takes a lock in Redis (``cache.add()`` is a
+``SET NX``), calls the API and publishes the result under a short-lived
+result key. Concurrent callers of the same key do not call the API: they poll
+the result key until the leader is done, and only call the API themselves if
+the leader failed. This way they do not use up the rate limits either.
+"""
+
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from carpool import metrics
+
+# Longest expected call, after which the lock of a crashed leader expires
+LOCK_TIMEOUT = 10  # seconds
+# Followers read the result shortly after it is published
+RESULT_TIMEOUT = 10  # seconds
+POLL_INTERVAL = 0.05  # seconds
+
+UPSTREAM_CALLS = "singleflight_calls"
+SAVED_CALLS = "singleflight_saved"
+
+
+def _keys(key):
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return f"carpool:singleflight:{digest}:lock", f"carpool:singleflight:{digest}"
+
+
+async def do(key, call, timeout):
+    """
+    Return the result of ``await call()``, shared with the concurrent callers
+    of the same ``key``. Raise ``TimeoutError`` if a follower waited more
+    than ``timeout`` seconds for the leader.
+    """
+    lock_key, result_key = _keys(key)
+    deadline = time.monotonic() + timeout
+
+    while True:
+        if await cache.aadd(lock_key, True, timeout=LOCK_TIMEOUT):
+            try:
+                result = await call()
+                await cache.aset(result_key, result, timeout=RESULT_TIMEOUT)
+                await sync_to_async(metrics.incr)(UPSTREAM_CALLS)
+                return result
+            finally:
+                await cache.adelete(lock_key)
+
+        # Wait for the leader, or for its lock to be released without result
+        while await cache.ahas_key(lock_key):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {key}")
+            await asyncio.sleep(POLL_INTERVAL)
+
+        result = await cache.aget(result_key)
+        if result is not None:
+            await sync_to_async(metrics.incr)(SAVED_CALLS)
+            return result
+        # The leader failed, try to become the leader
+
+
+def stats():
+    counters = metrics.get_counters(UPSTREAM_CALLS, SAVED_CALLS)
+    return {
+        **counters,
+        "saved_ratio": metrics.ratio(counters[SAVED_CALLS], counters[UPSTREAM_CALLS]),
+    }
+
+
+def reset_stats():
+    metrics.reset(UPSTREAM_CALLS, SAVED_CALLS)
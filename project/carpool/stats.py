@@ -0,0 +1,273 @@
+"""
+Incremental statistics of the rides.
+
+Each ride has a ``RideFact`` row holding its distance, its number of riders
+and the CO2 it spared. ``Statistics`` and ``MonthlyStatistics`` are running
+sums of these facts: when the fact of a ride is refreshed, the totals are
+adjusted by the difference with the previous one, and a deleted ride
+subtracts its fact (see ``carpool.signals``).
+
+``update`` refreshes the facts of the rides changed since the previous run,
+which is found with ``Ride.updated_at`` (changing the riders of a ride bumps
+it too). Every run also refreshes again the rides changed during the
+``WATERMARK_OVERLAP`` before the previous run, which is harmless since a
+refresh only applies the difference with the stored fact. ``reconcile``
+compares the running sums with a full recompute.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+from itertools import batched
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.gis.db.models.functions import Length
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from carpool.models.ride import Ride
+from carpool.models.statistics import MonthlyStatistics, RideFact, Statistics
+
+logger = logging.getLogger(__name__)
+
+FACT_FIELDS = ("year", "month", "distance_km", "rider_count", "co2_kg")
+# Number of rides refreshed in a transaction
+CHUNK_SIZE = 1000
+# Rides saved by transactions still running when a run starts have an older
+# ``updated_at`` than its watermark: the next run looks a bit further back.
+WATERMARK_OVERLAP = timedelta(hours=1)
+
+
+def compute_facts(rides):
+    """The facts of ``rides``, computed from scratch, as ``RideFact`` objects."""
+    rows = (
+        rides.annotate(
+            fact_year=ExtractYear("start_dt"),
+            fact_month=ExtractMonth("start_dt"),
+            fact_distance_km=Coalesce(
+                "distance_km",
+                ExpressionWrapper(
+                    Length("geometry", spheroid=True) / 1000.0,
+                    output_field=FloatField(),
+                ),
+                0.0,
+            ),
+            fact_rider_count=Count("rider", distinct=True),
+            effective_co2_per_km=Case(
+                When(
+                    Q(vehicle__geqCO2_per_km__isnull=True)
+                    | Q(vehicle__geqCO2_per_km=0),
+                    then=Value(settings.AVERAGE_CO2_EMISSION_PER_KM),
+                ),
+                default=F("vehicle__geqCO2_per_km"),
+                output_field=FloatField(),
+            ),
+        )
+        .annotate(
+            fact_co2_kg=ExpressionWrapper(
+                F("fact_rider_count")
+                * F("fact_distance_km")
+                * F("effective_co2_per_km")
+                / 1000,
+                output_field=FloatField(),
+            )
+        )
+        .values_list("pk", *(f"fact_{field}" for field in FACT_FIELDS), named=True)
+    )
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield RideFact(
+            ride_id=row.pk,
+            **{field: getattr(row, f"fact_{field}") for field in FACT_FIELDS},
+        )
+
+
+def _statistics():
+    return Statistics.objects.first() or Statistics.objects.create()
+
+
+def _add(totals, fact, sign=1):
+    """Add the contribution of ``fact`` to the global and monthly ``totals``."""
+    for key in (None, (fact.year, fact.month)):
+        total = totals[key]
+        total[0] += sign
+        total[1] += sign * fact.distance_km
+        total[2] += sign * fact.co2_kg
+
+
+def _apply(deltas):
+    """Add ``deltas`` to the running sums, with atomic ``F()`` updates."""
+    for key, (rides, distance, co2) in deltas.items():
+        if not (rides or distance or co2):
+            continue
+        if key is None:
+            queryset = Statistics.objects.filter(pk=_statistics().pk)
+        else:
+            year, month = key
+            MonthlyStatistics.objects.get_or_create(year=year, month=month)
+            queryset = MonthlyStatistics.objects.filter(year=year, month=month)
+        queryset.update(
+            total_rides=F("total_rides") + rides,
+            total_distance=F("total_distance") + distance,
+            total_co2=F("total_co2") + co2,
+        )
+
+
+def _deltas():
+    return defaultdict(lambda: [0, 0.0, 0.0])
+
+
+def refresh(rides):
+    """
+    Refresh the facts of ``rides`` and adjust the running sums, return the
+    number of rides refreshed.
+    """
+    refreshed = 0
+    pks = list(rides.values_list("pk", flat=True))
+    for chunk in batched(pks, CHUNK_SIZE):
+        with transaction.atomic():
+            # A ride being deleted waits for its fact to be updated
+            previous = RideFact.objects.select_for_update().in_bulk(chunk)
+            facts = list(compute_facts(Ride.objects.filter(pk__in=chunk)))
+
+            deltas = _deltas()
+            for fact in previous.values():
+                _add(deltas, fact, -1)
+            for fact in facts:
+                _add(deltas, fact)
+
+            RideFact.objects.bulk_create(
+                facts,
+                update_conflicts=True,
+                unique_fields=["ride"],
+                update_fields=[*FACT_FIELDS, "computed_at"],
+            )
+            _apply(deltas)
+        refreshed += len(facts)
+    return refreshed
+
+
+def remove(fact):
+    """Subtract the fact of a deleted ride from the running sums."""
+    deltas = _deltas()
+    _add(deltas, fact, -1)
+    _apply(deltas)
+
+
+def _rebuild_sums():
+    """Replace the running sums by the sums of the facts."""
+    with transaction.atomic():
+        # Deleted rides wait to subtract their fact until the sums are rebuilt
+        statistics = Statistics.objects.select_for_update().get(pk=_statistics().pk)
+
+        totals = RideFact.objects.aggregate(
+            rides=Count("pk"), distance=Sum("distance_km"), co2=Sum("co2_kg")
+        )
+        Statistics.objects.filter(pk=statistics.pk).update(
+            total_rides=totals["rides"],
+            total_distance=totals["distance"] or 0,
+            total_co2=totals["co2"] or 0,
+        )
+
+        MonthlyStatistics.objects.update(total_rides=0, total_distance=0, total_co2=0)
+        months = RideFact.objects.values("year", "month").annotate(
+            rides=Count("pk"), distance=Sum("distance_km"), co2=Sum("co2_kg")
+        )
+        for row in months:
+            MonthlyStatistics.objects.update_or_create(
+                year=row["year"],
+                month=row["month"],
+                defaults={
+                    "total_rides": row["rides"],
+                    "total_distance": row["distance"],
+                    "total_co2": row["co2"],
+                },
+            )
+
+
+def update():
+    """
+    Refresh the facts of the rides changed since the previous run, return
+    the number of rides refreshed.
+    """
+    started = timezone.now()
+    statistics = _statistics()
+
+    if statistics.rides_watermark is None:
+        # First run, the totals may come from the former full recompute
+        logger.info("No statistics watermark, computing the facts of all the rides.")
+        refreshed = refresh(Ride.objects.all())
+        _rebuild_sums()
+    else:
+        refreshed = refresh(
+            Ride.objects.filter(
+                updated_at__gte=statistics.rides_watermark - WATERMARK_OVERLAP
+            )
+        )
+
+    total_users = get_user_model().objects.count()
+    Statistics.objects.filter(pk=statistics.pk).update(
+        rides_watermark=started, total_users=total_users, updated_at=started
+    )
+    local = timezone.localtime(started)
+    MonthlyStatistics.objects.update_or_create(
+        year=local.year, month=local.month, defaults={"total_users": total_users}
+    )
+
+    logger.info(f"Statistics updated, {refreshed} ride(s) refreshed.")
+    return refreshed
+
+
+def _differs(a, b):
+    return not math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def reconcile(fix=False):
+    """
+    Compare the running sums with a full recompute over all the rides, return
+    the differences as ``(period, field, stored, expected)`` tuples, where
+    ``period`` is ``None`` for the global totals or ``(year, month)``.
+
+    With ``fix``, the facts of all the rides are refreshed and the running
+    sums replaced by the recomputed ones.
+    """
+    expected = _deltas()
+    for fact in compute_facts(Ride.objects.all()):
+        _add(expected, fact)
+
+    stored = {None: _statistics()}
+    for month_stats in MonthlyStatistics.objects.all():
+        stored[month_stats.year, month_stats.month] = month_stats
+
+    differences = []
+    for key in stored.keys() | expected.keys():
+        row = stored.get(key)
+        values = (
+            (row.total_rides, row.total_distance, row.total_co2) if row else (0, 0, 0)
+        )
+        for field, value, expected_value in zip(
+            ("total_rides", "total_distance", "total_co2"), values, expected[key]
+        ):
+            if _differs(value, expected_value):
+                differences.append((key, field, value, expected_value))
+
+    if differences:
+        logger.warning(f"Statistics differ from a full recompute: {differences}")
+
+    if fix and differences:
+        refresh(Ride.objects.all())
+        _rebuild_sums()
+    return differences
@@ -0,0 +1,114 @@
+import threading
+from unittest.mock import patch
+
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from accounts import outbox
+from accounts.tests.factories import UserFactory
+from carpool import booking
+from carpool.booking import BookingConflict
+from carpool.models.reservation import Reservation
+from carpool.models.ride import Ride
+from carpool.tests.factories import RideFactory
+
+
+class BookingServiceTestCase(TestCase):
+    def setUp(self):
+        self.ride = RideFactory(seats_offered=1, driver=UserFactory())
+        self.user = UserFactory()
+
+    def test_request_seat_twice(self):
+        result = booking.request_seat(self.ride, self.user)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.reservation.status, Reservation.Status.PENDING)
+
+        result = booking.request_seat(self.ride, self.user)
+        self.assertEqual(result.conflict, BookingConflict.ALREADY_BOOKED)
+
+    def test_accept_is_idempotent(self):
+        reservation = booking.request_seat(self.ride, self.user).reservation
+        self.assertTrue(booking.accept_reservation(reservation).ok)
+        self.assertTrue(booking.accept_reservation(reservation).ok)
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.booked_seats, 1)
+
+    def test_accept_when_full(self):
+        reservation = booking.request_seat(self.ride, self.user).reservation
+        self.ride.rider.add(UserFactory())
+        result = booking.accept_reservation(reservation)
+        self.assertEqual(result.conflict, BookingConflict.RIDE_FULL)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.Status.PENDING)
+
+    def test_decline_and_cancel_release_the_seat(self):
+        reservation = booking.request_seat(self.ride, self.user).reservation
+        booking.accept_reservation(reservation)
+
+        result = booking.decline_reservation(reservation)
+        self.assertTrue(result.seat_released)
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.booked_seats, 0)
+
+        result = booking.cancel_reservation(reservation)
+        self.assertTrue(result.ok)
+        self.assertFalse(result.seat_released)
+
+        result = booking.accept_reservation(reservation)
+        self.assertEqual(result.conflict, BookingConflict.RESERVATION_CANCELED)
+
+    def test_accepted_riders_are_emailed_over_one_connection(self):
+        ride = RideFactory(seats_offered=7, driver=UserFactory())
+        riders = [UserFactory() for _ in range(7)]
+        for rider in riders:
+            booking.accept_reservation(booking.request_seat(ride, rider).reservation)
+        self.assertEqual(len(mail.outbox), 0)
+
+        with patch(
+            "accounts.outbox.get_connection", wraps=mail.get_connection
+        ) as connection:
+            self.assertEqual(outbox.dispatch(connections=1), (7, 0))
+        connection.assert_called_once()
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox), sorted(r.email for r in riders)
+        )
+
+
+class ConcurrentBookingTestCase(TransactionTestCase):
+    def test_seats_offered_is_never_exceeded(self):
+        """Many drivers' tabs accept different reservations at the same time."""
+        seats = 3
+        ride = RideFactory(seats_offered=seats, driver=UserFactory())
+        reservations = [
+            Reservation.objects.create(ride=ride, user=UserFactory()) for _ in range(20)
+        ]
+
+        barrier = threading.Barrier(len(reservations))
+        results = []
+
+        def accept(reservation):
+            try:
+                barrier.wait()
+                results.append(booking.accept_reservation(reservation))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=accept, args=(reservation,))
+            for reservation in reservations
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ride = Ride.objects.get(pk=ride.pk)
+        self.assertEqual(len(results), len(reservations))
+        self.assertEqual(sum(result.ok for result in results), seats)
+        self.assertEqual(ride.booked_seats, seats)
+        self.assertEqual(ride.rider.count(), seats)
+        self.assertEqual(
+            Reservation.objects.filter(status=Reservation.Status.ACCEPTED).count(),
+            seats,
+        )
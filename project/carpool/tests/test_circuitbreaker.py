@@ -0,0 +1,99 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from requests.exceptions import ConnectionError
+
+from accounts.tests.factories import UserFactory
+from carpool.circuitbreaker import CircuitBreaker, CircuitOpenError
+from carpool.geoplateforme import routing_circuit
+from carpool.tasks import get_routing
+
+ROUTE = {"geometry": {"type": "LineString", "coordinates": []}, "duration": 1.5}
+
+
+def api_response(status_code, json=None):
+    return MagicMock(status_code=status_code, json=MagicMock(return_value=json))
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.circuit = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+
+    def test_opens_after_threshold(self):
+        for _ in range(2):
+            self.circuit.record_failure()
+        self.circuit.check()
+
+        self.circuit.record_failure()
+        self.assertTrue(self.circuit.is_open())
+        with self.assertRaises(CircuitOpenError):
+            self.circuit.check()
+        self.assertEqual(self.circuit.stats()["circuit_test_rejected"], 1)
+
+    def test_success_closes(self):
+        for _ in range(3):
+            self.circuit.record_failure()
+        self.circuit.record_success()
+        self.assertFalse(self.circuit.is_open())
+        # The failures are forgotten too
+        self.circuit.record_failure()
+        self.assertFalse(self.circuit.is_open())
+
+    def test_half_open(self):
+        for _ in range(3):
+            self.circuit.record_failure()
+        # The recovery timeout is over
+        cache.delete(self.circuit.open_key)
+        self.circuit.check()
+
+        self.circuit.record_failure()
+        self.assertTrue(self.circuit.is_open())
+
+
+@patch("carpool.tasks.requests.get")
+class RoutingTaskTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def route(self, deadline):
+        return get_routing.apply(
+            args=("-1.68,48.11", "-1.46,47.29", []), kwargs={"deadline": deadline}
+        ).get()
+
+    def test_retries_within_deadline(self, mock_get):
+        mock_get.side_effect = [api_response(503), api_response(200, ROUTE)]
+        self.assertEqual(self.route(time.time() + 5), ROUTE)
+        self.assertEqual(mock_get.call_count, 2)
+        # The timeout of the calls is bounded by the deadline
+        self.assertLessEqual(mock_get.call_args.kwargs["timeout"], 5)
+
+    def test_no_retry_past_deadline(self, mock_get):
+        mock_get.side_effect = ConnectionError("Connection refused")
+        result = self.route(time.time() + 1)
+        self.assertIn("error", result)
+        mock_get.assert_called_once()
+
+    def test_deadline_exceeded(self, mock_get):
+        result = self.route(time.time() - 1)
+        self.assertEqual(result["error"], "Deadline exceeded")
+        mock_get.assert_not_called()
+
+    def test_fails_fast_when_open(self, mock_get):
+        mock_get.return_value = api_response(503)
+        for _ in range(routing_circuit.failure_threshold):
+            self.route(time.time() + 1)
+        mock_get.reset_mock()
+
+        result = self.route(time.time() + 5)
+        self.assertEqual(result["status_code"], 503)
+        mock_get.assert_not_called()
+
+        self.client.force_login(UserFactory())
+        r = self.client.get(
+            reverse("carpool:routing"), {"start": "-1.6,48.1", "end": "-1.4,47.2"}
+        )
+        self.assertEqual(r.status_code, 503)
@@ -0,0 +1,147 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.tests.factories import UserFactory
+from carpool import completion, gazetteer
+from carpool.tests.factories import LocationFactory, RideFactory
+
+
+def make_result(fulltext):
+    return {"fulltext": fulltext, "value": "48.1/-1.6", "customProperties": {}}
+
+
+class CompletionCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["completion"].clear()
+
+    def test_normalize_query(self):
+        self.assertEqual(
+            completion.normalize_query("  10 Rue  de la PAIX "), "10 rue de la paix"
+        )
+
+    def test_exact_hit(self):
+        self.assertIsNone(completion.get_cached("rue de la paix"))
+        completion.store("rue de la paix", [make_result("Rue de la Paix Rennes")])
+        self.assertEqual(
+            completion.get_cached("rue de la paix"),
+            [make_result("Rue de la Paix Rennes")],
+        )
+        self.assertEqual(
+            completion.stats(),
+            {"completion_hits": 1, "completion_misses": 1, "hit_ratio": 0.5},
+        )
+
+    def test_prefix_filtering(self):
+        completion.store(
+            "rue de la p",
+            [
+                make_result("Rue de la Paix Rennes"),
+                make_result("Rue de la Poste Vitré"),
+            ],
+        )
+        self.assertEqual(
+            completion.get_cached("rue de la pai"),
+            [make_result("Rue de la Paix Rennes")],
+        )
+
+        with override_settings(COMPLETION_CACHE_PREFIX_FILTERING=False):
+            self.assertIsNone(completion.get_cached("rue de la pai"))
+
+    def test_prefix_filtering_ignores_truncated_results(self):
+        completion.store(
+            "rue de la p",
+            [
+                make_result(f"Rue de la Paix {i}")
+                for i in range(completion.API_MAX_RESULTS)
+            ],
+        )
+        self.assertIsNone(completion.get_cached("rue de la pai"))
+
+    @patch("carpool.views.api.get_autocompletion.delay")
+    def test_view_uses_cache(self, mock_delay):
+        mock_delay.return_value = MagicMock(
+            get=MagicMock(return_value=[make_result("Rue de la Paix Rennes")])
+        )
+        self.client.force_login(UserFactory())
+
+        for text in ("Rue de la Paix", "rue de la paix "):
+            r = self.client.get(reverse("carpool:completion"), {"text": text})
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(
+                r.json()["results"], [make_result("Rue de la Paix Rennes")]
+            )
+        mock_delay.assert_called_once_with("rue de la paix")
+
+    def test_show_metrics_command(self):
+        completion.get_cached("rue de la paix")
+        out = StringIO()
+        call_command("show_metrics", reset=True, stdout=out)
+        self.assertIn("completion_misses=1", out.getvalue())
+        self.assertEqual(completion.stats()["completion_misses"], 0)
+
+
+class GazetteerTestCase(TestCase):
+    def setUp(self):
+        caches["completion"].clear()
+        driver = UserFactory()
+        self.station = LocationFactory(
+            fulltext="Gare de Rennes 35000 Rennes", city="Rennes", zipcode="35000"
+        )
+        self.campus = LocationFactory(
+            fulltext="20 Avenue des Buttes de Coësmes 35700 Rennes",
+            city="Rennes",
+            zipcode="35700",
+        )
+        # Same address stored twice
+        LocationFactory(
+            fulltext="Gare de Rennes 35000 Rennes", city="Rennes", zipcode="35000"
+        )
+        self.nantes = LocationFactory(
+            fulltext="Gare de Nantes 44000 Nantes", city="Nantes", zipcode="44000"
+        )
+        RideFactory.create_batch(
+            2, driver=driver, start_loc=self.campus, end_loc=self.station
+        )
+        RideFactory(driver=driver, start_loc=self.campus, end_loc=self.nantes)
+
+    def test_suggest_ranked_by_usage(self):
+        suggestions = gazetteer.suggest("rennes")
+        self.assertEqual(
+            [s["fulltext"] for s in suggestions],
+            [self.campus.fulltext, self.station.fulltext],
+        )
+        self.assertEqual(
+            suggestions[0]["value"], f"{self.campus.lat}/{self.campus.lng}"
+        )
+        self.assertEqual(gazetteer.suggest("re"), [])
+
+    def test_merge(self):
+        local = gazetteer.suggest("rennes")
+        remote = [make_result("Gare de Rennes 35000 Rennes"), make_result("Rennes")]
+        self.assertEqual(
+            [s["fulltext"] for s in gazetteer.merge(local, remote)],
+            [self.campus.fulltext, self.station.fulltext, "Rennes"],
+        )
+
+    @patch("carpool.views.api.get_autocompletion.delay")
+    def test_view_calls_remote_when_not_enough(self, mock_delay):
+        mock_delay.return_value = MagicMock(
+            get=MagicMock(return_value=[make_result("Rennes")])
+        )
+        self.client.force_login(UserFactory())
+
+        r = self.client.get(reverse("carpool:completion"), {"text": "rennes"})
+        self.assertEqual(r.json()["results"][-1]["fulltext"], "Rennes")
+        self.assertEqual(len(r.json()["results"]), 3)
+        mock_delay.assert_called_once()
+
+        with patch.object(gazetteer, "MIN_LOCAL_SUGGESTIONS", 2):
+            r = self.client.get(reverse("carpool:completion"), {"text": "rennes"})
+        self.assertEqual(len(r.json()["results"]), 2)
+        mock_delay.assert_called_once()
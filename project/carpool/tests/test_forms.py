@@ -88,6 +88,31 @@ class CreateRideStep1FormTestCase(TestCase):
         form = CreateRideStep1Form(data)
         self.assertTrue(form.is_valid())
 
+    def test_reject_negative_distance(self):
+        start_dt = (timezone.now() + datetime.timedelta(days=1)).strftime("%Y-%m-%dT%H:%M")
+        data = {
+            "stopovers-TOTAL_FORMS": "0",
+            "stopovers-INITIAL_FORMS": "0",
+            "stopovers-MIN_NUM_FORMS": "0",
+            "stopovers-MAX_NUM_FORMS": "5",
+            "r_geometry": "LINESTRING(0 0, 1 1)",
+            "r_duration": 1.0,
+            "r_distance": -10,
+            "departure_datetime": start_dt,
+        }
+        data.update(
+            {
+                f"departure-{k}": v
+                for k, v in self._valid_location_data(self.loc1).items()
+            }
+        )
+        data.update(
+            {f"arrival-{k}": v for k, v in self._valid_location_data(self.loc2).items()}
+        )
+        form = CreateRideStep1Form(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn("r_distance", form.errors)
+
     def test_valid_step1_form_with_stepover(self):
         # Make sure that the date is in the future
         start_dt = (timezone.now() + datetime.timedelta(days=1)).strftime("%Y-%m-%dT%H:%M")
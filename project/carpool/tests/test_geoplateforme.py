@@ -0,0 +1,132 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from celery.result import AsyncResult
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.tests.factories import UserFactory
+from carpool import geoplateforme
+
+API_RESULT = {
+    "results": [
+        {"fulltext": "Rue de Rennes Paris", "x": 2.3, "y": 48.8, "street": "Rue"},
+        {"fulltext": "Rennes", "x": -1.6, "y": 48.1, "city": "Rennes"},
+    ]
+}
+
+
+class GeoplateformeClientTestCase(SimpleTestCase):
+    def use_transport(self, handler):
+        geoplateforme._loop_state[asyncio.get_running_loop()] = {
+            "client": httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            "completion": geoplateforme.TokenBucket(100),
+            "routing": geoplateforme.TokenBucket(100),
+        }
+
+    def test_parse_rate(self):
+        self.assertEqual(geoplateforme.parse_rate("50/s"), 50)
+        self.assertEqual(geoplateforme.parse_rate("120/m"), 2)
+        self.assertEqual(geoplateforme.parse_rate("5"), 5)
+
+    def test_parse_completion_puts_cities_first(self):
+        result = geoplateforme.parse_completion(API_RESULT, "renn")
+        self.assertEqual(
+            [r["fulltext"] for r in result], ["Rennes", "Rue de Rennes Paris"]
+        )
+        self.assertEqual(geoplateforme.parse_completion({}, "renn"), [])
+
+    async def test_token_bucket(self):
+        bucket = geoplateforme.TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        # 2 calls at once, then 2 more at 20 calls/second
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    async def test_autocomplete(self):
+        def handler(request):
+            self.assertEqual(request.url.params["text"], "renn")
+            self.assertEqual(request.url.params["terr"], "METROPOLE")
+            return httpx.Response(200, json=API_RESULT)
+
+        self.use_transport(handler)
+        result = await geoplateforme.autocomplete("renn")
+        self.assertEqual(result[0]["fulltext"], "Rennes")
+
+    async def test_route(self):
+        def handler(request):
+            self.assertNotIn("intermediates", request.url.params)
+            return httpx.Response(503, text="Unavailable")
+
+        self.use_transport(handler)
+        result = await geoplateforme.route("-1.6,48.1", "-1.4,47.2", [])
+        self.assertEqual(result["status_code"], 503)
+
+
+class InProcessViewsTestCase(TestCase):
+    def setUp(self):
+        caches["completion"].clear()
+        caches["routing"].clear()
+        self.client.force_login(UserFactory())
+
+    @override_settings(GEOPLATEFORME_IN_PROCESS=True)
+    @patch("carpool.views.api.get_autocompletion.delay")
+    @patch("carpool.views.api.geoplateforme.autocomplete", new_callable=AsyncMock)
+    def test_in_process(self, mock_autocomplete, mock_delay):
+        mock_autocomplete.return_value = [{"fulltext": "Rennes"}]
+        r = self.client.get(reverse("carpool:completion"), {"text": "Renn"})
+        self.assertEqual(r.json()["results"], [{"fulltext": "Rennes"}])
+        mock_autocomplete.assert_awaited_once_with("renn")
+        mock_delay.assert_not_called()
+
+    @override_settings(GEOPLATEFORME_IN_PROCESS=True)
+    @patch("carpool.views.api.get_autocompletion.delay")
+    @patch("carpool.views.api.geoplateforme.autocomplete", new_callable=AsyncMock)
+    def test_celery_fallback(self, mock_autocomplete, mock_delay):
+        mock_autocomplete.side_effect = httpx.ConnectError("Connection refused")
+        mock_delay.return_value = MagicMock(
+            get=MagicMock(return_value=[{"fulltext": "Rennes"}])
+        )
+        r = self.client.get(reverse("carpool:completion"), {"text": "Renn"})
+        self.assertEqual(r.json()["results"], [{"fulltext": "Rennes"}])
+        mock_delay.assert_called_once_with("renn")
+
+    @override_settings(GEOPLATEFORME_IN_PROCESS=True)
+    @patch("carpool.views.api.geoplateforme.route", new_callable=AsyncMock)
+    def test_timeout(self, mock_route):
+        mock_route.side_effect = httpx.ReadTimeout("Too slow")
+        r = self.client.get(
+            reverse("carpool:routing"), {"start": "-1.6,48.1", "end": "-1.4,47.2"}
+        )
+        self.assertEqual(r.status_code, 504)
+
+    @patch.object(AsyncResult, "get", side_effect=CeleryTimeoutError("Too slow"))
+    @patch("carpool.views.api.get_routing.apply_async")
+    @patch("carpool.views.api.get_autocompletion.delay")
+    def test_celery_timeout(self, mock_delay, mock_apply_async, mock_get):
+        mock_delay.return_value = AsyncResult("completion")
+        mock_apply_async.return_value = AsyncResult("routing")
+
+        r = self.client.get(reverse("carpool:completion"), {"text": "Renn"})
+        self.assertEqual(r.status_code, 504)
+        r = self.client.get(
+            reverse("carpool:routing"), {"start": "-1.6,48.1", "end": "-1.4,47.2"}
+        )
+        self.assertEqual(r.status_code, 504)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("carpool.views.api.time")
+    @patch("carpool.views.api.get_routing.apply_async")
+    def test_expired_deadline(self, mock_apply_async, mock_time):
+        # The deadline has passed once the call starts
+        mock_time.time.side_effect = [1000, 1000 + geoplateforme.REQUEST_TIMEOUT]
+        r = self.client.get(
+            reverse("carpool:routing"), {"start": "-1.6,48.1", "end": "-1.4,47.2"}
+        )
+        self.assertEqual(r.status_code, 504)
+        mock_apply_async.assert_not_called()
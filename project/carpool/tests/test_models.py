@@ -1,5 +1,12 @@
+from io import StringIO
+
+from django.contrib.gis.geos import LineString, Point
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 
+from carpool.functions import GeographyDWithin
+from carpool.models.ride import Ride
 from carpool.tests.factories import RideFactory
 from accounts.tests.factories import UserFactory
 
@@ -34,3 +41,185 @@ class ModelTestCase(TestCase):
         
         self.assertEqual(ride.remaining_seats, 0)
         self.assertTrue(ride.is_full)
+
+
+class BookedSeatsCounterTestCase(TestCase):
+    def setUp(self):
+        self.ride = RideFactory(seats_offered=4, driver=UserFactory())
+        self.u1 = UserFactory()
+        self.u2 = UserFactory()
+
+    def assertBookedSeats(self, expected):
+        self.assertEqual(self.ride.booked_seats, expected)
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.booked_seats, expected)
+
+    def test_add_and_remove_riders(self):
+        self.ride.rider.add(self.u1, self.u2)
+        self.assertBookedSeats(2)
+        # Adding an existing rider does not count twice
+        self.ride.rider.add(self.u1)
+        self.assertBookedSeats(2)
+        self.ride.rider.remove(self.u1)
+        self.assertBookedSeats(1)
+        # Removing a user that is not a rider does not change the counter
+        self.ride.rider.remove(self.u1)
+        self.assertBookedSeats(1)
+        self.ride.rider.clear()
+        self.assertBookedSeats(0)
+
+    def test_reverse_add_and_remove(self):
+        # The ride instance is not refreshed when changed from the user side
+        self.u1.rides_as_rider.add(self.ride)
+        self.u2.rides_as_rider.add(self.ride)
+        self.ride.refresh_from_db()
+        self.assertBookedSeats(2)
+        self.u1.rides_as_rider.remove(self.ride)
+        self.ride.refresh_from_db()
+        self.assertBookedSeats(1)
+        self.u2.rides_as_rider.clear()
+        self.ride.refresh_from_db()
+        self.assertBookedSeats(0)
+
+    def test_deleting_a_rider_releases_the_seat(self):
+        self.ride.rider.add(self.u1, self.u2)
+        self.u1.delete()
+        self.ride.refresh_from_db()
+        self.assertBookedSeats(1)
+
+    def test_save_does_not_overwrite_the_counter(self):
+        stale = Ride.objects.get(pk=self.ride.pk)
+        self.ride.rider.add(self.u1)
+        stale.comment = "Updated"
+        stale.save()
+        self.assertBookedSeats(1)
+
+    def test_reading_seats_does_not_query(self):
+        self.ride.rider.add(self.u1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ride.remaining_seats, 3)
+            self.assertFalse(self.ride.is_full)
+
+    def test_repair_booked_seats_command(self):
+        self.ride.rider.add(self.u1, self.u2)
+        Ride.objects.filter(pk=self.ride.pk).update(booked_seats=0)
+        out = StringIO()
+        call_command("repair_booked_seats", stdout=out)
+        self.assertIn("1 ride", out.getvalue())
+        self.assertBookedSeats(2)
+
+        out = StringIO()
+        call_command("repair_booked_seats", stdout=out)
+        self.assertIn("No booked seats drift", out.getvalue())
+
+
+class RideSearchQueryPlanTestCase(TestCase):
+    """Regression tests ensuring the rides search stays index-backed."""
+
+    def setUp(self):
+        driver = UserFactory()
+        RideFactory(
+            driver=driver,
+            geometry=LineString((-1.6778, 48.1173), (-1.5536, 47.2184), srid=4326),
+        )
+        self.point = Point(-1.6778, 48.1173, srid=4326)
+        with connection.cursor() as cursor:
+            # Tables are tiny in tests, forbid sequential scans whenever an
+            # index can be used instead.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan on carpool_ride", plan)
+        self.assertIn("Index", plan)
+
+    def test_passing_near_uses_spatial_index(self):
+        self.assertUsesIndex(Ride.objects.passing_near(self.point))
+
+    def test_heading_to_uses_spatial_index(self):
+        self.assertUsesIndex(
+            Ride.objects.heading_to(self.point, departure=self.point)
+        )
+
+    def test_geography_dwithin_uses_functional_index(self):
+        plan = Ride.objects.filter(
+            GeographyDWithin("geometry", self.point, 10_000)
+        ).explain()
+        self.assertIn("carpool_ride_geog_gist", plan)
+
+
+class SimplifiedGeometryTestCase(TestCase):
+    def setUp(self):
+        # A zigzag of 1000 vertices a few meters away from a straight line
+        self.detailed = LineString(
+            [(-1.6778 + i * 0.0005, 48.1173 + (i % 2) * 0.00005) for i in range(1000)],
+            srid=4326,
+        )
+
+    def test_simplified_on_save(self):
+        ride = RideFactory(driver=UserFactory(), geometry=self.detailed)
+        ride.refresh_from_db()
+        self.assertEqual(ride.geometry.num_points, 1000)
+        self.assertLess(ride.geometry_low.num_points, 10)
+        self.assertLess(ride.geometry_medium.num_points, 1000)
+        self.assertEqual(ride.geometry_low.srid, 4326)
+
+    def test_simplified_on_geometry_update(self):
+        ride = RideFactory(
+            driver=UserFactory(), geometry=LineString((0, 0), (1, 1), srid=4326)
+        )
+        ride.geometry = self.detailed
+        ride.save(update_fields=["geometry"])
+        ride.refresh_from_db()
+        self.assertEqual(ride.geometry_low.coords[0], self.detailed.coords[0])
+
+    def test_geometry_for_zoom(self):
+        ride = RideFactory(driver=UserFactory(), geometry=self.detailed)
+        self.assertEqual(Ride.geometry_field_for_zoom(6), "geometry_low")
+        self.assertEqual(Ride.geometry_field_for_zoom(10), "geometry_medium")
+        self.assertEqual(Ride.geometry_field_for_zoom(15), "geometry")
+        self.assertEqual(ride.geometry_for_zoom(15), ride.geometry)
+        # The whole ride (~35km wide) fits at zoom 11
+        self.assertEqual(ride.geometry_for_zoom(), ride.geometry_medium)
+
+        ride.geometry_low = None
+        self.assertEqual(ride.geometry_for_zoom(6), ride.geometry)
+
+
+class DistanceTestCase(TestCase):
+    def setUp(self):
+        # Rennes - Nantes, about 100km as the crow flies
+        self.geometry = LineString((-1.6778, 48.1173), (-1.5536, 47.2184), srid=4326)
+
+    def test_distance_from_the_routing_is_kept(self):
+        ride = RideFactory(
+            driver=UserFactory(), geometry=self.geometry, distance_km=110.5
+        )
+        ride.refresh_from_db()
+        self.assertEqual(ride.distance_km, 110.5)
+
+    def test_implausible_distance_is_replaced(self):
+        for distance_km in (10000, 1):
+            ride = RideFactory(
+                driver=UserFactory(), geometry=self.geometry, distance_km=distance_km
+            )
+            self.assertAlmostEqual(ride.distance_km, 100, delta=5)
+
+    def test_distance_computed_when_missing(self):
+        ride = RideFactory(driver=UserFactory(), geometry=self.geometry)
+        self.assertAlmostEqual(ride.distance_km, 100, delta=5)
+
+        ride.geometry = None
+        ride.save(update_fields=["geometry"])
+        ride.refresh_from_db()
+        self.assertIsNone(ride.distance_km)
+
+    def test_backfill_ride_distance_command(self):
+        for _ in range(3):
+            RideFactory(driver=UserFactory(), geometry=self.geometry)
+        Ride.objects.update(distance_km=None)
+
+        out = StringIO()
+        call_command("backfill_ride_distance", chunk_size=2, stdout=out)
+        self.assertIn("Distance of 3 ride(s) computed", out.getvalue())
+        self.assertFalse(Ride.objects.filter(distance_km__isnull=True).exists())
@@ -0,0 +1,73 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.tests.factories import UserFactory
+from carpool import routes
+from carpool.tests.factories import LocationFactory, RideFactory
+
+ROUTE = {"geometry": {"type": "LineString", "coordinates": []}, "duration": 1.5}
+
+
+class RouteCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["routing"].clear()
+
+    def test_key_rounds_coordinates(self):
+        self.assertEqual(
+            routes.route_key("-1.683611,48.110899", "-1.466824,47.297116", []),
+            routes.route_key("-1.683589,48.110901", "-1.466821,47.297119", []),
+        )
+        self.assertNotEqual(
+            routes.route_key("-1.6836,48.1109", "-1.4668,47.2971", []),
+            routes.route_key("-1.6836,48.1109", "-1.4668,47.2971", ["-1.2,48.1"]),
+        )
+        with override_settings(ROUTING_CACHE_PRECISION=2):
+            self.assertEqual(
+                routes.route_key("-1.681,48.111", "-1.466,47.297", []),
+                routes.route_key("-1.684,48.114", "-1.469,47.299", []),
+            )
+        self.assertIsNone(routes.route_key("not a point", "-1.46,47.29", []))
+
+    def test_errors_are_not_cached(self):
+        routes.store("-1.68,48.11", "-1.46,47.29", [], {"error": "Unavailable"})
+        self.assertIsNone(routes.get_cached("-1.68,48.11", "-1.46,47.29", []))
+        routes.store("-1.68,48.11", "-1.46,47.29", [], ROUTE)
+        self.assertEqual(routes.get_cached("-1.68,48.11", "-1.46,47.29", []), ROUTE)
+        self.assertEqual(routes.stats()["hit_ratio"], 0.5)
+
+    @patch("carpool.views.api.get_routing.apply_async")
+    def test_view_uses_cache(self, mock_delay):
+        mock_delay.return_value = MagicMock(get=MagicMock(return_value=ROUTE))
+        self.client.force_login(UserFactory())
+
+        for start in ("-1.683611,48.110899", "-1.683589,48.110901"):
+            r = self.client.get(
+                reverse("carpool:routing"), {"start": start, "end": "-1.46,47.29"}
+            )
+            self.assertEqual(r.json(), ROUTE)
+        mock_delay.assert_called_once()
+
+    @patch("carpool.management.commands.warm_routes_cache.get_routing")
+    def test_warm_up_command(self, mock_routing):
+        mock_routing.return_value = ROUTE
+        driver = UserFactory()
+        start = LocationFactory(lat=48.11, lng=-1.68)
+        end = LocationFactory(lat=47.29, lng=-1.46)
+        RideFactory.create_batch(2, driver=driver, start_loc=start, end_loc=end)
+        RideFactory(driver=driver)
+
+        out = StringIO()
+        call_command("warm_routes_cache", limit=1, stdout=out)
+        self.assertIn("Routed 1 pair(s)", out.getvalue())
+        mock_routing.assert_called_once_with("-1.68,48.11", "-1.46,47.29", [])
+        self.assertTrue(routes.is_cached("-1.68,48.11", "-1.46,47.29", []))
+
+        # Already cached pairs are skipped
+        call_command("warm_routes_cache", limit=1, stdout=StringIO())
+        mock_routing.assert_called_once()
@@ -0,0 +1,56 @@
+import asyncio
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from carpool import singleflight
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_concurrent_calls_are_coalesced(self):
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.2)
+            return ["Rennes"]
+
+        results = await asyncio.gather(
+            *(singleflight.do("completion:renn", call, timeout=5) for _ in range(5))
+        )
+        self.assertEqual(results, [["Rennes"]] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(
+            await asyncio.to_thread(singleflight.stats),
+            {"singleflight_calls": 1, "singleflight_saved": 4, "saved_ratio": 0.8},
+        )
+
+    async def test_follower_calls_when_leader_fails(self):
+        async def failing_call():
+            await asyncio.sleep(0.1)
+            raise ConnectionError
+
+        async def call():
+            return ["Rennes"]
+
+        leader = asyncio.create_task(singleflight.do("key", failing_call, timeout=5))
+        await asyncio.sleep(0.01)
+        follower = await singleflight.do("key", call, timeout=5)
+        self.assertEqual(follower, ["Rennes"])
+        with self.assertRaises(ConnectionError):
+            await leader
+
+    async def test_follower_timeout(self):
+        async def slow_call():
+            await asyncio.sleep(0.5)
+            return []
+
+        leader = asyncio.create_task(singleflight.do("key", slow_call, timeout=5))
+        await asyncio.sleep(0.01)
+        with self.assertRaises(TimeoutError):
+            await singleflight.do("key", slow_call, timeout=0.1)
+        await leader
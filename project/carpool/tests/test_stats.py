@@ -0,0 +1,81 @@
+from django.contrib.gis.geos import LineString
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.tests.factories import UserFactory
+from carpool import stats
+from carpool.models.ride import Ride
+from carpool.models.statistics import MonthlyStatistics, RideFact, Statistics
+from carpool.tests.factories import RideFactory, VehicleFactory
+
+
+class IncrementalStatisticsTestCase(TestCase):
+    def setUp(self):
+        self.driver = UserFactory()
+        self.vehicle = VehicleFactory(driver=self.driver, geqCO2_per_km=100)
+        self.ride = self.create_ride()
+
+    def create_ride(self, **kwargs):
+        return RideFactory(
+            driver=self.driver,
+            vehicle=self.vehicle,
+            geometry=LineString((-1.6778, 48.1173), (-1.5536, 47.2184), srid=4326),
+            **kwargs,
+        )
+
+    def assertTotals(self, rides, co2):
+        statistics = Statistics.objects.get()
+        self.assertEqual(statistics.total_rides, rides)
+        self.assertAlmostEqual(statistics.total_co2, co2, places=3)
+        self.assertEqual(stats.reconcile(), [])
+
+    def test_update(self):
+        self.assertEqual(stats.update(), 1)
+        fact = RideFact.objects.get()
+        self.assertAlmostEqual(fact.distance_km, 100, delta=5)
+        self.assertEqual(fact.rider_count, 0)
+        self.assertTotals(1, 0)
+
+        # The rides of the overlap window are refreshed again by the next run
+        self.assertEqual(stats.update(), 1)
+        # Only the rides changed since then are refreshed
+        Ride.objects.filter(pk=self.ride.pk).update(
+            updated_at=timezone.now() - 2 * stats.WATERMARK_OVERLAP
+        )
+        self.assertEqual(stats.update(), 0)
+        self.ride.rider.add(UserFactory(), UserFactory())
+        self.assertEqual(stats.update(), 1)
+        fact.refresh_from_db()
+        self.assertEqual(fact.rider_count, 2)
+        self.assertTotals(1, 2 * fact.distance_km * 100 / 1000)
+
+        month = MonthlyStatistics.objects.get(year=fact.year, month=fact.month)
+        self.assertEqual(month.total_rides, 1)
+
+    def test_deleted_ride(self):
+        other = self.create_ride()
+        other.rider.add(UserFactory())
+        stats.update()
+
+        other.delete()
+        self.assertTotals(1, 0)
+
+    def test_ride_moved_to_another_month(self):
+        stats.update()
+        self.ride.start_dt = self.ride.start_dt + timezone.timedelta(days=62)
+        self.ride.save()
+        stats.update()
+
+        self.assertEqual(MonthlyStatistics.objects.filter(total_rides=1).count(), 1)
+        self.assertTotals(1, 0)
+
+    def test_reconcile(self):
+        stats.update()
+        Statistics.objects.update(total_rides=10)
+        # Changed without updated_at, as a raw SQL update would
+        Ride.objects.filter(pk=self.ride.pk).update(distance_km=50)
+
+        differences = stats.reconcile(fix=True)
+        self.assertIn((None, "total_rides", 10, 1), differences)
+        self.assertEqual(RideFact.objects.get().distance_km, 50)
+        self.assertTotals(1, 0)
@@ -1,11 +1,20 @@
+from io import StringIO
+
 from accounts.tests.factories import UserFactory
 
 from django.conf import settings
+from django.contrib.gis.geos import LineString
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase
 from django.urls import reverse
 
+from carpool.pagination import CursorPaginator
 from carpool.tests.factories import RideFactory, VehicleFactory
 from carpool.models.reservation import Reservation
+from carpool.models.ride import Ride
 from chat.models import ChatRequest
 
 
@@ -215,4 +224,204 @@ class RideSubscriptionTestCase(TestCase):
         self.assertEqual(ride.rider.count(), 1)
 
 
-        
\ No newline at end of file
+RENNES = (-1.6778, 48.1173)
+VITRE = (-1.2081, 48.1236)
+NANTES = (-1.5536, 47.2184)
+PARIS = (2.3522, 48.8566)
+LYON = (4.8357, 45.7640)
+
+
+class RidesListFilterTestCase(TestCase):
+    def setUp(self):
+        driver = UserFactory()
+        self.rennes_nantes = RideFactory(
+            driver=driver, geometry=LineString(RENNES, VITRE, NANTES, srid=4326)
+        )
+        self.nantes_rennes = RideFactory(
+            driver=driver, geometry=LineString(NANTES, VITRE, RENNES, srid=4326)
+        )
+        self.paris_lyon = RideFactory(
+            driver=driver, geometry=LineString(PARIS, LYON, srid=4326)
+        )
+
+    def search(self, **params):
+        return self.client.get(reverse("carpool:list"), params)
+
+    def test_filter_by_arrival(self):
+        r = self.search(a_latlng=f"{NANTES[1]},{NANTES[0]}")
+        self.assertEqual(r.status_code, 200)
+        self.assertIn(self.rennes_nantes, r.context["rides"])
+        self.assertIn(self.nantes_rennes, r.context["rides"])
+        self.assertNotIn(self.paris_lyon, r.context["rides"])
+
+    def test_filter_by_departure_and_arrival_checks_direction(self):
+        r = self.search(
+            d_latlng=f"{RENNES[1]},{RENNES[0]}",
+            a_latlng=f"{NANTES[1]},{NANTES[0]}",
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(list(r.context["rides"]), [self.rennes_nantes])
+
+    def test_filter_by_arrival_invalid_coordinates(self):
+        r = self.search(a_latlng="not,coordinates")
+        self.assertEqual(r.status_code, 400)
+
+
+class RidesListPaginationTestCase(TestCase):
+    def setUp(self):
+        driver = UserFactory()
+        # All the rides start at the same time, the uuid breaks the ties
+        self.rides = [RideFactory(driver=driver) for _ in range(10)]
+
+    def test_cursor_pagination(self):
+        r = self.client.get(reverse("carpool:list"))
+        first_page = list(r.context["rides"])
+        self.assertEqual(len(first_page), 8)
+        self.assertFalse(r.context["page_obj"].has_previous)
+        self.assertTrue(r.context["page_obj"].has_next)
+
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get(
+                reverse("carpool:list"), {"after": r.context["page_obj"].next_cursor}
+            )
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries.captured_queries))
+        second_page = list(r.context["rides"])
+        self.assertEqual(len(second_page), 2)
+        self.assertFalse(r.context["page_obj"].has_next)
+        self.assertCountEqual(first_page + second_page, self.rides)
+
+        r = self.client.get(
+            reverse("carpool:list"), {"before": r.context["page_obj"].previous_cursor}
+        )
+        self.assertEqual(list(r.context["rides"]), first_page)
+        self.assertFalse(r.context["page_obj"].has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        r = self.client.get(reverse("carpool:list"), {"after": "not-a-cursor"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.context["rides"]), 8)
+
+    def test_count_is_opt_in(self):
+        rides = Ride.objects.all()
+        with self.assertNumQueries(0):
+            self.assertIsNone(CursorPaginator(rides, 8).count)
+        with self.assertNumQueries(1):
+            self.assertEqual(CursorPaginator(rides, 8, count="exact").count, 10)
+        self.assertIsInstance(CursorPaginator(rides, 8, count="estimate").count, int)
+        with self.assertRaises(ValueError):
+            CursorPaginator(rides, 8, count="approximate")
+
+
+class RidesGeoJSONTestCase(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+        self.rennes_nantes = RideFactory(
+            driver=self.user, geometry=LineString(RENNES, VITRE, NANTES, srid=4326)
+        )
+        self.paris_lyon = RideFactory(
+            driver=self.user, geometry=LineString(PARIS, LYON, srid=4326)
+        )
+        # Brittany
+        self.params = {"bbox": "-2.5,47,-1,48.5", "zoom": "9"}
+
+    def test_only_rides_in_viewport(self):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get(reverse("carpool:rides_geojson"), self.params)
+        self.assertEqual(r.status_code, 200)
+        data = r.json()
+        self.assertEqual(data["type"], "FeatureCollection")
+        self.assertEqual(
+            [f["properties"]["uuid"] for f in data["features"]],
+            [str(self.rennes_nantes.uuid)],
+        )
+        feature = data["features"][0]
+        self.assertEqual(feature["geometry"]["type"], "LineString")
+        self.assertEqual(
+            feature["properties"]["start_name"], self.rennes_nantes.start_loc.fulltext
+        )
+        # Session, user, ETag aggregate and rides: the locations are joined
+        self.assertEqual(len(queries), 4)
+
+    def test_etag(self):
+        r = self.client.get(reverse("carpool:rides_geojson"), self.params)
+        etag = r["ETag"]
+
+        r = self.client.get(
+            reverse("carpool:rides_geojson"), self.params, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(r.status_code, 304)
+
+        self.rennes_nantes.price += 1
+        self.rennes_nantes.save()
+        r = self.client.get(
+            reverse("carpool:rides_geojson"), self.params, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["ETag"], etag)
+
+    def test_invalid_viewport(self):
+        r = self.client.get(
+            reverse("carpool:rides_geojson"), {"bbox": "1,2,3", "zoom": "9"}
+        )
+        self.assertEqual(r.status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+        r = self.client.get(reverse("carpool:rides_geojson"), self.params)
+        self.assertEqual(r.status_code, 302)
+
+
+class RidesTilesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+        self.ride = RideFactory(
+            driver=self.user, geometry=LineString(RENNES, VITRE, NANTES, srid=4326)
+        )
+        # Tiles containing Rennes and Lyon at zoom 6
+        self.rennes_tile = reverse("carpool:tiles", kwargs={"z": 6, "x": 31, "y": 22})
+        self.lyon_tile = reverse("carpool:tiles", kwargs={"z": 6, "x": 32, "y": 22})
+
+    def test_tile(self):
+        r = self.client.get(self.rennes_tile)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "application/vnd.mapbox-vector-tile")
+        self.assertIn(str(self.ride.uuid).encode(), r.content)
+
+        r = self.client.get(self.lyon_tile)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.content, b"")
+
+    def test_tile_cache_invalidated_on_change(self):
+        r = self.client.get(self.rennes_tile)
+        etag = r["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get(self.rennes_tile)
+        self.assertEqual(r.status_code, 200)
+        self.assertFalse(any("ST_AsMVT" in q["sql"] for q in queries.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ride.delete()
+
+        r = self.client.get(self.rennes_tile, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn(str(self.ride.uuid).encode(), r.content)
+
+    def test_invalid_tile(self):
+        r = self.client.get(reverse("carpool:tiles", kwargs={"z": 2, "x": 4, "y": 0}))
+        self.assertEqual(r.status_code, 404)
+
+
+class BenchmarkRidesSearchCommandTestCase(TestCase):
+    def test_benchmark_is_rolled_back(self):
+        out = StringIO()
+        call_command(
+            "benchmark_rides_search", rides=50, runs=2, budget_ms=10_000, stdout=out
+        )
+        self.assertIn("within budget", out.getvalue())
+        self.assertFalse(
+            Ride.objects.filter(driver__username="benchmark-driver").exists()
+        )
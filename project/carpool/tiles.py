@@ -0,0 +1,111 @@
+"""
+Mapbox Vector Tiles (MVT) of the upcoming rides, built by PostGIS.
+
+The rides of a tile are selected with the ORM (so that "upcoming" means the
+same thing everywhere) and encoded with ``ST_AsMVT``. Tiles are cached under a
+key containing a version number which is bumped whenever a ride is created,
+edited or deleted (see ``carpool.signals``): every cached tile is invalidated
+at once, without having to find which tiles the ride crosses.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from carpool.models import Location
+from carpool.models.ride import Ride
+
+TILES_VERSION_KEY = "carpool:tiles:version"
+
+# Name of the layer of the rides in the tiles
+LAYER_NAME = "rides"
+
+TILE_QUERY = """
+SELECT ST_AsMVT(tile, %s, 4096, 'geom') FROM (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(COALESCE(ride.{geometry}, ride.geometry), 3857),
+            ST_TileEnvelope(%s, %s, %s)
+        ) AS geom,
+        ride.uuid::text AS uuid,
+        to_char(
+            ride.start_dt AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"'
+        ) AS start_dt,
+        ride.price,
+        ride.seats_offered - ride.booked_seats AS remaining_seats,
+        (extract(epoch FROM ride.duration) / 60)::integer AS duration,
+        start_loc.fulltext AS start_name,
+        end_loc.fulltext AS end_name
+    FROM {ride_table} AS ride
+    LEFT JOIN {location_table} AS start_loc ON start_loc.id = ride.start_loc_id
+    LEFT JOIN {location_table} AS end_loc ON end_loc.id = ride.end_loc_id
+    WHERE ride.uuid IN ({rides})
+) AS tile
+"""
+
+
+def tile_envelope(z, x, y):
+    """WGS84 bounding box of the web mercator tile ``z/x/y``."""
+
+    def lng(x):
+        return x / 2**z * 360 - 180
+
+    def lat(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / 2**z))))
+
+    envelope = Polygon.from_bbox((lng(x), lat(y + 1), lng(x + 1), lat(y)))
+    envelope.srid = 4326
+    return envelope
+
+
+def tiles_version():
+    # Start from the current time so that a lost version never reuses the
+    # keys of tiles cached before.
+    return cache.get_or_set(TILES_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def invalidate_tiles():
+    try:
+        cache.incr(TILES_VERSION_KEY)
+    except ValueError:
+        cache.set(TILES_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def tile_cache_key(z, x, y, day=None):
+    # Rides leave the tiles at midnight, when they are not upcoming anymore
+    return f"carpool:tiles:{tiles_version()}:{timezone.localdate()}:{day}:{z}/{x}/{y}"
+
+
+def render_tile(z, x, y, day=None):
+    """Encode the upcoming rides crossing the tile, optionally of one day."""
+    rides = Ride.objects.filter_upcoming().filter(
+        geometry__bboverlaps=tile_envelope(z, x, y)
+    )
+    if day:
+        rides = rides.starting_on(day)
+    rides_sql, rides_params = rides.values("uuid").query.sql_with_params()
+
+    query = TILE_QUERY.format(
+        geometry=Ride.geometry_field_for_zoom(z),
+        ride_table=Ride._meta.db_table,
+        location_table=Location._meta.db_table,
+        rides=rides_sql,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(query, [LAYER_NAME, z, x, y, *rides_params])
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile else b""
+
+
+def get_tile(z, x, y, day=None):
+    key = tile_cache_key(z, x, y, day)
+    tile = cache.get(key)
+    if tile is None:
+        tile = render_tile(z, x, y, day)
+        cache.set(key, tile, settings.MAP_TILES_CACHE_TIMEOUT)
+    return tile
@@ -24,6 +24,7 @@ urlpatterns = [
     path("<uuid:pk>/", rides_detail, name="detail"),
     path("<uuid:pk>/delete/", rides_delete, name="delete"),
     path("map/", rides_map, name="map"),
+    path("tiles/<int:z>/<int:x>/<int:y>.mvt", api_views.rides_tile, name="tiles"),
     path("<uuid:ride_pk>/chat/", request_chat, name="chat"),
     path("<uuid:ride_pk>/subscribe/", rides_subscribe, name="subscribe"),
 ]
@@ -43,6 +44,7 @@ urlpatterns += [
     path("api/vehicles/<int:pk>/update/", vehicle_views.update, name="update_vehicle"),
     path("api/completion/", api_views.autocompletion, name="completion"),
     path("api/routing/", api_views.routing, name="routing"),
+    path("api/rides/geojson/", api_views.rides_geojson, name="rides_geojson"),
 ]
 
 
@@ -1,28 +1,24 @@
 import datetime
-import json
 
 from chat.models import ChatRequest
-from carpool.tasks import (
-    send_email_confirmed_ride,
-    send_email_declined_ride,
-    send_email_incoming_reservation_to_driver,
-)
+from carpool import booking
+from carpool.booking import BookingConflict
+from carpool.pagination import CursorPaginator, InvalidCursor
+from carpool.emails import send_email_incoming_reservation_to_driver
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
-from django.contrib.gis.measure import D
 from django.core.paginator import Paginator
-from django.db.models import Count, ExpressionWrapper, F, IntegerField
+from django.db import transaction
+from django.db.models import F
 from django.db.models.functions import TruncDate
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.utils.timezone import localtime
 from django.utils.translation import gettext as _
 from django.views.decorators.http import require_http_methods
-from carpool.templatetags.duration import duration
 
 from carpool.models.reservation import Reservation
 from carpool.models.ride import Ride
@@ -54,34 +50,8 @@ def list_my_rides(request):
 
 @login_required
 def rides_map(request):
-    rides = Ride.objects.filter_upcoming()
-    rides_geo = []
-
-    for ride in rides:
-        if ride.geometry:
-            start_dt_local = localtime(ride.start_dt)
-            rides_geo.append(
-                {
-                    "start": [ride.start_loc.lat, ride.start_loc.lng],
-                    "end": [ride.end_loc.lat, ride.end_loc.lng],
-                    "geometry": json.loads(
-                        ride.geometry.geojson
-                    ),  # supposé être une chaîne GeoJSON valide
-                    "uuid": str(ride.uuid),
-                    "start_name": ride.start_loc.fulltext,
-                    "start_lat": ride.start_loc.lat,
-                    "start_lon": ride.start_loc.lng,
-                    "end_name": ride.end_loc.fulltext,
-                    "end_lat": ride.end_loc.lat,
-                    "end_lon": ride.end_loc.lng,
-                    "start_dt": start_dt_local.isoformat(),
-                    "price": ride.price,
-                    "duration": duration(ride.duration),
-                }
-            )
-
-    context = {"rides_geo": rides_geo}
-    return render(request, "rides/map.html", context)
+    # The rides are drawn from the vector tiles of carpool:tiles
+    return render(request, "rides/map.html")
 
 
 @require_http_methods(["POST"])
@@ -96,19 +66,16 @@ def cancel_reservation(request):
             "You are not allowed to cancel this reservation", status=403
         )
 
-    if reservation.status == Reservation.Status.CANCELED:
+    result = booking.cancel_reservation(reservation)
+
+    if result.conflict == BookingConflict.RESERVATION_CANCELED:
         messages.warning(request, _("This reservation is already canceled."))
         return HttpResponse("This reservation is already canceled", status=400)
 
-    reservation.status = Reservation.Status.CANCELED
-
-    if reservation.user in reservation.ride.rider.all():
-        # Check if the user is already in the ride's riders
+    if result.seat_released:
         messages.warning(request, _("You have been removed from the ride's riders."))
-        reservation.ride.rider.remove(reservation.user)
 
     messages.warning(request, _("You have successfully canceled your reservation."))
-    reservation.save()
     return redirect(next_url)
 
 
@@ -121,32 +88,21 @@ def update_reservation(request):
     if request.user != reservation.ride.driver:
         return HttpResponse("You are not the driver of this ride.", status=403)
 
-    if reservation.status == Reservation.Status.CANCELED:
-        return HttpResponse("This reservation is already canceled.", status=400)
-
     action = request.POST.get("action")
 
     if action == "accept":
-        if (
-            reservation.ride.is_full
-            and reservation.status != Reservation.Status.ACCEPTED
-        ):
-            return HttpResponse("This ride is fully booked.", status=409)
-        reservation.status = Reservation.Status.ACCEPTED
-        send_email_confirmed_ride.delay(reservation.pk)
-        reservation.ride.rider.add(reservation.user)
-
+        result = booking.accept_reservation(reservation)
     elif action == "decline":
-        reservation.status = Reservation.Status.DECLINED
-        if reservation.user in reservation.ride.rider.all():
-            # Check if the user is already in the ride's riders
-            reservation.ride.rider.remove(reservation.user)
-
-        send_email_declined_ride.delay(reservation.pk)
+        result = booking.decline_reservation(reservation)
     else:
         return HttpResponse("Invalid action", status=400)
 
-    reservation.save()
+    if result.conflict == BookingConflict.RESERVATION_CANCELED:
+        return HttpResponse("This reservation is already canceled.", status=400)
+
+    if result.conflict == BookingConflict.RIDE_FULL:
+        return HttpResponse("This ride is fully booked.", status=409)
+
     return redirect(next_url)
 
 
@@ -155,34 +111,34 @@ def rides_subscribe(request, ride_pk):
     """Create a reservation for the given ride."""
     ride = get_object_or_404(Ride, pk=ride_pk)
     if request.method == "POST":
-        if ride.has_ended:
+        # Get the chat request
+        ChatRequest.objects.get(user=request.user, ride=ride)
+
+        # The driver is emailed if and only if the reservation is created
+        site_url = request.scheme + "://" + request.get_host()
+        with transaction.atomic():
+            result = booking.request_seat(ride, request.user)
+            if result.ok:
+                send_email_incoming_reservation_to_driver(
+                    site_url,
+                    reservation_pk=result.reservation.pk,
+                )
+
+        if result.conflict == BookingConflict.RIDE_ENDED:
             messages.error(request, "You cannot book a completed ride.")
             return redirect("carpool:list")
-        if ride.is_full:
+        if result.conflict == BookingConflict.RIDE_FULL:
             messages.error(
                 request, "This ride is fully booked. You cannot reserve a seat."
             )
             return redirect("carpool:list")
-        # Get the chat request
-        ChatRequest.objects.get(user=request.user, ride=ride)
-
-        if Reservation.objects.filter(
-            user=request.user, ride=ride, status__in=["DECLINED", "ACCEPTED"]
-        ).exists():
+        if result.conflict == BookingConflict.ALREADY_BOOKED:
             logging.warning(f"User {request.user} has already booked ride {ride.pk}")
             messages.error(request, _("You have already booked this ride."))
             return redirect("carpool:detail", pk=ride.pk)
 
-        # Subscribe the user to the ride
-        reservation = ride.reservations.create(user=request.user)
         logging.info(f"User {request.user} booked ride {ride.pk}")
 
-        site_url = request.scheme + "://" + request.get_host()
-        send_email_incoming_reservation_to_driver.delay(
-            site_url,
-            reservation_pk=reservation.pk,
-        )
-
         messages.success(request, _("You have successfully booked this ride."))
 
         # Redirect to chat:room with join_request associated to this user and ride
@@ -191,11 +147,17 @@ def rides_subscribe(request, ride_pk):
             return redirect("chat:room", jr_pk=join_request.pk)
         return redirect("chat:index")
 
-        messages.info(request, _("You subscribed to this ride."))
-
     return redirect("carpool:detail", pk=ride.pk)
 
 
+def _requested_zoom(request):
+    """Zoom level of the map given in the query string, if any."""
+    try:
+        return int(request.GET["zoom"])
+    except (KeyError, ValueError):
+        return None
+
+
 @login_required
 def rides_detail(request, pk):
     # Check if the user has already booked this ride
@@ -215,7 +177,7 @@ def rides_detail(request, pk):
     context = {
         "ride": ride,
         "steps_json": steps_json,
-        "geometry": ride.geometry.geojson,
+        "geometry": ride.geometry_for_zoom(_requested_zoom(request)).geojson,
         "reservation": reservation,
         "chat_request": chat_request,
     }
@@ -243,7 +205,8 @@ def rides_delete(request, pk):
             return redirect("carpool:detail", pk=ride.pk)
         return redirect("carpool:my-rides")
 
-    context = {"ride": ride, "geometry": ride.geometry.geojson}
+    geometry = ride.geometry_for_zoom(_requested_zoom(request))
+    context = {"ride": ride, "geometry": geometry.geojson}
     return render(request, "rides/delete.html", context)
 
 
@@ -262,54 +225,62 @@ def rides_list(request):
     filter_start = request.GET.get("d_latlng", "")
     filter_end = request.GET.get("a_latlng", "")
 
-    rides = rides.annotate(
-        booked_seats_count=Count("rider", distinct=True),
-        remaining_seats_count=ExpressionWrapper(
-            F("vehicle__seats") - Count("rider", distinct=True),
-            output_field=IntegerField(),
-        ),
-    ).exclude(remaining_seats_count__lte=0)
+    # Hide full rides, the booked seats are stored on the ride itself
+    rides = rides.exclude(booked_seats__gte=F("seats_offered"))
 
     if filter_date:
         # Get rides for a specific date
         filter_date = datetime.datetime.strptime(filter_date, "%Y-%m-%d").date()
         rides = rides.filter(start_dt__date=filter_date)
 
+    departure = None
     if filter_start:
-        # Do the postgis check if the location is within 10km of the geometry
-        # Check if filter_start is in the format "longitude,latitude"
+        # Check if filter_start is in the format "latitude,longitude"
         try:
             lat, lng = map(float, filter_start.split(","))
-            point = Point(lng, lat, srid=4326)  # (lng, lat) — correct order for GEOS
-            # Annotate rides with distance from the point
-            rides = rides.annotate(distance=Distance("geometry", point))
-            rides = rides.filter(distance__lte=D(km=10))
         except ValueError:
-            print("Invalid coordinates :", filter_start)
             return HttpResponse(
                 "Invalid coordinates format for start location",
                 status=400,
             )
+        departure = Point(lng, lat, srid=4326)  # (lng, lat) — correct order for GEOS
+        # Index-backed proximity search, the distance is only computed for the
+        # rides that pass near the departure (so they can be sorted by it).
+        rides = rides.passing_near(departure).annotate(
+            distance=Distance("geometry", departure)
+        )
 
     if filter_end:
-        # Do the postgis check if the location is within 10km of the geometry
-        # Do nothing for now (or it will be to exclusive to the rides)
-        # TODO: implement it properly
-        pass
+        try:
+            lat, lng = map(float, filter_end.split(","))
+        except ValueError:
+            return HttpResponse(
+                "Invalid coordinates format for end location",
+                status=400,
+            )
+        # Keep the rides passing near the arrival point, and when a departure
+        # is given, only those going from the departure to the arrival.
+        arrival = Point(lng, lat, srid=4326)
+        rides = rides.heading_to(arrival, departure=departure)
 
     rides = rides.annotate(ride_date=TruncDate("start_dt")).order_by(
         "ride_date",
         "start_dt",
     )
 
-    paginator = Paginator(rides, 8)  # Show 4 rides per page.
-
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: ride_date is derived from start_dt, so ordering on
+    # (start_dt, uuid) gives the same order and can be served by an index.
+    paginator = CursorPaginator(rides, 8, ordering=("start_dt", "uuid"))
+    try:
+        page_obj = paginator.get_page(
+            after=request.GET.get("after"), before=request.GET.get("before")
+        )
+    except InvalidCursor:
+        page_obj = paginator.get_page()
 
     querydict = request.GET.copy()
-    if "page" in querydict:
-        querydict.pop("page")
+    for param in ("after", "before"):
+        querydict.pop(param, None)
     querystring = querydict.urlencode()
 
     context = {
@@ -1,7 +1,76 @@
+import datetime
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.contrib.gis.geos import Polygon
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
 from asgiref.sync import sync_to_async
+import celery.exceptions
+import httpx
+from carpool import (
+    completion,
+    gazetteer,
+    geoplateforme,
+    routes,
+    singleflight,
+    tiles,
+)
+from carpool.circuitbreaker import CircuitOpenError
+from carpool.models.ride import Ride
 from carpool.tasks import get_autocompletion, get_routing
+from carpool.templatetags.duration import duration
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of rides returned for a single viewport, the soonest first
+MAP_MAX_RIDES = 500
+
+
+async def _call_api(in_process, task, *args, deadline=None):
+    """
+    Call the geoplateforme API in-process if enabled, or through the Celery
+    ``task``, which is also the fallback when the API cannot be reached.
+    A timeout is not retried: the caller would have given up anyway.
+
+    The ``deadline`` (timestamp), if any, is given to the task so that it
+    does not retry once the caller has given up.
+    """
+    if settings.GEOPLATEFORME_IN_PROCESS:
+        try:
+            return await in_process(*args)
+        except httpx.TimeoutException:
+            raise
+        except httpx.HTTPError as e:
+            logger.warning(f"In-process call to {task.name} failed: {e}")
+
+    if deadline is None:
+        result = task.delay(*args)
+        timeout = geoplateforme.REQUEST_TIMEOUT
+    else:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            # A follower of a failed singleflight call may come this late
+            raise TimeoutError("Deadline of the API call exceeded")
+        # Not even started by then, the task is dropped by the worker
+        result = task.apply_async(args, {"deadline": deadline}, expires=timeout)
+    try:
+        # blocking I/O offloaded
+        return await sync_to_async(result.get)(timeout=timeout)
+    except celery.exceptions.TimeoutError as e:
+        # Not a subclass of the builtin one the views handle
+        raise TimeoutError(str(e)) from e
 
 
 @login_required
@@ -10,12 +79,32 @@ async def autocompletion(request) -> JsonResponse:
     An async API proxy endpoint to get latitude and
     longitude for a given query.
     """
-    text = request.GET.get("text", "")
+    text = completion.normalize_query(request.GET.get("text", ""))
     if not text:
         return JsonResponse({"status": "NOK"}, status=400)
 
-    task = get_autocompletion.delay(text)
-    result = await sync_to_async(task.get)(timeout=5)  # blocking I/O offloaded
+    # Known locations first, the remote API only completes them
+    local = await sync_to_async(gazetteer.suggest)(text)
+    if gazetteer.is_enough(local):
+        return JsonResponse({"status": "OK", "results": local}, status=200)
+
+    result = await sync_to_async(completion.get_cached)(text)
+    if result is None:
+        try:
+            result = await singleflight.do(
+                f"completion:{text}",
+                lambda: _call_api(geoplateforme.autocomplete, get_autocompletion, text),
+                timeout=geoplateforme.REQUEST_TIMEOUT,
+            )
+        except (httpx.TimeoutException, TimeoutError):
+            if local:
+                return JsonResponse({"status": "OK", "results": local}, status=200)
+            return JsonResponse({"status": "NOK"}, status=504)
+        # An empty result may be an API error, do not keep it
+        if result:
+            await sync_to_async(completion.store)(text, result)
+
+    result = gazetteer.merge(local, result)
     return JsonResponse({"status": "OK", "results": result}, safe=False, status=200)
 
 
@@ -31,6 +120,167 @@ async def routing(request) -> JsonResponse:
 
     if not start or not end:
         return JsonResponse({"status": "NOK"}, status=400)
-    task = get_routing.delay(start, end, intermediates)
-    res = await sync_to_async(task.get)(timeout=5)  # blocking I/O offloaded
+
+    res = await sync_to_async(routes.get_cached)(start, end, intermediates)
+    if res is None:
+        if await sync_to_async(geoplateforme.routing_circuit.is_open)():
+            # The routing API is unhealthy, do not wait for it
+            return JsonResponse({"status": "NOK"}, status=503)
+
+        deadline = time.time() + geoplateforme.REQUEST_TIMEOUT
+        # Routes close enough to share a cache entry share the call too
+        key = routes.route_key(start, end, intermediates) or repr(
+            (start, end, intermediates)
+        )
+        try:
+            res = await singleflight.do(
+                f"routing:{key}",
+                lambda: _call_api(
+                    geoplateforme.route,
+                    get_routing,
+                    start,
+                    end,
+                    intermediates,
+                    deadline=deadline,
+                ),
+                timeout=geoplateforme.REQUEST_TIMEOUT,
+            )
+        except CircuitOpenError:
+            return JsonResponse({"status": "NOK"}, status=503)
+        except (httpx.TimeoutException, TimeoutError):
+            return JsonResponse({"status": "NOK"}, status=504)
+        await sync_to_async(routes.store)(start, end, intermediates, res)
     return JsonResponse(res, safe=False)
+
+
+def _viewport_rides(request):
+    """
+    Return the upcoming rides crossing the ``bbox`` (``west,south,east,north``
+    as given by Leaflet's ``toBBoxString()``) of the request, optionally
+    restricted to the ``start_dt`` day, and the requested zoom level.
+    Return ``None`` if the parameters are invalid.
+    """
+    try:
+        west, south, east, north = (
+            float(v) for v in request.GET.get("bbox", "").split(",")
+        )
+        zoom = int(request.GET.get("zoom", ""))
+        day = request.GET.get("start_dt")
+        day = datetime.date.fromisoformat(day) if day else None
+    except ValueError:
+        return None
+
+    # Leaflet goes beyond the antimeridian when the world is wrapped
+    viewport = Polygon.from_bbox(
+        (max(west, -180), max(south, -90), min(east, 180), min(north, 90))
+    )
+    viewport.srid = 4326
+    rides = Ride.objects.filter_upcoming().filter(geometry__intersects=viewport)
+
+    if day:
+        rides = rides.starting_on(day)
+    return rides, zoom
+
+
+def _rides_geojson_etag(request):
+    """
+    Fingerprint of the rides of the viewport, computed with a single aggregate
+    query so that unchanged viewports are answered without serializing them.
+    """
+    viewport = _viewport_rides(request)
+    if viewport is None:
+        return None
+    rides, _zoom = viewport
+    state = rides.aggregate(
+        count=Count("pk"), updated_at=Max("updated_at"), booked=Sum("booked_seats")
+    )
+    key = f"{request.GET.urlencode()}|{get_language()}|{sorted(state.items())}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+@login_required
+@condition(etag_func=_rides_geojson_etag)
+def rides_geojson(request):
+    """
+    GeoJSON FeatureCollection of the upcoming rides in the map viewport.
+    The geometries are serialized by PostGIS and inserted as is in the
+    response, without being parsed in Python.
+    """
+    viewport = _viewport_rides(request)
+    if viewport is None:
+        return JsonResponse({"status": "NOK"}, status=400)
+    rides, zoom = viewport
+    # Simplified geometry matching the zoom level, rides created in bulk may
+    # not have one
+    geometry = Coalesce(Ride.geometry_field_for_zoom(zoom), "geometry")
+
+    rows = (
+        rides.annotate(geojson=AsGeoJSON(geometry, precision=6))
+        .order_by("start_dt", "uuid")
+        .values(
+            "uuid",
+            "geojson",
+            "start_dt",
+            "price",
+            "duration",
+            "start_loc__fulltext",
+            "start_loc__lat",
+            "start_loc__lng",
+            "end_loc__fulltext",
+            "end_loc__lat",
+            "end_loc__lng",
+        )[:MAP_MAX_RIDES]
+    )
+
+    features = []
+    for row in rows:
+        properties = {
+            "uuid": row["uuid"],
+            "start": [row["start_loc__lat"], row["start_loc__lng"]],
+            "end": [row["end_loc__lat"], row["end_loc__lng"]],
+            "start_name": row["start_loc__fulltext"],
+            "end_name": row["end_loc__fulltext"],
+            "start_dt": timezone.localtime(row["start_dt"]),
+            "price": row["price"],
+            "duration": duration(row["duration"]) if row["duration"] else None,
+        }
+        features.append(
+            '{"type":"Feature","geometry":%s,"properties":%s}'
+            % (row["geojson"], json.dumps(properties, cls=DjangoJSONEncoder))
+        )
+
+    response = HttpResponse(
+        '{"type":"FeatureCollection","features":[%s]}' % ",".join(features),
+        content_type="application/geo+json",
+    )
+    # Let the browser keep the response but revalidate it with its ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _tile_request(request, z, x, y):
+    """Validate the tile coordinates and return them with the requested day."""
+    if z > 22 or x >= 2**z or y >= 2**z:
+        raise Http404("No such tile")
+    try:
+        day = request.GET.get("start_dt")
+        day = datetime.date.fromisoformat(day) if day else None
+    except ValueError:
+        raise Http404("Invalid date")
+    return z, x, y, day
+
+
+def _rides_tile_etag(request, z, x, y):
+    # The cache key changes with the tile content, no need to query anything
+    key = tiles.tile_cache_key(*_tile_request(request, z, x, y))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+@login_required
+@condition(etag_func=_rides_tile_etag)
+def rides_tile(request, z, x, y):
+    """Mapbox Vector Tile of the upcoming rides, see ``carpool.tiles``."""
+    tile = tiles.get_tile(*_tile_request(request, z, x, y))
+    response = HttpResponse(tile, content_type="application/vnd.mapbox-vector-tile")
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
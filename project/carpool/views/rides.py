@@ -78,6 +78,8 @@ def create_step2(request):
             step1_data["geometry"] = GEOSGeometry(
                 step1_data.pop("r_geometry", None), srid=4326
             )
+            # Computed from the geometry on save if the route has no distance
+            step1_data["distance_km"] = step1_data.pop("r_distance", None)
             step1_data["start_dt"] = start_dt
             step1_data["end_dt"] = start_dt + duration
             step1_data["duration"] = duration
@@ -0,0 +1,80 @@
+"""
+Who may do what in a chat room.
+
+The authorization of a user in a room is computed once, when the WebSocket
+connects, and kept by the consumer: checking it for every received frame
+would run queries on the event loop. The consumers compute it again when
+they are told to, see ``invalidate_user`` and ``invalidate_chat_request``.
+"""
+
+from dataclasses import dataclass
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from chat.models import ChatRequest
+
+MODERATE_PERMISSION = "chat.can_moderate_messages"
+
+
+@dataclass(frozen=True)
+class ChatAuthorization:
+    chat_request: ChatRequest
+    is_participant: bool = False
+    is_moderator: bool = False
+
+    @property
+    def can_join(self):
+        return self.is_participant or self.is_moderator
+
+
+def get_authorization(user, chat_request_pk):
+    """
+    Return the ``ChatAuthorization`` of ``user`` in the chat, or ``None`` if
+    the chat does not exist or the user is anonymous.
+    """
+    if user.is_anonymous:
+        return None
+    chat_request = (
+        ChatRequest.objects.select_related("user", "ride__driver")
+        .filter(pk=chat_request_pk)
+        .first()
+    )
+    if chat_request is None:
+        return None
+
+    # Permissions are cached on the user object, which lives as long as the
+    # connection: start from fresh ones
+    for cache_name in ("_perm_cache", "_user_perm_cache", "_group_perm_cache"):
+        user.__dict__.pop(cache_name, None)
+
+    return ChatAuthorization(
+        chat_request=chat_request,
+        is_participant=user.pk in (chat_request.user_id, chat_request.ride.driver_id),
+        is_moderator=user.has_perm(MODERATE_PERMISSION),
+    )
+
+
+def user_group_name(user_pk):
+    """Channel group of all the chat connections of a user."""
+    return f"chat_user_{user_pk}"
+
+
+def room_group_name(chat_request_pk):
+    return f"chat_{chat_request_pk}"
+
+
+def _invalidate(group):
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(group, {"type": "chat.authorization"})
+
+
+def invalidate_user(user_pk):
+    """Refresh the authorization of the chat connections of a user."""
+    _invalidate(user_group_name(user_pk))
+
+
+def invalidate_chat_request(chat_request_pk):
+    """Refresh the authorization of the connections to a chat."""
+    _invalidate(room_group_name(chat_request_pk))
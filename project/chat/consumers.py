@@ -3,96 +3,144 @@ import logging
 
 from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.utils import timezone
 
+# Number of messages sent on connection, then by each "load older" request
+HISTORY_PAGE_SIZE = 50
+
+
+def get_history(chat_request, before_id=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Return the ``limit`` messages of the chat preceding the message
+    ``before_id`` (the latest ones by default), oldest first, and whether
+    there are older messages.
+    """
+    from chat import writebehind
+    from chat.models import ChatMessage
+
+    # Messages not inserted yet are read first: if they are inserted in the
+    # meantime, the query below reads them.
+    queued = []
+    if settings.CHAT_WRITE_BEHIND:
+        queued = writebehind.pending(chat_request.pk, before_id, limit + 1)
+
+    messages = ChatMessage.objects.filter(chat_request=chat_request)
+    if before_id is not None:
+        messages = messages.filter(pk__lt=before_id)
+    # One more message tells whether there is another page
+    page = list(
+        messages.order_by("-pk").values(
+            "pk", "sender__uuid", "content", "timestamp", "hidden"
+        )[: limit + 1]
+    )
+
+    if queued:
+        rows = {row["pk"]: row for row in queued}
+        rows.update((row["pk"], row) for row in page)
+        page = sorted(rows.values(), key=lambda row: row["pk"], reverse=True)
+        page = page[: limit + 1]
+    return page[:limit][::-1], len(page) > limit
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
-    # TODO: simplify the logic by using external functions for permission checks and message retrieval
     async def connect(self):
-        from chat.models import ChatMessage, ChatRequest
+        from chat.authorization import (
+            get_authorization,
+            room_group_name,
+            user_group_name,
+        )
 
         self.user = self.scope["user"]
         self.room_name = self.scope["url_route"]["kwargs"]["jr_pk"]
-        self.room_group_name = f"chat_{self.room_name}"
+        self.room_group_name = room_group_name(self.room_name)
+        self.user_group_name = None
 
-        self.chat_request = await sync_to_async(ChatRequest.objects.filter)(
-            pk=self.room_name,
+        # Loaded once with the chat, its ride and its driver, then kept for
+        # the whole connection (see chat_authorization)
+        self.authorization = await sync_to_async(get_authorization)(
+            self.user, self.room_name
         )
 
-        if not await self.chat_request.aexists():
-            logging.error(f"ChatRequest with pk {self.room_name} does not exist.")
+        if self.authorization is None:
+            logging.error(
+                f"ChatRequest with pk {self.room_name} does not exist "
+                f"or user is anonymous."
+            )
             await self.close()
             return
 
-        self.chat_request = await self.chat_request.afirst()
-
-        is_participant = await sync_to_async(
-            lambda: self.user
-            in [self.chat_request.user, self.chat_request.ride.driver],
-        )()
-
-        is_moderator = await sync_to_async(self.user.has_perm)(
-            "chat.can_moderate_messages",
-        )
-
-        if self.user.is_anonymous or (not is_participant and not is_moderator):
+        if not self.authorization.can_join:
             logging.error(
-                f"User {self.user.username} attempted to join chat room {self.room_name} without permission. (Anonymous: {self.user.is_anonymous}, "
-                f"Participant: {is_participant}, Moderator: {is_moderator})",
+                f"User {self.user.username} attempted to join chat room {self.room_name} without permission.",
             )
             await self.close()
             return
 
+        self.chat_request = self.authorization.chat_request
+        self.user_group_name = user_group_name(self.user.pk)
+
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
         await self.accept()
 
-        # Send previous messages with user UUIDs
-        previous_messages = await sync_to_async(list)(
-            ChatMessage.objects.filter(chat_request=self.chat_request)
-            .select_related("sender")
-            .order_by("timestamp")[:50]
-            .values("pk", "sender__uuid", "content", "timestamp", "hidden"),
-        )
+        await self.send_history()
 
-        for message in previous_messages:
-            # if user is not a moderator, hide the content of hidden messages
-            if is_moderator:
-                await self.send(
-                    text_data=json.dumps(
-                        {
-                            "type": "chat.message",
-                            "id": message["pk"],
-                            "message": message["content"],
-                            "timestamp": message["timestamp"].isoformat(),
-                            "user_uuid": str(message["sender__uuid"]),
-                            "hidden": message["hidden"],
-                        },
-                    ),
-                )
-            else:
-                await self.send(
-                    text_data=json.dumps(
+    @property
+    def is_moderator(self):
+        return self.authorization.is_moderator
+
+    async def send_history(self, before_id=None):
+        """
+        Send a page of previous messages as a single ``chat.history`` frame.
+        Hidden messages are only shown to moderators.
+        """
+        messages, has_more = await sync_to_async(get_history)(
+            self.chat_request, before_id, HISTORY_PAGE_SIZE
+        )
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "chat.history",
+                    "before_id": before_id,
+                    "has_more": has_more,
+                    "messages": [
                         {
-                            "type": "chat.message",
                             "id": message["pk"],
                             "message": "This message has been removed."
-                            if message["hidden"]
+                            if message["hidden"] and not self.is_moderator
                             else message["content"],
                             "timestamp": message["timestamp"].isoformat(),
                             "user_uuid": str(message["sender__uuid"]),
                             "hidden": message["hidden"],
-                        },
-                    ),
-                )
+                        }
+                        for message in messages
+                    ],
+                },
+                separators=(",", ":"),
+            ),
+        )
+
+    async def flush_queued_messages(self):
+        """Insert the queued messages before updating them (write-behind)."""
+        from chat import writebehind
+
+        if settings.CHAT_WRITE_BEHIND:
+            await sync_to_async(writebehind.ensure_flushed)()
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if self.user_group_name:
+            await self.channel_layer.group_discard(
+                self.user_group_name, self.channel_name
+            )
 
     async def receive(self, text_data):
         """Handle incoming messages from the WebSocket.
         This method processes the received message, saves it to the database,
         and broadcasts it to the chat room.
         """
+        from chat import unread, writebehind
         from chat.models import ChatMessage
 
         logging.debug(f"Received message: {text_data}")
@@ -108,20 +156,31 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 )
                 return
 
-            message = await ChatMessage.objects.acreate(
-                chat_request=self.chat_request,
-                sender=self.user,
-                content=message,
-                timestamp=timestamp,
-            )
+            if settings.CHAT_WRITE_BEHIND:
+                # Inserted and counted as unread later by the
+                # flush_chat_messages command
+                message_id = await sync_to_async(writebehind.enqueue)(
+                    self.chat_request.pk, self.user, message, timestamp
+                )
+            else:
+                chat_message = await ChatMessage.objects.acreate(
+                    chat_request=self.chat_request,
+                    sender=self.user,
+                    content=message,
+                    timestamp=timestamp,
+                )
+                message_id = chat_message.id
+                await sync_to_async(unread.message_sent)(
+                    self.chat_request, self.user.pk
+                )
 
             # Broadcast the message with user UUID
             data = {
                 "type": "chat.message",
-                "message": message.content,
+                "message": message,
                 "timestamp": timestamp.isoformat(),
-                "user_uuid": str(message.sender.uuid),
-                "message_id": message.id,
+                "user_uuid": str(self.user.uuid),
+                "message_id": message_id,
             }
 
             logging.debug(f"Broadcasting message: {data}")
@@ -133,14 +192,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message_id = text_data.get("message_id")
 
             if action == "hide" and message_id:
-                if not self.user.has_perm("chat.can_moderate_messages"):
+                if not self.is_moderator:
                     logging.warning(
                         f"User {self.user.username} attempted to hide a message without permission.",
                     )
                     return
+                await self.flush_queued_messages()
                 # Hide the message
                 _ = await sync_to_async(
-                    ChatMessage.objects.filter(pk=message_id).update,
+                    ChatMessage.objects.filter(
+                        pk=message_id, chat_request=self.chat_request
+                    ).update,
                 )(hidden=True)
 
                 await self.channel_layer.group_send(
@@ -153,13 +215,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 )
 
             elif action == "unhide" and message_id:
-                if not self.user.has_perm("chat.can_moderate_messages"):
+                if not self.is_moderator:
                     logging.warning(
                         f"User {self.user.username} attempted to unhide a message without permission.",
                     )
                     return
+                await self.flush_queued_messages()
                 _ = await sync_to_async(
-                    ChatMessage.objects.filter(pk=message_id).update,
+                    ChatMessage.objects.filter(
+                        pk=message_id, chat_request=self.chat_request
+                    ).update,
                 )(hidden=False)
 
                 await self.channel_layer.group_send(
@@ -171,22 +236,34 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     },
                 )
 
+            elif action == "history":
+                # Older messages, before the oldest one the client has
+                try:
+                    before_id = int(text_data["before_id"])
+                except (KeyError, TypeError, ValueError):
+                    return
+                await self.send_history(before_id)
+
             elif action == "mark_read":
                 logging.debug(
                     f"User {self.user.username} is marking messages as read in chat {self.room_name}.",
                 )
-                # Mark all messages in this chat as read by the user
+                # Only the participants have a read state
+                if self.authorization.is_participant:
+                    await sync_to_async(unread.mark_read)(self.chat_request, self.user)
 
-                chats = await sync_to_async(
-                    ChatMessage.objects.filter(
-                        chat_request=self.chat_request,
-                        read_at__isnull=True,
-                    )
-                    .exclude(sender=self.user)
-                    .update
-                )(read_at=timezone.now())
+    async def chat_authorization(self, event):
+        """
+        Handler for type 'chat.authorization': the permissions of the user or
+        the participants of the chat changed, compute the authorization again.
+        """
+        from chat.authorization import get_authorization
 
-                logging.debug(f"Marked {chats} messages as read.")
+        self.authorization = await sync_to_async(get_authorization)(
+            self.user, self.room_name
+        )
+        if self.authorization is None or not self.authorization.can_join:
+            await self.close()
 
     async def chat_message(self, event):
         """Handler for type 'chat.message'."""
@@ -232,3 +309,27 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     }
                 )
             )
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """Pushes the notifications of the user, see ``chat.notifications``."""
+
+    async def connect(self):
+        from chat.notifications import group_name
+
+        self.user = self.scope["user"]
+        if self.user.is_anonymous:
+            await self.close()
+            return
+
+        self.group_name = group_name(self.user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if not self.user.is_anonymous:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification(self, event):
+        """Handler for type 'notification'."""
+        await self.send(text_data=json.dumps(event["event"]))
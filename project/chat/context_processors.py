@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from chat import unread
+
+
+def unread_messages(request):
+    """Number of unread chat messages of the user, for the navbar badge."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # Only queried by the pages showing it
+    return {
+        "unread_messages_count": SimpleLazyObject(lambda: unread.unread_count(user))
+    }
@@ -0,0 +1,65 @@
+"""
+Emails about the chats, queued in the outbox (see ``accounts.outbox``).
+
+The unread messages digest is sent by the ``send_email_unread_messages``
+task instead, see ``chat.tasks``.
+"""
+
+import logging
+
+from django.core.mail import EmailMessage
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.translation import gettext as _
+
+from accounts import outbox
+from accounts.models import User
+from chat.models import ChatMessage, ChatRequest
+
+logger = logging.getLogger(__name__)
+
+
+def send_email_report_to_mods(chat_request_pk, site_base_url):
+    """
+    Send an email report to moderators about a specific chat.
+    """
+    # A moderator is a User that is in a Group (mods) or has can_moderate permission
+    mod_emails = list(
+        User.objects.filter(
+            Q(groups__name="mods")
+            | Q(user_permissions__codename="can_moderate_messages")
+        )
+        .values_list("email", flat=True)
+        .distinct()
+    )
+    if not mod_emails:
+        logger.warning(f"No moderator to report chat request {chat_request_pk} to.")
+        return
+
+    # List all the messages in the chat
+    chat_messages = ChatMessage.objects.filter(
+        chat_request__pk=chat_request_pk
+    ).order_by("timestamp")
+
+    # Prepare the email content
+    context = {
+        "chat_messages": chat_messages,
+        "chat_request": ChatRequest.objects.get(pk=chat_request_pk),
+        "site_base_url": site_base_url,
+    }
+
+    # message render as html
+    message = render_to_string("chat/emails/report_chat.html", context)
+    email = EmailMessage(
+        subject="[INSAROULE] "
+        + _("Chat report")
+        + f" - Chat Request {chat_request_pk}",
+        body=message,
+        to=mod_emails,
+    )
+    email.content_subtype = "html"  # Main content is now text/html
+
+    outbox.enqueue(email)
+    logger.info(
+        f"Queued chat report email to moderators about chat request {chat_request_pk}."
+    )
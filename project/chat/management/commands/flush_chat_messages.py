@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chat import writebehind
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert the chat messages queued in Redis (CHAT_WRITE_BEHIND) "
+        "until stopped, then the remaining ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.CHAT_WRITE_BEHIND_INTERVAL,
+            help="Seconds between two flushes (default: CHAT_WRITE_BEHIND_INTERVAL)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Flush the queued messages once and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            flushed = writebehind.flush()
+            self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} message(s)."))
+            return
+
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        # Stop between two flushes, never in the middle of one
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        flushed = 0
+        while not self.stopping:
+            flushed += writebehind.flush()
+            time.sleep(options["interval"])
+
+        # Messages queued until the very end are not left behind
+        flushed += writebehind.flush()
+        self.stdout.write(
+            self.style.SUCCESS(f"Stopped after flushing {flushed} message(s).")
+        )
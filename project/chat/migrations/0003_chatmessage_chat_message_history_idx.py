@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0002_remove_chatrequest_status"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(
+                fields=["chat_request", "-id"], name="chat_message_history_idx"
+            ),
+        ),
+    ]
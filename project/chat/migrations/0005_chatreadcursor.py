@@ -0,0 +1,102 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# One cursor per participant of the existing chats, from the read_at of the
+# messages they received
+BACKFILL_SQL = """
+INSERT INTO chat_chatreadcursor
+    (chat_request_id, user_id, last_read_message_id, unread_count, updated_at)
+SELECT
+    chat.uuid,
+    participant.user_id,
+    (
+        SELECT max(message.id) FROM chat_chatmessage AS message
+        WHERE message.chat_request_id = chat.uuid
+        AND message.sender_id <> participant.user_id
+        AND message.read_at IS NOT NULL
+    ),
+    (
+        SELECT count(*) FROM chat_chatmessage AS message
+        WHERE message.chat_request_id = chat.uuid
+        AND message.sender_id <> participant.user_id
+        AND message.read_at IS NULL
+    ),
+    now()
+FROM chat_chatrequest AS chat
+JOIN carpool_ride AS ride ON ride.uuid = chat.ride_id
+CROSS JOIN LATERAL (VALUES (chat.user_id), (ride.driver_id)) AS participant (user_id)
+WHERE participant.user_id IS NOT NULL
+ON CONFLICT DO NOTHING
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("carpool", "0017_location_trigram_indexes"),
+        ("chat", "0004_alter_chatmessage_timestamp"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatReadCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_read_message_id",
+                    models.BigIntegerField(
+                        blank=True,
+                        help_text="The id of the last message of the chat read by the user",
+                        null=True,
+                        verbose_name="last read message",
+                    ),
+                ),
+                (
+                    "unread_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The number of messages of the chat not read by the user yet",
+                        verbose_name="unread count",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "chat_request",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_cursors",
+                        to="chat.chatrequest",
+                        verbose_name="chat request",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chat_read_cursors",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("chat_request", "user"), name="unique_chat_read_cursor"
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
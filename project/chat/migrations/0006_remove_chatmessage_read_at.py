@@ -0,0 +1,16 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0005_chatreadcursor"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="chatmessage",
+            name="read_at",
+        ),
+    ]
@@ -3,6 +3,7 @@ from uuid import uuid4
 from carpool.models.ride import Ride
 from django.urls import reverse
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -62,7 +63,8 @@ class ChatMessage(models.Model):
         verbose_name=_("join request"),
     )
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: queued messages are inserted later with their timestamp
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     hidden = models.BooleanField(
         default=False,
@@ -70,14 +72,6 @@ class ChatMessage(models.Model):
         help_text=_("Indicates whether this message is hidden from regular users"),
     )
 
-    read_at = models.DateTimeField(
-        auto_now_add=False,
-        blank=True,
-        null=True,
-        verbose_name=_("read at"),
-        help_text=_("The date and time when the message was read"),
-    )
-
     notified_at = models.DateTimeField(
         auto_now_add=False,
         blank=True,
@@ -91,6 +85,60 @@ class ChatMessage(models.Model):
     class Meta:
         # Custom permission to moderate chat messages
         permissions = (("can_moderate_messages", _("Can moderate chat messages")),)
+        indexes = [
+            # Pages of the chat history, the latest messages first
+            models.Index(
+                fields=["chat_request", "-id"], name="chat_message_history_idx"
+            ),
+        ]
+
+
+class ChatReadCursor(models.Model):
+    """
+    Read state of a chat for one of its participants, kept up to date when
+    messages are sent and read (see ``chat.unread``) so that unread counts
+    are read without scanning the messages.
+    """
+
+    chat_request = models.ForeignKey(
+        ChatRequest,
+        on_delete=models.CASCADE,
+        related_name="read_cursors",
+        verbose_name=_("chat request"),
+    )
+
+    user = models.ForeignKey(
+        "accounts.User",
+        on_delete=models.CASCADE,
+        related_name="chat_read_cursors",
+        verbose_name=_("user"),
+    )
+
+    # Not a foreign key: with write-behind, the message may not be inserted yet
+    last_read_message_id = models.BigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name=_("last read message"),
+        help_text=_("The id of the last message of the chat read by the user"),
+    )
+
+    unread_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("unread count"),
+        help_text=_("The number of messages of the chat not read by the user yet"),
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["chat_request", "user"], name="unique_chat_read_cursor"
+            ),
+        ]
+
+    def __str__(self):
+        return f"ChatReadCursor({self.user_id} in {self.chat_request_id})"
 
 
 class ChatReport(models.Model):
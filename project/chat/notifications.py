@@ -0,0 +1,65 @@
+"""
+Real-time notifications of a user, pushed by the ``NotificationConsumer``
+of every page they have open.
+
+Events are sent to the channel group of the user as ``{"type":
+"notification", "event": {...}}`` and forwarded as is to the browser, which
+updates the navbar badge and the sidebar without reloading the page:
+
+- ``chat.message``: ``count`` new messages in the chat ``chat_request``,
+  ``unread_delta`` is the change of the unread count of the user;
+- ``chat.read``: the user read the chat, with the (negative) ``unread_delta``;
+- ``reservation.status``: the reservation related to the chat changed.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def group_name(user_pk):
+    return f"notifications_{user_pk}"
+
+
+def notify(user_pk, event):
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(
+            group_name(user_pk), {"type": "notification", "event": event}
+        )
+
+
+def message_sent(chat_request, recipients, count=1):
+    for user_pk in recipients:
+        notify(
+            user_pk,
+            {
+                "type": "chat.message",
+                "chat_request": str(chat_request.pk),
+                "count": count,
+                "unread_delta": count,
+            },
+        )
+
+
+def chat_read(chat_request, user_pk, unread_count):
+    """``unread_count`` messages of the chat were read by the user."""
+    if unread_count:
+        notify(
+            user_pk,
+            {
+                "type": "chat.read",
+                "chat_request": str(chat_request.pk),
+                "unread_delta": -unread_count,
+            },
+        )
+
+
+def reservation_changed(reservation, chat_request_pk):
+    event = {
+        "type": "reservation.status",
+        "chat_request": str(chat_request_pk),
+        "reservation": reservation.pk,
+        "status": reservation.status,
+    }
+    for user_pk in (reservation.user_id, reservation.ride.driver_id):
+        notify(user_pk, event)
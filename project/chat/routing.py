@@ -5,4 +5,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     path("ws/chat/<uuid:jr_pk>/", consumers.ChatConsumer.as_asgi()),
+    path("ws/notifications/", consumers.NotificationConsumer.as_asgi()),
 ]
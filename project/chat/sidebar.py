@@ -0,0 +1,71 @@
+"""
+The chat requests listed in the sidebar of the chat pages.
+
+Each list is paginated and loaded with everything the sidebar displays (the
+ride with its driver and locations, the other participant, the last
+reservation status and the unread count), so that rendering the sidebar
+takes a fixed number of queries: a count and a page for each list.
+"""
+
+from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from carpool.models.reservation import Reservation
+from chat.models import ChatReadCursor, ChatRequest
+
+PAGE_SIZE = 4
+
+
+def chat_requests(user):
+    """``ChatRequest`` of ``user`` annotated and joined for the sidebar."""
+    last_reservation_status = Subquery(
+        Reservation.objects.filter(ride=OuterRef("ride"), user=OuterRef("user"))
+        .order_by("-created_at")
+        .values("status")[:1]
+    )
+    # Unread messages of the user, see chat.unread
+    unread_count = Coalesce(
+        Subquery(
+            ChatReadCursor.objects.filter(
+                chat_request=OuterRef("pk"), user=user
+            ).values("unread_count")[:1]
+        ),
+        0,
+    )
+    return (
+        ChatRequest.objects.select_related(
+            "user", "ride__driver", "ride__start_loc", "ride__end_loc"
+        )
+        .annotate(
+            last_reservation_status=last_reservation_status,
+            unread_count=unread_count,
+        )
+        .order_by("ride__start_dt", "pk")
+    )
+
+
+def get_sidebar_context(request):
+    """
+    Get the context for the sidebar, including outgoing and incoming chat requests.
+    Used to avoid code duplication in multiple views.
+    """
+    outgoing_requests = chat_requests(request.user).filter(user=request.user)
+    incoming_requests = chat_requests(request.user).filter(ride__driver=request.user)
+
+    # Filter out past ride's request by default
+    now = timezone.now()
+    if not request.GET.get("o_past"):
+        outgoing_requests = outgoing_requests.filter(ride__start_dt__gte=now)
+    if not request.GET.get("i_past"):
+        incoming_requests = incoming_requests.filter(ride__start_dt__gte=now)
+
+    return {
+        "outgoing_requests": Paginator(outgoing_requests, PAGE_SIZE).get_page(
+            request.GET.get("o_page")
+        ),
+        "incoming_requests": Paginator(incoming_requests, PAGE_SIZE).get_page(
+            request.GET.get("i_page")
+        ),
+    }
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from carpool.models.reservation import Reservation
+from chat import notifications
+from chat.authorization import invalidate_chat_request, invalidate_user
+from chat.models import ChatRequest
+
+PERMISSIONS_ACTIONS = ("post_add", "post_remove", "post_clear")
+
+
+def _invalidate_users(user_pks):
+    def invalidate():
+        for user_pk in user_pks:
+            invalidate_user(user_pk)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_authorization(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    The permissions of users changed, refresh the authorization of their
+    open chat connections (see ``chat.authorization``).
+    """
+    if action not in PERMISSIONS_ACTIONS:
+        return
+    # permission.user_set.add(...) and group.user_set.add(...) are reverse,
+    # the users are then in ``pk_set`` (unknown when cleared)
+    _invalidate_users(list(pk_set or []) if reverse else [instance.pk])
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_authorization(sender, instance, action, reverse, pk_set, **kwargs):
+    """The permissions of groups changed, refresh the ones of their users."""
+    if action not in PERMISSIONS_ACTIONS:
+        return
+    groups = list(pk_set or []) if reverse else [instance.pk]
+    users = User.objects.filter(groups__in=groups).distinct()
+    _invalidate_users(list(users.values_list("pk", flat=True)))
+
+
+@receiver(post_delete, sender=ChatRequest)
+def invalidate_chat_request_authorization(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_chat_request(pk))
+
+
+@receiver(post_save, sender=Reservation)
+def notify_reservation_status(sender, instance, **kwargs):
+    """Push the status of the reservation to the driver and the passenger."""
+
+    def notify():
+        chat_request_pk = (
+            ChatRequest.objects.filter(ride=instance.ride_id, user=instance.user_id)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if chat_request_pk:
+            notifications.reservation_changed(instance, chat_request_pk)
+
+    transaction.on_commit(notify)
@@ -1,61 +1,26 @@
 from collections import defaultdict
+from itertools import batched
 
-from django.contrib.auth.models import Group, Permission
 from accounts.models import User
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from django.conf import settings
-from django.core.mail import EmailMessage
-from django.db.models import Case, Count, F, When
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Case, Count, F, OuterRef, When
 from django.db.models.fields import UUIDField
 from django.template.loader import render_to_string
 from django.utils.translation import gettext as _
 from django.utils import timezone, translation
 
 
-from chat.models import ChatMessage, ChatRequest
+from chat import unread
+from chat.models import ChatMessage
 
 logger = get_task_logger(__name__)
 
-
-@shared_task
-def send_email_report_to_mods(chat_request_pk, site_base_url):
-    """
-    Task to send an email report to moderators about a specific chat.
-    """
-    # A moderator is a User that is in a Group (mods) or has can_moderate permission
-    g = Group.objects.get(name="mods")
-    p = Permission.objects.get(codename="can_moderate_messages")
-    mods = User.objects.filter(groups=g) | User.objects.filter(user_permissions=p)
-    mod_emails = mods.values_list("email", flat=True).distinct()
-
-    # List all the messages in the chat
-    chat_messages = ChatMessage.objects.filter(
-        chat_request__pk=chat_request_pk
-    ).order_by("timestamp")
-
-    # Prepare the email content
-    context = {
-        "chat_messages": chat_messages,
-        "chat_request": ChatRequest.objects.get(pk=chat_request_pk),
-        "site_base_url": site_base_url,
-    }
-
-    # message render as html
-    message = render_to_string("chat/emails/report_chat.html", context)
-    email = EmailMessage(
-        subject="[INSAROULE] "
-        + _("Chat report")
-        + f" - Chat Request {chat_request_pk}",
-        body=message,
-        to=mod_emails,
-    )
-    email.content_subtype = "html"  # Main content is now text/html
-
-    email.send(fail_silently=False)
-    logger.info(
-        f"Sent chat report email to moderators about chat request {chat_request_pk}."
-    )
+# Number of unread messages emails sent at a time
+DIGEST_BATCH_SIZE = 100
 
 
 @shared_task
@@ -67,9 +32,7 @@ def send_email_unread_messages():
     )
 
     unread_struct = (
-        ChatMessage.objects.filter(
-            read_at__isnull=True, notified_at__isnull=True, timestamp__lt=cutoff
-        )
+        ChatMessage.objects.filter(notified_at__isnull=True, timestamp__lt=cutoff)
         .annotate(
             recipient_id=Case(
                 When(
@@ -80,6 +43,9 @@ def send_email_unread_messages():
             ),
             contact=F("sender__username"),
         )
+        # Read state of the recipient, see chat.unread
+        .annotate(last_read_id=unread.last_read_id(OuterRef("recipient_id")))
+        .filter(pk__gt=F("last_read_id"))
         .filter(
             recipient_id__in=User.objects.filter(
                 notification_preferences__unread_messages_notification=True
@@ -94,10 +60,11 @@ def send_email_unread_messages():
             "chat_request__user__username",  # passenger
             "chat_request__ride__driver__username",  # driver
         )
-        .annotate(unread_count=Count("id"))
+        .annotate(unread_count=Count("id"), message_ids=ArrayAgg("id"))
     )
 
     chats_by_user = defaultdict(list)
+    message_ids_by_user = defaultdict(list)
 
     for row in unread_struct:
         chats_by_user[row["recipient_id"]].append(
@@ -111,33 +78,41 @@ def send_email_unread_messages():
                 "contact": row["contact"],
             }
         )
+        message_ids_by_user[row["recipient_id"]].extend(row["message_ids"])
 
-    for user_id, chats in chats_by_user.items():
-        user = User.objects.get(pk=user_id)
-
-        context = {
-            "user": user,
-            "unread_count": sum(chat["unread_count"] for chat in chats),
-            "chats": chats,
-        }
-
-        with translation.override(user.preferred_language):
-            subject = "[INSAROULE]" + _("You have unread messages")
-            message = render_to_string("chat/emails/unread_messages.txt", context)
-
-        email = EmailMessage(
-            subject=subject,
-            body=message,
-            to=[user.email],
-        )
-
-        email.send(fail_silently=False)
+    users = User.objects.only("username", "email", "preferred_language").in_bulk(
+        chats_by_user
+    )
 
-        logger.info(f"Sent email to {user.email} about {len(chats)} chats.")
+    def digests():
+        for user_id, chats in chats_by_user.items():
+            user = users[user_id]
+            context = {
+                "user": user,
+                "unread_count": sum(chat["unread_count"] for chat in chats),
+                "chats": chats,
+            }
 
-        # Update the notified_at timestamp for the messages that were included in the email
-        ChatMessage.objects.filter(
-            chat_request__uuid__in=[c["chat_request_id"] for c in chats],
-            read_at__isnull=True,
-            notified_at__isnull=True,
-        ).update(notified_at=timezone.now())
+            with translation.override(user.preferred_language):
+                subject = "[INSAROULE]" + _("You have unread messages")
+                message = render_to_string("chat/emails/unread_messages.txt", context)
+
+            yield user_id, EmailMessage(subject=subject, body=message, to=[user.email])
+
+    # One SMTP connection for the whole run. The messages of a batch are marked
+    # as notified once it is sent, so that a failure does not send the previous
+    # batches again on the next run.
+    sent = 0
+    with get_connection(fail_silently=False) as connection:
+        for batch in batched(digests(), DIGEST_BATCH_SIZE):
+            connection.send_messages([email for _user_id, email in batch])
+            ChatMessage.objects.filter(
+                pk__in=[
+                    pk
+                    for user_id, _email in batch
+                    for pk in message_ids_by_user[user_id]
+                ]
+            ).update(notified_at=timezone.now())
+            sent += len(batch)
+
+    logger.info(f"Sent unread messages emails to {sent} users.")
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+
+from accounts.tests.factories import UserFactory
+from carpool.tests.factories import RideFactory
+from chat.authorization import get_authorization
+from chat.tests.factories import ChatRequestFactory
+
+
+class AuthorizationTestCase(TestCase):
+    def setUp(self):
+        self.driver = UserFactory()
+        self.user = UserFactory()
+        self.room = ChatRequestFactory(
+            user=self.user, ride=RideFactory(driver=self.driver)
+        )
+
+    def test_participants(self):
+        # The chat, its ride and its driver, then the permissions of the user
+        with self.assertNumQueries(3):
+            authorization = get_authorization(self.driver, self.room.pk)
+        self.assertTrue(authorization.is_participant)
+        self.assertFalse(authorization.is_moderator)
+        self.assertEqual(authorization.chat_request.ride.driver, self.driver)
+
+        authorization = get_authorization(UserFactory(), self.room.pk)
+        self.assertFalse(authorization.can_join)
+
+    def test_moderator_permissions_are_refreshed(self):
+        mod = UserFactory(is_mod=True)
+        self.assertTrue(get_authorization(mod, self.room.pk).is_moderator)
+
+        mod.user_permissions.remove(
+            Permission.objects.get(codename="can_moderate_messages")
+        )
+        self.assertFalse(get_authorization(mod, self.room.pk).can_join)
@@ -1,11 +1,14 @@
+from unittest.mock import patch
+
 from channels.testing import WebsocketCommunicator as WSCommunicator
-from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.models import AnonymousUser, Permission
 from django.test import TransactionTestCase
 from asgiref.sync import sync_to_async
 
 from accounts.tests.factories import UserFactory
 from carpool.tests.factories import RideFactory
-from chat.consumers import ChatConsumer
+from carpool.models.reservation import Reservation
+from chat.consumers import ChatConsumer, NotificationConsumer
 from chat.tests.factories import ChatRequestFactory, ChatMessageFactory
 from chat.models import ChatMessage
 
@@ -19,11 +22,6 @@ TODO: Other tests to be added:
 - Test that actions like hiding messages work as expected.
 """
 
-# TODO: add a function for when a user connect to the ws chat room
-#   it gets all the messages on the connection instead of having
-#   to set u1c.receive_json_from() three times to get all the messages on
-#   the room. This will make the tests cleaner and easier to read.
-
 
 class ChatConsumerTests(TransactionTestCase):
     def setUp(self):
@@ -110,22 +108,21 @@ class ChatConsumerTests(TransactionTestCase):
         await communicator.connect()
 
         msg = await communicator.receive_json_from()
-        self.assertEqual(msg["type"], "chat.message")
-        self.assertEqual(msg["message"], self.c1.content)
-        self.assertEqual(msg["user_uuid"], str(self.c1.sender.uuid))
-        self.assertEqual(msg["hidden"], self.c1.hidden)
+        self.assertEqual(msg["type"], "chat.history")
+        self.assertFalse(msg["has_more"])
+        m1, m2, m3 = msg["messages"]
 
-        msg = await communicator.receive_json_from()
-        self.assertEqual(msg["type"], "chat.message")
-        self.assertEqual(msg["message"], self.c2.content)
-        self.assertEqual(msg["user_uuid"], str(self.c2.sender.uuid))
-        self.assertEqual(msg["hidden"], self.c2.hidden)
+        self.assertEqual(m1["message"], self.c1.content)
+        self.assertEqual(m1["user_uuid"], str(self.c1.sender.uuid))
+        self.assertEqual(m1["hidden"], self.c1.hidden)
 
-        msg = await communicator.receive_json_from()
-        self.assertEqual(msg["type"], "chat.message")
-        self.assertEqual(msg["message"], "This message has been removed.")
-        self.assertEqual(msg["user_uuid"], str(self.c3.sender.uuid))
-        self.assertEqual(msg["hidden"], self.c3.hidden)
+        self.assertEqual(m2["message"], self.c2.content)
+        self.assertEqual(m2["user_uuid"], str(self.c2.sender.uuid))
+        self.assertEqual(m2["hidden"], self.c2.hidden)
+
+        self.assertEqual(m3["message"], "This message has been removed.")
+        self.assertEqual(m3["user_uuid"], str(self.c3.sender.uuid))
+        self.assertEqual(m3["hidden"], self.c3.hidden)
 
         await communicator.disconnect()
 
@@ -140,22 +137,34 @@ class ChatConsumerTests(TransactionTestCase):
         await communicator.connect()
 
         msg = await communicator.receive_json_from()
-        self.assertEqual(msg["type"], "chat.message")
-        self.assertEqual(msg["message"], self.c1.content)
-        self.assertEqual(msg["user_uuid"], str(self.c1.sender.uuid))
-        self.assertEqual(msg["hidden"], self.c1.hidden)
+        self.assertEqual(msg["type"], "chat.history")
+        m1, m2, m3 = msg["messages"]
+
+        self.assertEqual(m1["message"], self.c1.content)
+        self.assertEqual(m2["message"], self.c2.content)
+        self.assertEqual(m3["message"], self.c3.content)
+        self.assertEqual(m3["hidden"], self.c3.hidden)
+
+        await communicator.disconnect()
+
+    @patch("chat.consumers.HISTORY_PAGE_SIZE", 2)
+    async def test_loading_older_messages(self):
+        """Test that the latest messages are sent first, then older pages."""
+        communicator = WSCommunicator(ChatConsumer.as_asgi(), "/chat/")
+        communicator.scope["url_route"] = {"kwargs": {"jr_pk": self.room.pk}}
+        communicator.scope["user"] = self.user1
+        await communicator.connect()
 
         msg = await communicator.receive_json_from()
-        self.assertEqual(msg["type"], "chat.message")
-        self.assertEqual(msg["message"], self.c2.content)
-        self.assertEqual(msg["user_uuid"], str(self.c2.sender.uuid))
-        self.assertEqual(msg["hidden"], self.c2.hidden)
+        self.assertTrue(msg["has_more"])
+        self.assertEqual([m["id"] for m in msg["messages"]], [self.c2.pk, self.c3.pk])
 
+        await communicator.send_json_to({"action": "history", "before_id": self.c2.pk})
         msg = await communicator.receive_json_from()
-        self.assertEqual(msg["type"], "chat.message")
-        self.assertEqual(msg["message"], self.c3.content)
-        self.assertEqual(msg["user_uuid"], str(self.c3.sender.uuid))
-        self.assertEqual(msg["hidden"], self.c3.hidden)
+        self.assertEqual(msg["type"], "chat.history")
+        self.assertEqual(msg["before_id"], self.c2.pk)
+        self.assertFalse(msg["has_more"])
+        self.assertEqual([m["id"] for m in msg["messages"]], [self.c1.pk])
 
         await communicator.disconnect()
 
@@ -168,16 +177,11 @@ class ChatConsumerTests(TransactionTestCase):
         mdc.scope["user"] = self.mod
         u1c.scope["user"] = self.user1
 
-        # TODO simplify this by having a function that connects the user and receives all the messages
         await mdc.connect()
         await mdc.receive_json_from()
-        await mdc.receive_json_from()
-        await mdc.receive_json_from()
 
         await u1c.connect()
         await u1c.receive_json_from()
-        await u1c.receive_json_from()
-        await u1c.receive_json_from()
 
         # User send a message
         await u1c.send_json_to({"type": "chat.message", "message": "Censor me plz"})
@@ -208,13 +212,9 @@ class ChatConsumerTests(TransactionTestCase):
 
         await mdc.connect()
         await mdc.receive_json_from()
-        await mdc.receive_json_from()
-        await mdc.receive_json_from()
 
         await u1c.connect()
         await u1c.receive_json_from()
-        await u1c.receive_json_from()
-        await u1c.receive_json_from()
 
         # User send a message
         await u1c.send_json_to({"type": "chat.message", "message": "Censor me plz"})
@@ -247,6 +247,21 @@ class ChatConsumerTests(TransactionTestCase):
         # Wait for the user to receive the unhidden message
         msg = await u1c.receive_json_from()
 
+    async def test_authorization_is_refreshed_on_invalidation(self):
+        """Test that a moderator losing the permission is disconnected."""
+        mdc = WSCommunicator(ChatConsumer.as_asgi(), "/chat/")
+        mdc.scope["url_route"] = {"kwargs": {"jr_pk": self.room.pk}}
+        mdc.scope["user"] = self.mod
+        await mdc.connect()
+        await mdc.receive_json_from()
+
+        # Invalidates the authorization of the moderator connections
+        permission = await Permission.objects.aget(codename="can_moderate_messages")
+        await sync_to_async(self.mod.user_permissions.remove)(permission)
+
+        output = await mdc.receive_output()
+        self.assertEqual(output["type"], "websocket.close")
+
     async def test_regular_user_cannot_send_chat_actions(self):
         """Test that a regular user cannot send chat actions."""
 
@@ -257,8 +272,6 @@ class ChatConsumerTests(TransactionTestCase):
         # TODO: simplify also this with a simple
         await u1c.connect()
         await u1c.receive_json_from()
-        await u1c.receive_json_from()
-        await u1c.receive_json_from()
 
         # Try to send an action
         await u1c.send_json_to(
@@ -285,13 +298,9 @@ class ChatConsumerTests(TransactionTestCase):
         u2c.scope["user"] = self.user2
         await u1c.connect()
         await u1c.receive_json_from()
-        await u1c.receive_json_from()
-        await u1c.receive_json_from()
 
         await u2c.connect()
         await u2c.receive_json_from()
-        await u2c.receive_json_from()
-        await u2c.receive_json_from()
 
         # Send a new message as user1
         new_message = "Hello, this is a test message."
@@ -309,3 +318,62 @@ class ChatConsumerTests(TransactionTestCase):
 
         await u1c.disconnect()
         await u2c.disconnect()
+
+
+class NotificationConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.driver = UserFactory(email_verified=True)
+        self.passenger = UserFactory(email_verified=True)
+        self.ride = RideFactory(driver=self.driver)
+        self.room = ChatRequestFactory(user=self.passenger, ride=self.ride)
+
+    async def connect(self, user):
+        communicator = WSCommunicator(NotificationConsumer.as_asgi(), "/notifications/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_anonymous_cannot_connect(self):
+        communicator = WSCommunicator(NotificationConsumer.as_asgi(), "/notifications/")
+        communicator.scope["user"] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def test_new_message_updates_the_recipient(self):
+        driver = await self.connect(self.driver)
+        passenger = await self.connect(self.passenger)
+
+        u1c = WSCommunicator(ChatConsumer.as_asgi(), "/chat/")
+        u1c.scope["url_route"] = {"kwargs": {"jr_pk": self.room.pk}}
+        u1c.scope["user"] = self.driver
+        await u1c.connect()
+        await u1c.receive_json_from()
+        await u1c.send_json_to({"type": "chat.message", "message": "Hello"})
+
+        event = await passenger.receive_json_from()
+        self.assertEqual(event["type"], "chat.message")
+        self.assertEqual(event["chat_request"], str(self.room.pk))
+        self.assertEqual(event["unread_delta"], 1)
+        # The sender has nothing new to read
+        self.assertTrue(await driver.receive_nothing())
+
+        await u1c.disconnect()
+        await driver.disconnect()
+        await passenger.disconnect()
+
+    async def test_reservation_status_updates_both_participants(self):
+        driver = await self.connect(self.driver)
+        passenger = await self.connect(self.passenger)
+
+        reservation = await Reservation.objects.acreate(
+            ride=self.ride, user=self.passenger
+        )
+        for communicator in (driver, passenger):
+            event = await communicator.receive_json_from()
+            self.assertEqual(event["type"], "reservation.status")
+            self.assertEqual(event["reservation"], reservation.pk)
+            self.assertEqual(event["status"], Reservation.Status.PENDING)
+
+        await driver.disconnect()
+        await passenger.disconnect()
@@ -0,0 +1,54 @@
+from django.test import RequestFactory, TestCase
+
+from accounts.tests.factories import UserFactory
+from carpool.models.reservation import Reservation
+from carpool.tests.factories import RideFactory
+from chat import unread
+from chat.sidebar import get_sidebar_context
+from chat.tests.factories import ChatMessageFactory, ChatRequestFactory
+
+
+class SidebarTestCase(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        for _ in range(3):
+            # Outgoing request
+            ride = RideFactory(driver=UserFactory())
+            room = ChatRequestFactory(user=self.user, ride=ride)
+            Reservation.objects.create(ride=ride, user=self.user)
+            # Incoming request
+            passenger = UserFactory()
+            ChatRequestFactory(user=passenger, ride=RideFactory(driver=self.user))
+
+        ChatMessageFactory(sender=ride.driver, chat_request=room)
+        unread.message_sent(room, ride.driver.pk)
+        self.room = room
+
+    def render(self, **params):
+        request = RequestFactory().get("/chat/", params)
+        request.user = self.user
+        context = get_sidebar_context(request)
+        return [
+            (
+                jr.pk,
+                jr.ride.start_loc.city,
+                jr.ride.end_loc.city,
+                jr.ride.driver.username,
+                jr.user.username,
+                jr.last_reservation_status,
+                jr.unread_count,
+            )
+            for page in (context["outgoing_requests"], context["incoming_requests"])
+            for jr in page
+        ]
+
+    def test_sidebar(self):
+        rows = {row[0]: row for row in self.render()}
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[self.room.pk][5], Reservation.Status.PENDING)
+        self.assertEqual(rows[self.room.pk][6], 1)
+
+    def test_number_of_queries(self):
+        # A count and a page for each list, whatever the number of requests
+        with self.assertNumQueries(4):
+            self.render()
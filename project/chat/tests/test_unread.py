@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.tests.factories import UserFactory
+from carpool.tests.factories import RideFactory
+from chat import unread
+from chat.models import ChatMessage, ChatReadCursor
+from chat.tasks import send_email_unread_messages
+from chat.tests.factories import ChatMessageFactory, ChatRequestFactory
+
+
+class UnreadCountersTestCase(TestCase):
+    def setUp(self):
+        self.driver = UserFactory()
+        self.passenger = UserFactory()
+        self.room = ChatRequestFactory(
+            user=self.passenger, ride=RideFactory(driver=self.driver)
+        )
+
+    def send(self, sender, count=1):
+        messages = [
+            ChatMessageFactory(sender=sender, chat_request=self.room)
+            for _ in range(count)
+        ]
+        unread.message_sent(self.room, sender.pk, count)
+        return messages
+
+    def test_message_sent_and_read(self):
+        self.send(self.passenger, 2)
+        self.send(self.passenger)
+        self.assertEqual(unread.unread_count(self.driver), 3)
+        # The sender has nothing to read
+        self.assertEqual(unread.unread_count(self.passenger), 0)
+
+        messages = self.send(self.driver)
+        unread.mark_read(self.room, self.driver)
+        cursor = ChatReadCursor.objects.get(chat_request=self.room, user=self.driver)
+        self.assertEqual(cursor.unread_count, 0)
+        self.assertEqual(cursor.last_read_message_id, messages[-1].pk)
+        self.assertEqual(unread.unread_count(self.passenger), 1)
+
+    def test_navbar_badge(self):
+        self.send(self.passenger, 2)
+        self.client.force_login(self.driver)
+        r = self.client.get(reverse("chat:index"))
+        self.assertEqual(r.context["unread_messages_count"], 2)
+
+    def test_digest_skips_read_messages(self):
+        read = self.send(self.passenger, 2)
+        unread.mark_read(self.room, self.driver)
+        (new,) = self.send(self.passenger)
+        ChatMessage.objects.update(
+            timestamp=timezone.now() - timezone.timedelta(days=1)
+        )
+
+        send_email_unread_messages()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.driver.email])
+
+        new.refresh_from_db()
+        self.assertIsNotNone(new.notified_at)
+        self.assertFalse(
+            ChatMessage.objects.filter(
+                pk__in=[m.pk for m in read], notified_at__isnull=False
+            ).exists()
+        )
+
+    @patch("chat.tasks.DIGEST_BATCH_SIZE", 2)
+    def test_digest_is_batched(self):
+        drivers = [UserFactory() for _ in range(4)]
+        for driver in drivers:
+            room = ChatRequestFactory(
+                user=self.passenger, ride=RideFactory(driver=driver)
+            )
+            ChatMessageFactory(sender=self.passenger, chat_request=room)
+        self.send(self.passenger)
+        ChatMessage.objects.update(
+            timestamp=timezone.now() - timezone.timedelta(days=1)
+        )
+
+        with patch("chat.tasks.get_connection", wraps=get_connection) as connection:
+            # The messages, the recipients, and an update per batch of 2
+            with self.assertNumQueries(5):
+                send_email_unread_messages()
+        connection.assert_called_once()
+        self.assertEqual(
+            {m.to[0] for m in mail.outbox},
+            {u.email for u in [self.driver, *drivers]},
+        )
+        self.assertFalse(ChatMessage.objects.filter(notified_at__isnull=True).exists())
@@ -0,0 +1,82 @@
+from uuid import uuid4
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.tests.factories import UserFactory
+from chat import unread, writebehind
+from chat.consumers import get_history
+from chat.models import ChatMessage
+from chat.tests.factories import ChatMessageFactory, ChatRequestFactory
+
+
+@override_settings(CHAT_WRITE_BEHIND=True)
+class WriteBehindTestCase(TestCase):
+    def setUp(self):
+        # Tests running in parallel share Redis, each one has its own keys
+        prefix = f"test:{uuid4().hex}:chat:writebehind"
+        self.enterContext(override_settings(CHAT_WRITE_BEHIND_KEY_PREFIX=prefix))
+        self.addCleanup(self.delete_keys, prefix)
+
+        self.user = UserFactory()
+        self.room = ChatRequestFactory(user=self.user)
+        self.c1 = ChatMessageFactory(sender=self.user, chat_request=self.room)
+
+    def delete_keys(self, prefix):
+        client = writebehind.get_redis()
+        for key in client.scan_iter(f"{prefix}:*"):
+            client.delete(key)
+
+    def enqueue(self, content):
+        return writebehind.enqueue(self.room.pk, self.user, content, timezone.now())
+
+    def test_history_includes_queued_messages(self):
+        message_id = self.enqueue("Not inserted yet")
+        self.assertGreater(message_id, self.c1.pk)
+        self.assertFalse(ChatMessage.objects.filter(pk=message_id).exists())
+
+        messages, has_more = get_history(self.room)
+        self.assertEqual([m["pk"] for m in messages], [self.c1.pk, message_id])
+        self.assertEqual(messages[1]["sender__uuid"], str(self.user.uuid))
+        self.assertFalse(has_more)
+
+        messages, has_more = get_history(self.room, limit=1)
+        self.assertEqual([m["pk"] for m in messages], [message_id])
+        self.assertTrue(has_more)
+
+    def test_flush(self):
+        ids = [self.enqueue(f"Message {i}") for i in range(5)]
+
+        self.assertEqual(writebehind.flush(batch_size=2), 5)
+        self.assertQuerySetEqual(
+            ChatMessage.objects.filter(pk__in=ids).order_by("pk"),
+            ids,
+            transform=lambda m: m.pk,
+        )
+        self.assertEqual(writebehind.pending(self.room.pk), [])
+        # Nothing left to flush
+        self.assertEqual(writebehind.flush(), 0)
+
+        messages, _ = get_history(self.room)
+        self.assertEqual(len(messages), 6)
+
+    def test_flush_is_idempotent(self):
+        message_id = self.enqueue("Inserted twice")
+        writebehind.flush()
+        # As if the flusher crashed before removing the message from Redis
+        writebehind.get_redis().rpush(
+            writebehind.queue_key(),
+            f'{{"id": {message_id}, "chat_request": "{self.room.pk}", '
+            f'"sender": {self.user.pk}, "sender_uuid": "{self.user.uuid}", '
+            f'"content": "Inserted twice", "timestamp": "{timezone.now().isoformat()}"}}',
+        )
+        writebehind.flush()
+        self.assertEqual(ChatMessage.objects.filter(pk=message_id).count(), 1)
+        # Counted once
+        self.assertEqual(unread.unread_count(self.room.ride.driver), 1)
+
+    def test_deleted_chat(self):
+        message_id = self.enqueue("Too late")
+        self.room.delete()
+        self.assertEqual(writebehind.flush(), 1)
+        self.assertFalse(ChatMessage.objects.filter(pk=message_id).exists())
@@ -0,0 +1,94 @@
+"""
+Unread messages of the chats, kept in ``ChatReadCursor`` rows.
+
+A cursor is updated when a message is sent to the user (its unread count
+is incremented) and when the user reads the chat (the count is reset and the
+last read message remembered). Counts are then read without scanning the
+messages, e.g. for the navbar badge, and the changes are pushed to the
+users (see ``chat.notifications``).
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from chat import notifications
+from chat.models import ChatMessage, ChatReadCursor
+
+
+def recipients(chat_request, sender_id):
+    """Participants of the chat a message of ``sender_id`` is sent to."""
+    return {chat_request.user_id, chat_request.ride.driver_id} - {sender_id}
+
+
+def message_sent(chat_request, sender_id, count=1):
+    """Count ``count`` new messages of ``sender_id`` as unread by the others."""
+    users = recipients(chat_request, sender_id)
+    cursors = ChatReadCursor.objects.filter(chat_request=chat_request, user__in=users)
+    updated = cursors.update(unread_count=F("unread_count") + count)
+    if updated < len(users):
+        # First message received in the chat
+        ChatReadCursor.objects.bulk_create(
+            [ChatReadCursor(chat_request=chat_request, user_id=pk) for pk in users],
+            ignore_conflicts=True,
+        )
+        cursors.filter(unread_count=0).update(unread_count=count)
+    transaction.on_commit(
+        lambda: notifications.message_sent(chat_request, users, count)
+    )
+
+
+def mark_read(chat_request, user):
+    """Mark all the messages of the chat as read by ``user``."""
+    ChatReadCursor.objects.get_or_create(chat_request=chat_request, user=user)
+
+    with transaction.atomic():
+        # Messages counted before the lock are found below, the ones counted
+        # after it wait and stay unread
+        cursor = ChatReadCursor.objects.select_for_update().get(
+            chat_request=chat_request, user=user
+        )
+        last_read = ChatMessage.objects.filter(chat_request=chat_request).aggregate(
+            last=Max("pk")
+        )["last"]
+
+        if settings.CHAT_WRITE_BEHIND:
+            # The last messages may not be inserted yet
+            from chat import writebehind
+
+            queued = writebehind.pending(chat_request.pk, limit=1)
+            if queued:
+                last_read = max(last_read or 0, queued[0]["pk"])
+
+        ChatReadCursor.objects.filter(pk=cursor.pk).update(
+            last_read_message_id=last_read, unread_count=0
+        )
+        transaction.on_commit(
+            lambda: notifications.chat_read(chat_request, user.pk, cursor.unread_count)
+        )
+
+
+def unread_count(user):
+    """Number of messages not read by ``user``, in all their chats."""
+    return (
+        ChatReadCursor.objects.filter(user=user, unread_count__gt=0).aggregate(
+            total=Sum("unread_count")
+        )["total"]
+        or 0
+    )
+
+
+def last_read_id(user):
+    """
+    Id of the last message read by ``user`` (an expression, e.g. an
+    ``OuterRef``) in the chat of the message, 0 if none.
+    """
+    return Coalesce(
+        Subquery(
+            ChatReadCursor.objects.filter(
+                chat_request=OuterRef("chat_request"), user=user
+            ).values("last_read_message_id")[:1]
+        ),
+        0,
+    )
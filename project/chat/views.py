@@ -1,12 +1,12 @@
 import logging
 
 from accounts.models import User
-from carpool.models.reservation import Reservation
 from carpool.models.ride import Ride
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.paginator import Paginator
-from django.db.models import OuterRef, Q, Subquery
+from django.db import transaction
+from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.translation import gettext as _
@@ -14,8 +14,14 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.sites.shortcuts import get_current_site
 from django.utils import timezone
 
-from chat.models import ChatMessage, ChatReport, ChatRequest, ModAction
-from chat.tasks import send_email_report_to_mods
+from chat.models import (
+    ChatMessage,
+    ChatReport,
+    ChatRequest,
+    ModAction,
+)
+from chat.emails import send_email_report_to_mods
+from chat.sidebar import get_sidebar_context
 
 
 @login_required
@@ -56,16 +62,15 @@ def report(request, jr_pk):
             messages.error(request, _("You have already reported this chat request."))
             return redirect("chat:room", jr_pk=jr_pk)
 
-        # Handle the report submission
-        ChatReport.objects.create(
-            chat_request=join_request,
-            reported_by=request.user,
-            reason=request.POST.get("reason", ""),
-        )
-
-        # Notify moderators via email (asynchronous task)
+        # Handle the report submission and notify moderators via email
         site_base_url = request.scheme + "://" + get_current_site(request).domain
-        send_email_report_to_mods.delay(join_request.pk, site_base_url)
+        with transaction.atomic():
+            ChatReport.objects.create(
+                chat_request=join_request,
+                reported_by=request.user,
+                reason=request.POST.get("reason", ""),
+            )
+            send_email_report_to_mods(join_request.pk, site_base_url)
 
     messages.info(request, _("The chat request has been reported."))
     return redirect("chat:room", jr_pk=jr_pk)
@@ -157,78 +162,6 @@ def mod_center(request):
     return render(request, "chat/moderation/index.html", context)
 
 
-def get_sidebar_context(request):
-    """
-    Get the context for the sidebar, including outgoing and incoming chat requests.
-    Used to avoid code duplication in multiple views.
-    """
-
-    # Subquery to fetch the last reservation status
-    last_reservation = Reservation.objects.filter(
-        ride=OuterRef("ride"),
-        user=OuterRef("user"),
-    ).order_by("-created_at")
-
-    outgoing_requests = (
-        ChatRequest.objects.filter(user=request.user)
-        .annotate(
-            last_reservation_status=Subquery(last_reservation.values("status")[:1])
-        )
-        .order_by("ride__start_dt")
-    )
-
-    incoming_requests = (
-        ChatRequest.objects.filter(ride__in=request.user.rides_as_driver.all())
-        .annotate(
-            last_reservation_status=Subquery(last_reservation.values("status")[:1])
-        )
-        .order_by("ride__start_dt")
-    )
-
-    print("Outgoing Requests with last_reservation_status:")
-    for jr in outgoing_requests:
-        print(
-            f"JoinRequest ID: {jr.pk}, Last Reservation Status: {jr.last_reservation_status}"
-        )
-    print("Incoming Requests with last_reservation_status:")
-    for jr in incoming_requests:
-        print(
-            f"JoinRequest ID: {jr.pk}, Last Reservation Status: {jr.last_reservation_status}"
-        )
-
-    # Filtering for declined (if you re-enable later)
-    # if not request.GET.get("o_declined"):
-    #     outgoing_requests = outgoing_requests.exclude(
-    #         last_reservation_status="DECLINED"
-    #     )
-
-    # if not request.GET.get("i_declined"):
-    #     incoming_requests = incoming_requests.exclude(
-    #         last_reservation_status="DECLINED"
-    #     )
-
-    # Filter out past ride's request by default
-    if not request.GET.get("o_past"):
-        outgoing_requests = outgoing_requests.filter(ride__start_dt__gte=timezone.now())
-    if not request.GET.get("i_past"):
-        incoming_requests = incoming_requests.filter(ride__start_dt__gte=timezone.now())
-
-    # Pagination
-    o_paginator = Paginator(outgoing_requests, 4)
-    i_paginator = Paginator(incoming_requests, 4)
-
-    o_page_number = request.GET.get("o_page")
-    i_page_number = request.GET.get("i_page")
-
-    outgoing_requests = o_paginator.get_page(o_page_number)
-    incoming_requests = i_paginator.get_page(i_page_number)
-
-    return {
-        "outgoing_requests": outgoing_requests,
-        "incoming_requests": incoming_requests,
-    }
-
-
 @login_required
 def index(request):
     context = get_sidebar_context(request)
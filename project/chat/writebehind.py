@@ -0,0 +1,202 @@
+"""
+Write-behind buffering of the chat messages (``CHAT_WRITE_BEHIND``).
+
+Instead of inserting each message before broadcasting it, the consumer takes
+an id from the sequence of ``ChatMessage`` (no row and no commit to wait
+for), queues the message in Redis and broadcasts it right away. The
+``flush_chat_messages`` command inserts the queued messages in batches with
+``bulk_create``.
+
+Messages are only removed from Redis once inserted, and inserting a message
+twice does nothing since its id is known: a crash of the flusher loses
+nothing, the next one inserts the remaining messages. Until then, the
+messages are also kept per chat so that the chat history includes them.
+"""
+
+import datetime
+import json
+import logging
+from collections import Counter
+from uuid import UUID
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+
+from accounts.models import User
+from chat import unread
+from chat.models import ChatMessage, ChatRequest
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 60  # seconds
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.CHAT_WRITE_BEHIND_REDIS_URL)
+    return _client
+
+
+def queue_key():
+    return f"{settings.CHAT_WRITE_BEHIND_KEY_PREFIX}:queue"
+
+
+def pending_key(chat_request_pk):
+    """Sorted set of the queued messages of a chat, scored by id."""
+    return f"{settings.CHAT_WRITE_BEHIND_KEY_PREFIX}:pending:{chat_request_pk}"
+
+
+def lock_key():
+    """Only one flusher at a time, the queue is read from its head."""
+    return f"{settings.CHAT_WRITE_BEHIND_KEY_PREFIX}:lock"
+
+
+def reserve_id():
+    """Take the id of a new message from the sequence of the table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id'))",
+            [ChatMessage._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def enqueue(chat_request_pk, sender, content, timestamp):
+    """Queue a new message of ``sender`` in the chat, return its id."""
+    message = {
+        "id": reserve_id(),
+        "chat_request": str(chat_request_pk),
+        "sender": sender.pk,
+        "sender_uuid": str(sender.uuid),
+        "content": content,
+        "timestamp": timestamp.isoformat(),
+    }
+    data = json.dumps(message)
+
+    pipe = get_redis().pipeline()
+    pipe.rpush(queue_key(), data)
+    pipe.zadd(pending_key(chat_request_pk), {data: message["id"]})
+    pipe.execute()
+    return message["id"]
+
+
+def pending(chat_request_pk, before_id=None, limit=None):
+    """
+    Return the queued messages of the chat preceding the message
+    ``before_id``, the latest first, as ``get_history`` rows.
+    """
+    items = get_redis().zrevrangebyscore(
+        pending_key(chat_request_pk),
+        f"({before_id}" if before_id is not None else "+inf",
+        "-inf",
+        start=0 if limit else None,
+        num=limit,
+    )
+    rows = []
+    for item in items:
+        message = json.loads(item)
+        rows.append(
+            {
+                "pk": message["id"],
+                "sender__uuid": message["sender_uuid"],
+                "content": message["content"],
+                "timestamp": datetime.datetime.fromisoformat(message["timestamp"]),
+                "hidden": False,
+            }
+        )
+    return rows
+
+
+@transaction.atomic
+def _insert(messages):
+    # Messages replayed after a crash of a flusher are already inserted and
+    # counted as unread
+    inserted = set(
+        ChatMessage.objects.filter(pk__in=[m["id"] for m in messages]).values_list(
+            "pk", flat=True
+        )
+    )
+    messages = [m for m in messages if m["id"] not in inserted]
+
+    # The chat or the sender may have been deleted in the meantime
+    chat_requests = {
+        str(pk)
+        for pk in ChatRequest.objects.filter(
+            pk__in={m["chat_request"] for m in messages}
+        ).values_list("pk", flat=True)
+    }
+    senders = set(
+        User.objects.filter(pk__in={m["sender"] for m in messages}).values_list(
+            "pk", flat=True
+        )
+    )
+
+    objs = []
+    sent = Counter()
+    for message in messages:
+        if (
+            message["chat_request"] not in chat_requests
+            or message["sender"] not in senders
+        ):
+            logger.warning(
+                f"Dropping chat message {message['id']}, its chat or sender was deleted"
+            )
+            continue
+        objs.append(
+            ChatMessage(
+                id=message["id"],
+                chat_request_id=message["chat_request"],
+                sender_id=message["sender"],
+                content=message["content"],
+                timestamp=datetime.datetime.fromisoformat(message["timestamp"]),
+            )
+        )
+        sent[message["chat_request"], message["sender"]] += 1
+    ChatMessage.objects.bulk_create(objs, ignore_conflicts=True)
+
+    chats = ChatRequest.objects.select_related("ride").in_bulk(
+        {chat_request for chat_request, _sender in sent}
+    )
+    for (chat_request, sender), count in sent.items():
+        unread.message_sent(chats[UUID(chat_request)], sender, count)
+
+
+def flush(batch_size=None, blocking_timeout=None):
+    """
+    Insert the queued messages in batches of ``batch_size``, return the
+    number of messages flushed.
+    """
+    client = get_redis()
+    batch_size = batch_size or settings.CHAT_WRITE_BEHIND_BATCH_SIZE
+    flushed = 0
+
+    lock = client.lock(
+        lock_key(), timeout=LOCK_TIMEOUT, blocking_timeout=blocking_timeout
+    )
+    with lock:
+        while items := client.lrange(queue_key(), 0, batch_size - 1):
+            messages = [json.loads(item) for item in items]
+            _insert(messages)
+
+            pipe = client.pipeline()
+            pipe.ltrim(queue_key(), len(items), -1)
+            for message, item in zip(messages, items):
+                pipe.zrem(pending_key(message["chat_request"]), item)
+            pipe.execute()
+
+            flushed += len(items)
+            lock.extend(LOCK_TIMEOUT, replace_ttl=True)
+    return flushed
+
+
+def ensure_flushed():
+    """
+    Insert the queued messages now, before updating messages which may not
+    have been inserted yet.
+    """
+    if get_redis().llen(queue_key()):
+        flush(blocking_timeout=LOCK_TIMEOUT)
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.gis",
+    "django.contrib.postgres",
     "multiselectfield",
     "channels",
     "accounts",
@@ -79,6 +80,7 @@ TEMPLATES = [
         "OPTIONS": {
             "context_processors": [
                 "project.context_processors.constants",
+                "chat.context_processors.unread_messages",
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -204,12 +206,41 @@ CELERY_RESULT_SERIALIZER = "json"
 GEOCODAGE_TASK_RATE_LIMIT = env("GEOCODAGE_TASK_RATE_LIMIT", default="50/s")
 ROUTING_TASK_RATE_LIMIT = env("ROUTING_TASK_RATE_LIMIT", default="5/s")
 
+# Call the geoplateforme APIs from the web processes instead of the Celery
+# tasks, which remain the fallback. The rate limits above are then enforced
+# per process.
+GEOPLATEFORME_IN_PROCESS = env.bool("GEOPLATEFORME_IN_PROCESS", default=True)
+
 # Cooldown settings
 COOLDOWN_EMAIL_VERIFY = env.int(
     "COOLDOWN_EMAIL_VERIFY",
     default=5 * 60,
 )  # in seconds (default 5 minutes)
 
+# Cache settings
+# Shared by all the processes, e.g. to invalidate the map tiles. Redis should
+# be configured with an LRU eviction policy (maxmemory-policy allkeys-lru).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_URL", default="redis://127.0.0.1:6379/1"),
+    },
+    # Autocompletion results, see carpool.completion
+    "completion": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_URL", default="redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "completion",
+        "TIMEOUT": env.int("COMPLETION_CACHE_TIMEOUT", default=24 * 60 * 60),
+    },
+    # Routing results, see carpool.routes
+    "routing": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_URL", default="redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "routing",
+        "TIMEOUT": env.int("ROUTING_CACHE_TIMEOUT", default=30 * 24 * 60 * 60),
+    },
+}
+
 # Channels settings
 CHANNEL_LAYERS = {
     "default": {
@@ -220,6 +251,24 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Chat settings
+# Broadcast the chat messages before inserting them, see chat.writebehind.
+# The flush_chat_messages command must then be running, and Redis must
+# persist its data (appendonly yes).
+CHAT_WRITE_BEHIND = env.bool("CHAT_WRITE_BEHIND", default=False)
+CHAT_WRITE_BEHIND_REDIS_URL = env(
+    "CHAT_WRITE_BEHIND_REDIS_URL",
+    default=env("CACHE_URL", default="redis://127.0.0.1:6379/1"),
+)
+# Prefix of the Redis keys of the queued messages
+CHAT_WRITE_BEHIND_KEY_PREFIX = env(
+    "CHAT_WRITE_BEHIND_KEY_PREFIX", default="chat:writebehind"
+)
+# Maximum number of messages inserted at once
+CHAT_WRITE_BEHIND_BATCH_SIZE = env.int("CHAT_WRITE_BEHIND_BATCH_SIZE", default=100)
+# Time (in seconds) between two flushes of the queued messages
+CHAT_WRITE_BEHIND_INTERVAL = env.float("CHAT_WRITE_BEHIND_INTERVAL", default=0.5)
+
 ADMINS = [
     ("Admin", env("DJANGO_ADMIN_EMAIL")),
 ]
@@ -234,9 +283,48 @@ EMAIL_NOTIFICATION_THRESHOLD_MINUTES = env.int(
     "EMAIL_NOTIFICATION_THRESHOLD_MINUTES", default=30
 )
 
+# Email outbox settings, see accounts.outbox.
+# The dispatch_outbox command must be running for the emails to be sent.
+# Number of SMTP connections kept open by the dispatcher
+OUTBOX_CONNECTIONS = env.int("OUTBOX_CONNECTIONS", default=2)
+# Maximum number of emails sent at once over a connection
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=50)
+# Time (in seconds) between two dispatches of the pending emails
+OUTBOX_INTERVAL = env.float("OUTBOX_INTERVAL", default=2)
+# Failed emails are retried after OUTBOX_RETRY_DELAY seconds, doubled at each
+# attempt, then given up after OUTBOX_MAX_ATTEMPTS attempts
+OUTBOX_RETRY_DELAY = env.int("OUTBOX_RETRY_DELAY", default=60)
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", default=5)
+
 # Anonymous access settings
 ANONYMOUS_ACCESS_RIDES_LIST = env.bool("ANONYMOUS_ACCESS_RIDES_LIST", default=True)
 
+# Rides search settings
+# Maximum distance (in km) between a searched location and the route of a ride
+RIDES_SEARCH_RADIUS_KM = env.int("RIDES_SEARCH_RADIUS_KM", default=10)
+
+# Map settings
+# Time (in seconds) the vector tiles of the rides map are kept in the cache
+MAP_TILES_CACHE_TIMEOUT = env.int("MAP_TILES_CACHE_TIMEOUT", default=60 * 60)
+
+# Autocompletion settings
+# Answer a query from the cached results of its prefixes when they are complete
+COMPLETION_CACHE_PREFIX_FILTERING = env.bool(
+    "COMPLETION_CACHE_PREFIX_FILTERING", default=True
+)
+
+# Routing settings
+# Number of decimals of the coordinates in the route cache keys
+ROUTING_CACHE_PRECISION = env.int("ROUTING_CACHE_PRECISION", default=4)
+# Failed calls to the routing API (within a minute) after which it is not
+# called anymore during ROUTING_CIRCUIT_RECOVERY_TIMEOUT seconds
+ROUTING_CIRCUIT_FAILURE_THRESHOLD = env.int(
+    "ROUTING_CIRCUIT_FAILURE_THRESHOLD", default=5
+)
+ROUTING_CIRCUIT_RECOVERY_TIMEOUT = env.int(
+    "ROUTING_CIRCUIT_RECOVERY_TIMEOUT", default=30
+)
+
 # The email that users can use to contact support
 # You can use GitLab Service Desk feature to handle incoming emails
 SUPPORT_EMAIL = env("SUPPORT_EMAIL")
@@ -22,6 +22,24 @@ LOGGING = {
     },
 }
 
+# Keep the cache of each test run in memory
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "completion": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "completion",
+    },
+    "routing": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "routing",
+    },
+}
+
+# The tests mock the Celery tasks calling the geoplateforme APIs
+GEOPLATEFORME_IN_PROCESS = False
+
 TESTING = "test" in sys.argv or "PYTEST_VERSION" in os.environ
 
 if not TESTING: